@@ -1,106 +1,93 @@
-from flask import Flask , jsonify , request
-#from architect_mngmnt_app.models import db
-from models import db , User
-from dotenv import load_dotenv
-from flask_jwt_extended import jwt_required , create_access_token , get_jwt_identity , JWTManager
-from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_cors import CORS
-from flasgger import Swagger
-from flask_login import LoginManager
-# from flask_bcrypt import Bcrypt 
+# app.py
+"""
+Application factory. Importing this module has no side effects: the
+environment is loaded, extensions are set up and route modules are
+imported only when create_app() is called (by `flask`, wsgi.py or tests).
+The schema is managed with Flask-Migrate (`flask db upgrade`), never
+created at startup.
+"""
 import os
-
-
-
-
 import time
-import datetime
-import platform
-import sys
-
-# print("Python:", sys.version)
-# print("Platform:", platform.platform())
-# print("time.time() =", time.time())
-# print("utcnow timestamp =", datetime.datetime.utcnow().timestamp())
-# print("difference =", datetime.datetime.utcnow().timestamp() - time.time())
-
-
-
-
-# Load environment variables
-load_dotenv()
-
-app = Flask(__name__)
-# app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-# app.config['ALLOWED_EXTENSIONS'] = ALLOWED_EXTENSIONS
-
-login_manager = LoginManager()
-login_manager.init_app(app)
-
-login_manager = LoginManager()
-login_manager.init_app(app)
-# login_manager.login_view = "auth.login"
-login_manager.login_view = "user.login_user"
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
-app.config['SWAGGER'] = {
-    'title': 'My Free Flask API Docs',
-    'uiversion': 3,  # Use OpenAPI 3.0
-    'specs_route': '/apidocs/' # The URL path to access the docs
-}
-
-swagger = Swagger(app)
-
-CORS(app)
+import logging
+from datetime import datetime
+from importlib import import_module
 
-PINTEREST_TOKEN = os.environ.get('PINTEREST_ACCESS_TOKEN')
+from flask import Flask , Blueprint , jsonify , request
 
-# --- Configuration (These would be stored securely in config or environment variables) ---
-TOKEN_URL = os.getenv("TOKEN_URI")  # Replace with the real Token Endpoint
-CLIENT_ID = os.getenv("CLIENT_ID")            # Your application's client ID
-CLIENT_SECRET = os.getenv("CLIENT_SECRET")   # Your application's client secret
-REDIRECT_URI = os.getenv("REDIRECT_URI") # Must match the one registered with the server
-# --------------------------------------------------------------------------------------
+from models import db , User
 
-database_uri = os.getenv('DATABASE_URI')
-if not database_uri:
-    raise RuntimeError("DATABASE_URI not found. Check your .env file!")
-#configure the app
-app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_recycle':280
+logger = logging.getLogger(__name__)
+
+# name -> (module, blueprint attribute, url_prefix), in registration order.
+# A route module is imported only if its blueprint is enabled (BLUEPRINTS config).
+BLUEPRINTS = {
+    'teams': ('routes.teams_routes', 'teams_bp', '/api/teams'),
+    'roles': ('routes.roles_routes', 'roles_bp', '/api/roles'),
+    # 'payments': ('routes.payments_routes', 'payments_bp', '/api/payments'),
+    'invoices': ('routes.invoices_routes', 'invoices_bp', '/api/invoices'),
+    'clients': ('routes.clients_routes', 'clients_bp', '/api/clients'),
+    'user': ('routes.user_routes', 'user_bp', '/api/user'),
+    'documents': ('routes.documents_routes', 'documents_bp', '/api/documents'),
+    'project_assignments': ('routes.project_assignments_routes', 'project_assignments_bp', '/api/project_assignments'),
+    'project_vendor': ('routes.project_vendor_routes', 'project_vendor_bp', '/api/project_vendor'),
+    'projects': ('routes.projects_routes', 'projects_bp', '/api/projects'),
+    'tasks': ('routes.tasks_routes', 'tasks_bp', '/api/tasks'),
+    'templates': ('routes.templates_routes', 'templates_bp', '/api/templates'),
+    'vendors': ('routes.vendors_routes', 'vendors_bp', '/api/vendors'),
+    'project_templates': ('routes.projects_templates_routes', 'project_templates_bp', '/api/project_templates'),
+    'otp': ('routes.otp_routes', 'otp_bp', '/api/otp'),
+    'boards': ('routes.boards_routes', 'boards_bp', '/api/boards'),
+    'pins': ('routes.pins_routes', 'pins_bp', '/api/pins'),
+    'tags': ('routes.tags_routes', 'tags_bp', '/api/tags'),
+    'spaces': ('routes.spaces_routes', 'spaces_bp', '/api/spaces'),
+    'drawings': ('routes.drawings_routes', 'drawings_bp', '/api/drawings'),
+    'inspiration': ('routes.inspiration_routes', 'inspiration_bp', '/api/inspiration'),
+    'upload': ('routes.upload_files_routes', 'upload_bp', '/api'),
+    'template_cards': ('routes.template_cards_routes', 'template_cards_bp', '/api/template_cards'),
+    'cards': ('routes.cards_routes', 'cards_bp', '/api/cards'),
+    'companies': ('routes.companies_routes', 'companies_bp', '/api/companies'),
+    'super_user': ('routes.super_user_routes', 'super_user_bp', '/api/super_user'),
+    'preset': ('routes.preset_routes', 'preset_bp', '/api/preset'),
+    'pinterest': ('routes.pinterest_routes', 'pinterest_bp', '/api/pinterest'),
+    'auth': ('auth.auth', 'auth_bp', '/api/auth'),
+    'invite': ('routes.invite_routes', 'invite_bp', '/api/invite'),
+    'user_roles': ('routes.user_roles_routes', 'user_roles_bp', '/api/user_roles'),
+    'permissions': ('routes.permissions_routes', 'permissions_bp', '/api/permissions'),
+    'role_permissions': ('routes.role_permissions_routes', 'role_permissions_bp', '/api/role_permissions'),
+    'preset_spaces': ('routes.preset_spaces_routes', 'preset_spaces_bp', '/api/preset_spaces'),
 }
 
-#configure the app
-SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = int(os.getenv("SMTP_PORT" , "587"))
-EMAIL_SENDER = os.getenv("EMAIL_SENDER")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
-# db.init_app(app)
-
 
-SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = int(os.getenv("SMTP_PORT" , "587"))
-EMAIL_SENDER = os.getenv("EMAIL_SENDER")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
-
-# --------------------------------------------------------------------------------------
-# --- Database and JWT Configuration (MUST be set before db.init_app) ---
-
-
-#Add JWT Configuration
-app.config['SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
-jwt = JWTManager(app)
-
-db.init_app(app)
-
-@app.route('/hello', methods=['GET'])
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() not in ("0", "false", "no")
+
+
+def default_config():
+    """Settings read from the environment (and .env); anything passed to create_app overrides them."""
+    from utils.ingest import MAX_REQUEST_SIZE, MAX_FORM_PARTS
+    enabled = os.getenv("ENABLED_BLUEPRINTS")
+    return {
+        'SQLALCHEMY_DATABASE_URI': os.getenv('DATABASE_URI'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_recycle': 280},
+        'SECRET_KEY': os.getenv('JWT_SECRET_KEY'),
+        'SWAGGER': {
+            'title': 'My Free Flask API Docs',
+            'uiversion': 3,  # Use OpenAPI 3.0
+            'specs_route': '/apidocs/' # The URL path to access the docs
+        },
+        'SWAGGER_ENABLED': _env_flag("SWAGGER_ENABLED", "true"),
+        # Bounds what one request can make Werkzeug write to uploads/tmp
+        'MAX_CONTENT_LENGTH': MAX_REQUEST_SIZE,
+        'MAX_FORM_PARTS': MAX_FORM_PARTS,
+        # Names from BLUEPRINTS to register; None registers all of them
+        'BLUEPRINTS': [name.strip() for name in enabled.split(',') if name.strip()] if enabled else None,
+    }
+
+
+core_bp = Blueprint('core' , __name__)
+
+@core_bp.route('/hello', methods=['GET'])
 def hello_world():
     """
     A simple Hello World endpoint.
@@ -119,7 +106,7 @@ def hello_world():
     """
     return jsonify({'message': 'Hello from Flasgger!'})
 
-@app.route('/create_user', methods=['POST'])
+@core_bp.route('/create_user', methods=['POST'])
 def create_user():
     """
     Creates one or more new user accounts.
@@ -200,7 +187,7 @@ def create_user():
             "message": "No valid user data found in the request."
         }), 400
     
-@app.route('/update_user/<int:user_id>', methods=['PUT'])
+@core_bp.route('/update_user/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
     """
     Updates an existing user account by ID.
@@ -267,93 +254,131 @@ def update_user(user_id):
         "message": f"User ID {user_id} updated successfully. Fields updated: {updated_fields}"
     }), 200
 
-# Initialize Flask-Migrate after initializing the app and db
-migrate = Migrate(app, db)
-# bcrypt = Bcrypt(app)
-
-#Register blueprints
-from routes.clients_routes import clients_bp
-from routes.roles_routes import roles_bp
-from routes.user_routes import user_bp
-from routes.documents_routes import documents_bp
-from routes.project_assignments_routes import project_assignments_bp
-from routes.project_vendor_routes import project_vendor_bp
-from routes.projects_routes import projects_bp
-from routes.tasks_routes import tasks_bp
-from routes.templates_routes import templates_bp
-from routes.vendors_routes import vendors_bp
-from routes.projects_templates_routes import project_templates_bp
-from routes.otp_routes import otp_bp
-from routes.boards_routes import boards_bp
-from routes.pins_routes import pins_bp
-from routes.tags_routes import tags_bp
-from routes.spaces_routes import spaces_bp
-from routes.drawings_routes import drawings_bp
-from routes.inspiration_routes import inspiration_bp
-from routes.upload_files_routes import upload_bp
-from routes.template_cards_routes import template_cards_bp
-from routes.cards_routes import cards_bp
-from routes.companies_routes import companies_bp
-from routes.super_user_routes import super_user_bp
-from routes.teams_routes import teams_bp
-# from routes.payments_routes import payments_bp
-from routes.invoices_routes import invoices_bp
-from routes.preset_routes import preset_bp
-from routes.pinterest_routes import pinterest_bp
-from auth.auth import auth_bp
-from routes.user_roles_routes import user_roles_bp
-from routes.invite_routes import invite_bp
-from routes.permissions_routes import permissions_bp
-from routes.role_permissions_routes import role_permissions_bp
-from routes.preset_spaces_routes import preset_spaces_bp
-
-app.register_blueprint(teams_bp , url_prefix = "/api/teams")
-app.register_blueprint(roles_bp, url_prefix="/api/roles")
-# app.register_blueprint(payments_bp, url_prefix="/api/payments")
-app.register_blueprint(invoices_bp, url_prefix="/api/invoices")
-app.register_blueprint(clients_bp, url_prefix="/api/clients")
-app.register_blueprint(user_bp, url_prefix="/api/user")
-app.register_blueprint(documents_bp, url_prefix="/api/documents")
-app.register_blueprint(project_assignments_bp, url_prefix="/api/project_assignments")
-app.register_blueprint(project_vendor_bp, url_prefix="/api/project_vendor")
-app.register_blueprint(projects_bp, url_prefix="/api/projects")
-app.register_blueprint(tasks_bp, url_prefix="/api/tasks")
-app.register_blueprint(templates_bp, url_prefix="/api/templates")
-app.register_blueprint(vendors_bp, url_prefix="/api/vendors")
-app.register_blueprint(project_templates_bp, url_prefix="/api/project_templates")
-app.register_blueprint(otp_bp, url_prefix="/api/otp")
-app.register_blueprint(boards_bp , url_prefix = "/api/boards")
-app.register_blueprint(pins_bp , url_prefix = "/api/pins")
-app.register_blueprint(tags_bp , url_prefix = "/api/tags")
-app.register_blueprint(spaces_bp , url_prefix = "/api/spaces")
-app.register_blueprint(drawings_bp , url_prefix = "/api/drawings")
-app.register_blueprint(inspiration_bp , url_prefix = "/api/inspiration")
-app.register_blueprint(upload_bp , url_prefix = '/api')
-app.register_blueprint(template_cards_bp , url_prefix = '/api/template_cards')
-app.register_blueprint(cards_bp , url_prefix = '/api/cards')
-app.register_blueprint(companies_bp , url_prefix = '/api/companies')
-app.register_blueprint(super_user_bp , url_prefix = '/api/super_user')
-app.register_blueprint(preset_bp , url_prefix = '/api/preset')
-app.register_blueprint(pinterest_bp , url_prefix = '/api/pinterest')
-app.register_blueprint(auth_bp , url_prefix = '/api/auth')
-app.register_blueprint(invite_bp , url_prefix = '/api/invite')
-app.register_blueprint(user_roles_bp , url_prefix = '/api/user_roles')
-app.register_blueprint(permissions_bp , url_prefix = '/api/permissions')
-app.register_blueprint(role_permissions_bp , url_prefix = '/api/role_permissions')
-app.register_blueprint(preset_spaces_bp , url_prefix = '/api/preset_spaces')
-
-#create tables
-with app.app_context():
-    db.create_all()
-    print("✅ Tables created successfully!")
-
-
-
-# print(os.path.exists("uploads/inspiration_uploads/2a59677d-b072-4570-925c-255a85efe195/Screenshot_2025-01-21_155435.png"))
-
-# print(app.url_map)
-# for rule in app.url_map.iter_rules():
-#     print(rule)
+
+def register_blueprints(app):
+    """Imports and registers the enabled blueprints; returns {name: import seconds} for the startup benchmark."""
+    enabled = app.config.get('BLUEPRINTS')
+    unknown = set(enabled or ()) - set(BLUEPRINTS)
+    if unknown:
+        raise RuntimeError(f"Unknown blueprints in BLUEPRINTS: {', '.join(sorted(unknown))}")
+    timings = {}
+    for name, (module, attribute, url_prefix) in BLUEPRINTS.items():
+        if enabled is not None and name not in enabled:
+            continue
+        started = time.perf_counter()
+        blueprint = getattr(import_module(module), attribute)
+        timings[name] = time.perf_counter() - started
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+    return timings
+
+
+def register_extensions(app):
+    from flask_cors import CORS
+    from flask_jwt_extended import JWTManager
+    from flask_login import LoginManager
+    from flask_migrate import Migrate
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+    # login_manager.login_view = "auth.login"
+    login_manager.login_view = "user.login_user"
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, user_id)
+
+    if app.config.get('SWAGGER_ENABLED'):
+        from flasgger import Swagger
+        Swagger(app)
+
+    CORS(app)
+    JWTManager(app)
+    db.init_app(app)
+    # Schema changes go through `flask db migrate` / `flask db upgrade`
+    Migrate(app, db)
+
+
+def register_services(app):
+    """Session listeners, request hooks and CLI commands of the utils modules. None of them touches the database here."""
+    from utils.project_stats import register_project_stats_listeners, rebuild_project_stats_command
+    register_project_stats_listeners()
+    app.cli.add_command(rebuild_project_stats_command)
+
+    from utils.task_companies import backfill_task_companies_command
+    app.cli.add_command(backfill_task_companies_command)
+
+    from utils.ingest import register_ingest
+    register_ingest(app)
+
+    from utils.file_store import register_file_store_listeners, rebuild_file_blob_refs_command
+    register_file_store_listeners()
+    app.cli.add_command(rebuild_file_blob_refs_command)
+
+    from utils.derivatives import register_derivative_listeners
+    register_derivative_listeners()
+
+    from utils.tiles import build_drawing_tiles_command
+    app.cli.add_command(build_drawing_tiles_command)
+
+    from utils.resumable_uploads import register_resumable_upload_listeners, purge_upload_sessions_command
+    register_resumable_upload_listeners()
+    app.cli.add_command(purge_upload_sessions_command)
+
+    from utils.email_queue import email_worker_command
+    from utils.smtp_standin import smtp_standin_command
+    app.cli.add_command(email_worker_command)
+    app.cli.add_command(smtp_standin_command)
+
+    from utils.invites import purge_invites_command
+    app.cli.add_command(purge_invites_command)
+
+    from utils.pinterest_mock import pinterest_mock_command
+    app.cli.add_command(pinterest_mock_command)
+
+    from utils.pinterest_sync import sync_pinterest_pins_command
+    app.cli.add_command(sync_pinterest_pins_command)
+
+    from utils.pinterest_tokens import renew_pinterest_tokens_command
+    app.cli.add_command(renew_pinterest_tokens_command)
+
+    from utils.image_fetch import register_image_fetch_listeners, fetch_remote_images_command
+    register_image_fetch_listeners()
+    app.cli.add_command(fetch_remote_images_command)
+
+    from utils.user_tokens import purge_expired_tokens_command
+    app.cli.add_command(purge_expired_tokens_command)
+
+    from utils.token_revocation import register_token_revocation
+    register_token_revocation(app)
+
+    from utils.startup_benchmark import startup_benchmark_command
+    app.cli.add_command(startup_benchmark_command)
+
+
+def create_app(config=None):
+    """
+    Builds the application. `config` (a mapping, or an object/import path
+    for from_object) overrides the environment-derived defaults, e.g.
+    create_app({'BLUEPRINTS': ['auth', 'tasks'], 'SWAGGER_ENABLED': False}).
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    app = Flask(__name__)
+    app.config.from_mapping(default_config())
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+    if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+        raise RuntimeError("DATABASE_URI not found. Check your .env file!")
+
+    register_extensions(app)
+    app.register_blueprint(core_bp)
+    app.extensions['blueprint_import_seconds'] = register_blueprints(app)
+    register_services(app)
+    return app
+
 
 if __name__ == "__main__":
-    app.run(debug = True)
\ No newline at end of file
+    create_app().run(debug = True)
@@ -3,21 +3,27 @@ from datetime import datetime, timedelta
 import logging
 from random import random
 import uuid
-import bcrypt
 from flask_cors import cross_origin
 import traceback
 from flask import Flask
-from flask_bcrypt import Bcrypt
 from flask import Blueprint, jsonify, request
 from flask_mail import Mail
 from sqlalchemy import and_
 import random
 # from architect_backend0.routes.clients_routes import send_email
 from utils.email_utils import send_email
+from utils.email_queue import enqueue_email
+from utils.latency import StageTimer
+from utils.passwords import hash_password, verify_password
+from utils.user_tokens import store_refresh_token, rotate_refresh_token, revoke_refresh_token
+from utils.token_revocation import revoke_access_token
+from utils.rate_limit import rate_limited, rate_limiter
+from concurrent.futures import TimeoutError as HashTimeoutError
 from email.message import EmailMessage
 from models import OtpCode, User, UserToken,db, generate_uuid , Company
 # from werkzeug.security import generate_password_hash,check_password_hash
-from auth.authhelpers import  REFRESH_TOKEN_SECRET, create_access_token, create_refresh_token, decode_jwt,  jwt_required, refresh_token_expiry_time
+from auth.authhelpers import  REFRESH_TOKEN_SECRET, verify_access_token, create_access_token, create_refresh_token, decode_jwt,  jwt_required, refresh_token_expiry_time
+from decoraters import admin_required
 from werkzeug.exceptions import BadRequest
 from sqlalchemy import func
 import os
@@ -25,11 +31,10 @@ from sqlalchemy.exc import SQLAlchemyError
 
 auth_bp = Blueprint('auth', __name__ ,url_prefix="/api/auth")
 
-app = Flask(__name__)
-bcrypt = Bcrypt(app)
 
 
 @auth_bp.route("/login" , methods = ['POST'])
+@rate_limited(('ip', 20, 60), ('email', 5, 300))
 def login_user():
     """
     User Login (Step 1: Credentials Check and OTP Trigger)
@@ -81,6 +86,8 @@ def login_user():
               example: Invalid email or password
       500:
         description: Server error during OTP generation or email sending.
+      503:
+        description: Password verification is saturated; retry shortly.
     """
     data = request.json
     user_email = data.get("user_email")
@@ -88,13 +95,29 @@ def login_user():
 
     if not all([user_email , user_password]):
         return jsonify({"message":"Email and password are required"}) , 400
-    
-    user = User.query.filter_by(user_email=user_email).first()
 
-    if user and bcrypt.check_password_hash(user.user_password , user_password):
-        try:
+    # Stage timings are logged and returned as a Server-Timing header
+    timer = StageTimer("login")
+    with timer.stage("lookup"):
+        user = User.query.filter_by(user_email=user_email).first()
+
+    try:
+        with timer.stage("verify"):
+            matches, new_hash = verify_password(user.user_password if user else None, user_password)
+    except HashTimeoutError:
+        db.session.rollback()
+        return timer.apply((jsonify({"message": "Too many sign-ins right now, please retry."}), 503), "busy")
+
+    if not matches:
+        db.session.rollback()
+        return timer.apply((jsonify({"message" : "Invalid email or password"}) , 401), "rejected")
+
+    try:
+        with timer.stage("otp"):
+            if new_hash:
+                # Hash of an outdated cost: replace it now that the plaintext is known to be right
+                user.user_password = new_hash
             OtpCode.query.filter_by(user_id = user.user_id).delete()
-            db.session.flush()
 
             #generate new otp
             otp_code = str(random.randint(100000 , 999999))
@@ -107,27 +130,28 @@ def login_user():
                 type = 'login'
             )
             db.session.add(new_otp)
-            db.session.commit()
-
-            send_email(
+            # Queued in the OTP's transaction and delivered by `flask email-worker`, so the
+            # request neither waits on SMTP nor sends a code that was rolled back
+            enqueue_email(
                 recipients=[user_email],
                 subject="Login Verification OTP",
                 body=f"Hello {user.user_name},\n\nYour login verification code is {otp_code}. It is valid for 5 minutes."
             )
+        with timer.stage("commit"):
+            db.session.commit()
 
-            return jsonify({"message": "OTP sent for login verification. Please check your email." , 
-                            "user_id": user.user_id,
-                            "company_id": user.company_id,
-                            "user_name": user.user_name}), 200
-        
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({"error" : str(e)}) , 500
-    else:
-        return jsonify({"message" : "Invalid email or password"}) , 401
+        return timer.apply((jsonify({"message": "OTP sent for login verification. Please check your email." , 
+                                     "user_id": user.user_id,
+                                     "company_id": user.company_id,
+                                     "user_name": user.user_name}), 200), "ok")
+
+    except Exception as e:
+        db.session.rollback()
+        return timer.apply((jsonify({"error" : str(e)}) , 500), "error")
     
 
 @auth_bp.route('/verify_login_otp', methods=['POST'])
+@rate_limited(('ip', 20, 60), ('email', 5, 300))
 def verify_login_otp():
     """
     Verify Login OTP (Step 2: OTP Verification & Final Login)
@@ -183,20 +207,7 @@ def verify_login_otp():
         access_token = create_access_token(user.user_id, company_id) # <-- Use Custom
         refresh_token = create_refresh_token(user.user_id, company_id)
 
-        #generate uuid
-        token_id = generate_uuid()
-
-        print(access_token)
-        print(refresh_token)
-        expires_at=datetime.utcnow() + refresh_token_expiry_time
-
-        new_token_record = UserToken(
-            user_id = user.user_id , 
-            token = refresh_token , 
-            expires_at = expires_at
-        )
-
-        db.session.add(new_token_record)
+        store_refresh_token(user.user_id, refresh_token)
         db.session.commit()
 
         
@@ -243,36 +254,15 @@ def refresh():
         user_id = payload['user_id']
         company_id = payload['company_id']
 
-        stored_token = db.session.query(UserToken).filter(
-            and_(
-                UserToken.token == refresh_token,
-                UserToken.user_id == user_id
-            )
-        ).first()
-
-        if not stored_token:
-            return jsonify({'message': 'Invalid refresh token!'}), 401
-
-        # Delete old token
-        db.session.delete(stored_token)
-
         # Create new tokens
         new_access_token = create_access_token(user_id=user_id, company_id=company_id)
         new_refresh_token = create_refresh_token(user_id=user_id, company_id=company_id)
 
-        # Store new refresh token
-        now = datetime.utcnow()
-        refresh_token_expiry_time = timedelta(days=7)  # Adjust as needed
-
-        new_token = UserToken(
-            token_id=uuid.uuid4(),
-            user_id=user_id,
-            token=new_refresh_token,
-           
-            expires_at=now + refresh_token_expiry_time
-        )
-
-        db.session.add(new_token)
+        # The stored token is looked up and replaced in one UPDATE; a token already
+        # rotated (replayed, or refreshed twice concurrently) matches no row
+        if not rotate_refresh_token(user_id, refresh_token, new_refresh_token):
+            db.session.rollback()
+            return jsonify({'message': 'Invalid refresh token!'}), 401
         db.session.commit()
 
         return jsonify({
@@ -282,6 +272,7 @@ def refresh():
         }), 200
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({'message': 'An error occurred', 'error': str(e)}), 500
     
 
@@ -310,14 +301,19 @@ def logout_user():
             logging.warning(f"Logout attempt with potentially invalid refresh token payload for user_id: {user_id}")
 
         # 2. Delete the refresh token from the database (revocation)
-        # We look up *only* by the token string itself to revoke it, regardless of its status.
-        rows_deleted = db.session.query(UserToken).filter(
-            UserToken.token == refresh_token
-        ).delete()
+        # Revoked regardless of its status: an expired token is still found by its digest.
+        revoked = revoke_refresh_token(refresh_token)
+
+        # The access token sent along is denied for the rest of its life too
+        auth_header = request.headers.get("Authorization") or ""
+        if auth_header.startswith("Bearer "):
+            claims = verify_access_token(auth_header[7:])
+            if not claims.get("message"):
+                revoke_access_token(claims)
         
         db.session.commit()
         
-        if rows_deleted == 0 and not payload.get("message"):
+        if not revoked and not payload.get("message"):
             # The token was structurally valid but not found in the DB (already revoked or expired from DB)
             return jsonify({'message': 'Logout successful. Token was not active or already logged out.'}), 200
 
@@ -335,6 +331,7 @@ def logout_user():
         return jsonify({'message': 'An unexpected server error occurred.'}), 500
     
 @auth_bp.route('/verify_registration_otp', methods=['POST'])
+@rate_limited(('ip', 20, 60), ('email', 5, 300))
 def verify_registration_otp():
     """
     Verify Registration OTP (Step 2: OTP Verification & Final Login)
@@ -395,6 +392,8 @@ def verify_registration_otp():
         # refresh_token = create_refresh_token(identity=user.user_id , expires_delta = timedelta(days = 7))
         access_token = create_access_token(user.user_id, company_id)     
         refresh_token = create_refresh_token(user.user_id, company_id)
+        store_refresh_token(user.user_id, refresh_token)
+        db.session.commit()
         
         # Send confirmation email
         send_email(
@@ -432,6 +431,7 @@ REFRESH_TOKEN_SECRET=str(os.getenv('REFRESH_TOKEN_SECRET'))
 
 #user registration route
 @auth_bp.route('/register' , methods = ['POST'])
+@rate_limited(('ip', 10, 3600), ('email', 3, 3600))
 def register_user():
     """
     User Registration (Step 1: Create User & Send OTP)
@@ -480,7 +480,7 @@ def register_user():
 
     try:
         # Hash the password
-        hashed_password = bcrypt.generate_password_hash(user_password).decode('utf-8')
+        hashed_password = hash_password(user_password)
 
         # 1️⃣ Create the company
         new_company = Company(
@@ -543,5 +543,8 @@ def protected_route():
     }) , 200
 
 
-
-
+@auth_bp.route('/rate_limit_stats' , methods = ['GET'])
+@jwt_required
+@admin_required
+def rate_limit_stats():
+    return jsonify(rate_limiter.stats()) , 200
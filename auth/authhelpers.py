@@ -1,24 +1,34 @@
 from datetime import datetime, timedelta
 from functools import wraps
+import hashlib
 import os
+import threading
+import time
+import uuid
 
+from cachetools import LRUCache
 from flask import request
 from flask import jsonify
 import jwt
 
+from utils.ingest import parse_uploads
 
 ACCESS_TOKEN_SECRET=str(os.getenv('ACCESS_TOKEN_SECRET'))
 REFRESH_TOKEN_SECRET=str(os.getenv('REFRESH_TOKEN_SECRET'))
 
 
+access_token_expiry_time=timedelta(minutes=30)
 refresh_token_expiry_time=timedelta(days=7)
 
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 10000))
 
 
 def create_access_token(user_id, company_id):
-    expiration = datetime.utcnow() + timedelta(minutes=30)  # expires in 10 sec
+    now = datetime.utcnow()
+    # iat and jti let a single token, or all of a user's tokens issued before a point, be revoked
     return jwt.encode(
-        {'user_id': user_id, 'company_id': company_id, 'exp': expiration},
+        {'user_id': user_id, 'company_id': company_id, 'exp': now + access_token_expiry_time,
+         'iat': now, 'jti': uuid.uuid4().hex},
         ACCESS_TOKEN_SECRET,
         algorithm='HS256'
     )
@@ -26,7 +36,8 @@ def create_access_token(user_id, company_id):
 
 def create_refresh_token(user_id,company_id):
     expiration = datetime.utcnow() + timedelta(days=7)  # Refresh token expires in 7 days
-    return jwt.encode({'user_id': user_id,'company_id':company_id, 'exp': expiration}, REFRESH_TOKEN_SECRET, algorithm='HS256')
+    # jti keeps two tokens issued in the same second distinct (they are stored by digest)
+    return jwt.encode({'user_id': user_id,'company_id':company_id, 'exp': expiration, 'jti': uuid.uuid4().hex}, REFRESH_TOKEN_SECRET, algorithm='HS256')
 
 
 def decode_jwt(jwt_token, secret_key):
@@ -44,6 +55,73 @@ def decode_jwt(jwt_token, secret_key):
 
 
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of access tokens whose signature was already verified,
+    keyed by the token's sha256 and holding its claims. Clients resend the
+    same token for its whole life, so most requests skip the HMAC check
+    and JSON decode. An entry is never served past the token's exp.
+    """
+
+    def __init__(self, maxsize=JWT_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._entries = LRUCache(maxsize=maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def put(self, token, claims):
+        exp = claims.get('exp')
+        if not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._entries[hashlib.sha256(token.encode()).digest()] = (exp, claims)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "maxsize": self._entries.maxsize}
+
+
+verified_tokens = VerifiedTokenCache()
+# claims -> True if the token was revoked; replaced by utils.token_revocation at startup
+_revocation_check = lambda claims: False
+
+
+def set_revocation_check(check):
+    """Installs the callable deciding whether verified claims were revoked. It runs on every request, so it must not query the database."""
+    global _revocation_check
+    _revocation_check = check
+
+
+def verify_access_token(token):
+    """Claims of a valid, unrevoked access token, or {"message": ...} like decode_jwt."""
+    payload = verified_tokens.get(token)
+    if payload is None:
+        payload = decode_jwt(token, ACCESS_TOKEN_SECRET)
+        if 'message' in payload:
+            return payload
+        verified_tokens.put(token, payload)
+    if _revocation_check(payload):
+        return {"message": "Token has been revoked"}
+    return payload
+
+
 def jwt_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -51,9 +129,9 @@ def jwt_required(f):
         if not auth_header or not auth_header.startswith("Bearer "):
             return jsonify({"error": "Authorization header is missing or invalid"}), 401
 
-        token = auth_header.split(" ")[1]
+        token = auth_header[7:]
         try:
-            payload = decode_jwt(token, ACCESS_TOKEN_SECRET)
+            payload = verify_access_token(token)
             
             # Check for token validation errors
             if 'message' in payload:
@@ -72,6 +150,7 @@ def jwt_required(f):
         except Exception as e:
             return jsonify({"error": str(e)}), 401
 
+        parse_uploads()
         return f(*args, **kwargs)
     return decorated_function
 
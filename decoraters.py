@@ -1,12 +1,18 @@
 # decorators.py
 from functools import wraps
 from flask import request, jsonify, g
-from models import db, Permission, UserRole, RolePermission
+from sqlalchemy import or_
+from models import db, Role, UserRole
+from utils.permission_cache import permission_cache
+
+ADMIN_ROLE_NAME = "Administrator"
 
 def has_permission(permission_name):
     """
     A decorator to check if a user has a specific permission.
     It assumes the user's ID is available in the 'X-User-ID' header.
+    Permissions are resolved through the shared permission cache, so a warm
+    check does not touch the database.
     """
     def decorator(f):
         @wraps(f)
@@ -16,27 +22,44 @@ def has_permission(permission_name):
             if not user_id:
                 return jsonify({"error": "Unauthorized: User not identified"}), 401
 
-            # 2. Get the roles associated with the user
-            user_roles = db.session.query(UserRole.role_id).filter_by(user_id=user_id).all()
-            if not user_roles:
-                return jsonify({"error": "Forbidden: User has no roles"}), 403
-
-            role_ids = [r[0] for r in user_roles]
+            company_id = getattr(request, 'current_company_id', None) or request.headers.get('X-Company-ID')
 
-            # 3. Find the required permission by name
-            required_permission = Permission.query.filter_by(name=permission_name).first()
-            if not required_permission:
-                return jsonify({"error": f"Permission '{permission_name}' not found"}), 500
-
-            # 4. Check if any of the user's roles have the required permission
-            has_access = db.session.query(RolePermission).filter(
-                RolePermission.role_id.in_(role_ids),
-                RolePermission.permission_id == required_permission.id
-            ).first()
+            # 2. Get the compiled permission set for the user's roles
+            has_roles, permissions = permission_cache.get(user_id, company_id)
+            if not has_roles:
+                return jsonify({"error": "Forbidden: User has no roles"}), 403
 
-            if not has_access:
+            # 3. Check if any of the user's roles have the required permission
+            if permission_name not in permissions:
+                if not permission_cache.permission_exists(permission_name):
+                    return jsonify({"error": f"Permission '{permission_name}' not found"}), 500
                 return jsonify({"error": f"Forbidden: You do not have the '{permission_name}' permission"}), 403
 
             return f(*args, **kwargs)
         return decorated_function
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+def admin_required(f):
+    """
+    A decorator that only lets users holding the Administrator role through.
+    Goes below jwt_required, which sets request.current_user_id and
+    request.current_company_id from the verified token.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id = getattr(request, 'current_user_id', None)
+        if not user_id:
+            return jsonify({"error": "Unauthorized: User not identified"}), 401
+
+        query = db.session.query(UserRole.user_role_id).join(
+            Role, Role.role_id == UserRole.role_id
+        ).filter(UserRole.user_id == user_id, Role.role_name == ADMIN_ROLE_NAME)
+        company_id = getattr(request, 'current_company_id', None)
+        if company_id:
+            query = query.filter(or_(UserRole.company_id == company_id, UserRole.company_id.is_(None)))
+        if query.first() is None:
+            return jsonify({"error": "Forbidden: Administrator role required"}), 403
+
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,87 @@
+"""store refresh tokens by digest
+
+Revision ID: 2531c31c2ca7
+Revises: 9f800d5a5891
+Create Date: 2026-10-18 16:00:10.514065
+
+user_tokens.token held refresh tokens in plain text. This revision adds
+token_digest, fills it with the sha256 hex digest of every stored token
+(the same value utils.user_tokens.token_digest computes), then makes it
+NOT NULL and drops the plain-text column, so existing sessions keep
+working.
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2531c31c2ca7'
+down_revision = '9f800d5a5891'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+user_tokens = sa.table(
+    'user_tokens',
+    sa.column('token_id', sa.String(100)),
+    sa.column('token', sa.String(500)),
+    sa.column('token_digest', sa.String(64)),
+)
+
+
+def _fill_token_digests():
+    bind = op.get_bind()
+    if bind.dialect.name == 'mysql':
+        op.execute("UPDATE user_tokens SET token_digest = SHA2(token, 256) WHERE token_digest IS NULL")
+        return
+    # No SHA2() elsewhere (e.g. SQLite): hash in Python, a batch at a time
+    while True:
+        rows = bind.execute(
+            sa.select(user_tokens.c.token_id, user_tokens.c.token)
+            .where(user_tokens.c.token_digest.is_(None))
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        bind.execute(
+            user_tokens.update()
+            .where(user_tokens.c.token_id == sa.bindparam('b_token_id'))
+            .values(token_digest=sa.bindparam('b_token_digest')),
+            [{'b_token_id': token_id, 'b_token_digest': hashlib.sha256(token.encode()).hexdigest()}
+             for token_id, token in rows],
+        )
+
+
+def upgrade():
+    with op.batch_alter_table('otp_codes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_otp_codes_expires_at'), ['expires_at'], unique=False)
+
+    with op.batch_alter_table('user_tokens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_digest', sa.String(length=64), nullable=True))
+
+    _fill_token_digests()
+
+    with op.batch_alter_table('user_tokens', schema=None) as batch_op:
+        batch_op.alter_column('token_digest', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_index(batch_op.f('ix_user_tokens_expires_at'), ['expires_at'], unique=False)
+        batch_op.create_unique_constraint('uq_user_tokens_user_digest', ['user_id', 'token_digest'])
+        batch_op.drop_column('token')
+
+
+def downgrade():
+    # A digest cannot be turned back into its token, so the stored refresh
+    # tokens are dropped and their users have to sign in again
+    op.execute(user_tokens.delete())
+
+    with op.batch_alter_table('user_tokens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token', sa.String(length=500), nullable=False))
+        batch_op.create_unique_constraint('uq_user_tokens_token', ['token'])
+        batch_op.drop_constraint('uq_user_tokens_user_digest', type_='unique')
+        batch_op.drop_index(batch_op.f('ix_user_tokens_expires_at'))
+        batch_op.drop_column('token_digest')
+
+    with op.batch_alter_table('otp_codes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_otp_codes_expires_at'))
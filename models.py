@@ -152,6 +152,33 @@ class Tasks(db.Model):
     # requires_site_visit = db.Column(db.Boolean, nullable=True, default=False)
     space_id = db.Column(db.String(50), db.ForeignKey('spaces.space_id'), nullable=True)
 
+    # Keyset pagination indexes for the task listing: every filter column leads,
+    # followed by the (updated_at, task_id) sort key so the page is an index range scan.
+    __table_args__ = (
+        db.Index('ix_tasks_company_updated', 'company_id', 'updated_at', 'task_id'),
+        db.Index('ix_tasks_company_project_updated', 'company_id', 'project_id', 'updated_at', 'task_id'),
+        db.Index('ix_tasks_company_space_updated', 'company_id', 'space_id', 'updated_at', 'task_id'),
+        db.Index('ix_tasks_company_status_updated', 'company_id', 'status', 'updated_at', 'task_id'),
+        db.Index('ix_tasks_company_priority_updated', 'company_id', 'priority', 'updated_at', 'task_id'),
+        db.Index('ix_tasks_company_assignee_updated', 'company_id', 'assigned_to', 'updated_at', 'task_id'),
+        db.Index('ix_tasks_company_due_date', 'company_id', 'due_date'),
+    )
+
+class ProjectStats(db.Model):
+    # Rollup of per-project counters, maintained by utils.project_stats
+    __tablename__ = 'project_stats'
+    project_id = db.Column(db.String(50), db.ForeignKey('projects.project_id', ondelete='CASCADE'), primary_key=True)
+    total_tasks = db.Column(db.Integer, nullable=False, default=0)
+    completed_tasks = db.Column(db.Integer, nullable=False, default=0)
+    task_status_counts = db.Column(db.JSON, nullable=True) # {"completed": 3, "pending": 5, ...}
+    space_count = db.Column(db.Integer, nullable=False, default=0)
+    drawing_count = db.Column(db.Integer, nullable=False, default=0)
+    file_count = db.Column(db.Integer, nullable=False, default=0)
+    file_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    logged_hours = db.Column(db.Float, nullable=False, default=0)
+    estimated_hours = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
+
 class Projectvendor(db.Model):
     __tablename__ = 'project_vendor'
     project_vendor_id = db.Column(db.String(50) , primary_key = True , default = generate_uuid)
@@ -178,7 +205,7 @@ class OtpCode(db.Model):
     user_id = db.Column(db.String(64) , db.ForeignKey("user.user_id") , nullable=False , default = generate_uuid)
     otp_code = db.Column(db.String(64), nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     is_used = db.Column(db.Boolean, nullable=False, default=False)
     attempts = db.Column(db.Integer, nullable=False, default=0)
     type = db.Column(db.String(50), nullable=True)
@@ -199,6 +226,8 @@ class Boards(db.Model):
     space_id = db.Column(db.String(50) , db.ForeignKey('spaces.space_id') , nullable = True)
     # project_id = db.Column(db.String(50) , db.ForeignKey('projects.project_id') , nullable = True)
     inspiration_id = db.Column(db.String(50), db.ForeignKey('inspiration.inspiration_id') , nullable = True)
+    pins_synced_at = db.Column(db.DateTime, nullable=True) # last mirror of the Pinterest board's pins, see utils.pinterest_sync
+    pins_full_synced_at = db.Column(db.DateTime, nullable=True) # last sync that paged through every bookmark
     
 
 
@@ -228,6 +257,11 @@ class RolePermission(db.Model):
 
 class Pin(db.Model):
     __tablename__ = 'pins'
+    __table_args__ = (
+        # A Pinterest pin is mirrored once per local board it was imported into
+        db.UniqueConstraint('board_id', 'pinterest_pin_id', name='uq_pins_board_pinterest_pin'),
+        db.Index('ix_pins_board_pinterest_created', 'board_id', 'pinterest_created_at', 'pin_id'),
+    )
     pin_id = db.Column(db.String(64), primary_key=True, default=generate_uuid)
     board_id = db.Column(db.String(50), db.ForeignKey('boards.board_id'), nullable=True)
     pin_type = db.Column(db.String(50), nullable=True)
@@ -236,11 +270,13 @@ class Pin(db.Model):
     position_y = db.Column(db.Integer, nullable=True)
     # created_by = db.Column(db.String(50), db.ForeignKey('user.user_id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    pinterest_pin_id = db.Column(db.String(50), unique=True, nullable=True, index=True) # The external ID from Pinterest
+    pinterest_pin_id = db.Column(db.String(50), nullable=True, index=True) # The external ID from Pinterest
     image_url = db.Column(db.Text, nullable=True)
     title = db.Column(db.Text, nullable=True)
     link = db.Column(db.Text, nullable=True)
     space_id = db.Column(db.String(50) , db.ForeignKey('spaces.space_id') , nullable = True)
+    pinterest_created_at = db.Column(db.DateTime, nullable=True) # Pinterest's created_at; mirrored pins are listed newest first by it
+    media = db.Column(db.JSON, nullable=True) # Pinterest's media object (image renditions) as last synced
 
 
 
@@ -346,6 +382,90 @@ class Upload_Files(db.Model):
     pin_id = db.Column(db.String(64), db.ForeignKey('pins.pin_id'), nullable = True)
     project_id = db.Column(db.String(50), db.ForeignKey('projects.project_id'), nullable = True) 
     task_id = db.Column(db.String(50) , db.ForeignKey('tasks.task_id') , nullable = True)
+    blob_digest = db.Column(db.String(64), db.ForeignKey('file_blobs.digest'), nullable=True, index=True) # NULL for files stored before the blob store
+    derivatives = db.Column(db.JSON(none_as_null=True), nullable=True) # thumbnail/preview renditions of images, see utils.derivatives
+
+
+class FileBlob(db.Model):
+    # Content-addressed file body shared by every Upload_Files row with the same digest,
+    # maintained by utils.file_store
+    __tablename__ = 'file_blobs'
+    digest = db.Column(db.String(64), primary_key=True) # sha256 hex of the file contents
+    backend = db.Column(db.String(20), nullable=False, default='local') # see utils.storage_backends
+    storage_path = db.Column(db.String(500), nullable=False) # path (local) or object key (s3) within the backend
+    size = db.Column(db.BigInteger, nullable=False, default=0) # bytes
+    content_type = db.Column(db.String(255), nullable=True) # sniffed from the leading bytes on upload
+    derivatives = db.Column(db.JSON, nullable=True) # {"thumbnail": {"webp": path, "jpeg": path, "width": .., "height": ..}, "preview": {...}}
+    tiles = db.Column(db.JSON(none_as_null=True), nullable=True) # Deep Zoom pyramid of drawing images, see utils.tiles
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class UploadSession(db.Model):
+    # Resumable (chunked) upload in progress; the file is assembled under uploads/tmp
+    __tablename__ = 'upload_sessions'
+    upload_id = db.Column(db.String(50), primary_key=True, default=generate_uuid)
+    user_id = db.Column(db.String(50), db.ForeignKey('user.user_id'), nullable=True)
+    company_id = db.Column(db.String(50), db.ForeignKey('companies.company_id'), nullable=True)
+    owner_type = db.Column(db.String(50), nullable=False) # see utils.storage.UPLOAD_OWNER_COLUMNS
+    owner_id = db.Column(db.String(64), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    temp_path = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending') # pending / completed
+    file_id = db.Column(db.String(40), nullable=True) # Upload_Files row created on completion
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class UploadSessionChunk(db.Model):
+    # One row per received chunk, so parallel chunk PUTs never update the same row
+    __tablename__ = 'upload_session_chunks'
+    upload_id = db.Column(db.String(50), db.ForeignKey('upload_sessions.upload_id', ondelete='CASCADE'), primary_key=True)
+    chunk_index = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    size = db.Column(db.Integer, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class EmailJob(db.Model):
+    # Outbound email waiting for (or done with) delivery by the email worker, see utils.email_queue
+    __tablename__ = 'email_jobs'
+    __table_args__ = (db.Index('ix_email_jobs_status_run_after', 'status', 'run_after'),)
+    job_id = db.Column(db.String(50), primary_key=True, default=generate_uuid)
+    recipients = db.Column(db.JSON, nullable=False) # list of addresses
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued / sending / sent / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # next attempt not before this
+    locked_by = db.Column(db.String(100), nullable=True) # worker holding the job while status is 'sending'
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ImageFetch(db.Model):
+    # Remote image (Pinterest pin, inspiration URL) to copy into the blob store, see utils.image_fetch
+    __tablename__ = 'image_fetches'
+    __table_args__ = (
+        db.Index('ix_image_fetches_status_created', 'status', 'created_at'),
+        db.Index('ix_image_fetches_owner', 'owner_type', 'owner_id'),
+    )
+    fetch_id = db.Column(db.String(50), primary_key=True, default=generate_uuid)
+    owner_type = db.Column(db.String(30), nullable=False) # 'pin' or 'inspiration', as in utils.storage
+    owner_id = db.Column(db.String(64), nullable=False)
+    url = db.Column(db.Text, nullable=False)
+    url_hash = db.Column(db.String(64), nullable=False, index=True) # sha256 of url; fetched urls are reused by it
+    status = db.Column(db.String(20), nullable=False, default='pending') # pending / done / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    blob_digest = db.Column(db.String(64), nullable=True) # no FK: the blob may be collected once its uploads are gone
+    file_id = db.Column(db.String(40), nullable=True) # Upload_Files row holding the local copy
+    last_error = db.Column(db.Text, nullable=True)
+    fetched_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 # --- NEW: Team Membership Association Table ---
@@ -527,11 +647,29 @@ class SiteMap(db.Model):
 
 class UserToken(db.Model):
     __tablename__ = 'user_tokens'
+    __table_args__ = (
+        # Refresh and logout probe (user_id, token_digest); user-wide revocation uses the prefix
+        db.UniqueConstraint('user_id', 'token_digest', name='uq_user_tokens_user_digest'),
+    )
     token_id = db.Column(db.String(100), primary_key=True, default=generate_uuid)
     user_id = db.Column(db.String(50), db.ForeignKey('user.user_id'), nullable=False)
-    token = db.Column(db.String(500) , unique = True , nullable = False)
+    token_digest = db.Column(db.String(64), nullable=False)  # hex sha256 of the refresh token; the token itself is not stored
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class RevokedToken(db.Model):
+    """
+    Access tokens revoked before their exp: one token (jti) or every token
+    of a user issued before revoked_before. Loaded into each process's
+    deny-set; rows are useless, and swept, once expires_at has passed.
+    """
+    __tablename__ = 'revoked_tokens'
+    revocation_id = db.Column(db.String(50), primary_key=True, default=generate_uuid)
+    user_id = db.Column(db.String(50), nullable=False)  # no FK: must outlive a deleted user's row
+    jti = db.Column(db.String(64), nullable=True)
+    revoked_before = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
 
 class Pinterest(db.Model):
     __tablename__ = 'pinterest_tokens'
@@ -564,13 +702,14 @@ class Invite(db.Model):
     email = db.Column(db.String(255), nullable=False, index=True)
     company_id = db.Column(db.String(50), db.ForeignKey("companies.company_id"), nullable=True)
     created_by_user_id = db.Column(db.String(50), db.ForeignKey("user.user_id"), nullable=True)
-    raw_token_id = db.Column(db.String(100), nullable=True)  # short id shown in link (optional)
-    token_hash = db.Column(db.String(128), nullable=False)  # hex of sha256(salt + raw_token)
+    raw_token_id = db.Column(db.String(100), nullable=True)  # first 8 chars of a pre-selector token; NULL for new invites
+    selector = db.Column(db.String(32), unique=True, index=True, nullable=True)  # public half of "<selector>.<verifier>", see utils.invites
+    token_hash = db.Column(db.String(128), nullable=False)  # hex of sha256(salt + verifier)
     salt = db.Column(db.String(32), nullable=False)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     accepted = db.Column(db.Boolean, default=False)
     accepted_by_user_id = db.Column(db.String(50), db.ForeignKey("user.user_id"), nullable=True)
-    accepted_at = db.Column(db.DateTime, nullable=True)
+    accepted_at = db.Column(db.DateTime, nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     single_use = db.Column(db.Boolean, default=True)
     role_id = db.Column(db.String(50), db.ForeignKey('roles.role_id'), nullable=True)
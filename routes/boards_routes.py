@@ -7,7 +7,7 @@ from datetime import datetime , timedelta
 from flask_cors import CORS
 import logging
 import json
-from .upload_files_routes import upload_board_files , update_board_files
+from utils.storage import attach_files , replace_files
 from auth.authhelpers import jwt_required
 import requests
 
@@ -40,7 +40,8 @@ def _serialize_board(board):
             "file_id" : file.file_id,
             "filename":file.filename,
             "file_size":file.file_size,
-            "file_path":file.file_path
+            "file_path":file.file_path,
+            "derivatives":file.derivatives
         }
         board_dict["files"].append(file_dict)
     
@@ -89,7 +90,8 @@ def get_all_boards():
                     "file_id" : file.file_id,
                     "filename":file.filename,
                     "file_size":file.file_size,
-                    "file_path":file.file_path
+                    "file_path":file.file_path,
+                    "derivatives":file.derivatives
                 }
                 board_dict["files"].append(file_dict)
             all_boards.append(board_dict)
@@ -145,6 +147,7 @@ def get_board_by_id(board_id):
                 "file_id":file.file_id,
                 "filename":file.filename,
                 "file_path":file.file_path,
+                "derivatives":file.derivatives,
                 "file_size":file.file_size
             }
             board_dict["files"].append(file_dict)
@@ -208,7 +211,7 @@ def add_board():
     try:
         db.session.add(new_board)
         db.session.flush()
-        upload_board_files(attachments,new_board.board_id)
+        attach_files('board', new_board.board_id, attachments)
 
         db.session.commit()
     except Exception as e:
@@ -297,7 +300,7 @@ def update_board(board_id):
         if attachments or files_to_delete:
             if attachments or files_to_delete:
                 board.revision_number = (board.revision_number or 0) + 1
-            update_board_files(board.board_id, attachments, files_to_delete)
+            replace_files('board', board.board_id, attachments, files_to_delete)
         db.session.commit()
         updated_board = Boards.query.get(board_id)
         if not updated_board:
@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify, current_app
 from models import Upload_Files, db, Drawings ,Spaces # Assuming your models are in 'your_app_module'
 import logging
-from .upload_files_routes import upload_drawing_files , update_drawing_files
+from utils.storage import attach_files , replace_files
+from utils.storage_backends import UPLOAD_FOLDER, get_storage_backend
+from utils.tiles import drawing_tile_source, level_grid, tile_locator
+from routes.upload_files_routes import IMMUTABLE_MAX_AGE, send_upload
+from werkzeug.utils import send_file
 from flask_jwt_extended import jwt_required , get_jwt_identity , create_access_token , create_refresh_token
 from datetime import datetime , timedelta
 import os
@@ -179,7 +183,7 @@ def update_drawing_by_id(drawing_id):
             drawing.revision_number = (drawing.revision_number or 0) + 1
             
             # Call your file utility function
-            update_drawing_files(attachments, drawing.drawing_id, files_to_delete)
+            replace_files('drawing', drawing.drawing_id, attachments, files_to_delete)
         
         # Commit all changes 
         db.session.commit()
@@ -328,7 +332,7 @@ def update_drawing_by_space_id_handler(space_id):
             drawing.revision_number = (drawing.revision_number or 0) + 1
             
             # Call your file utility function
-            update_drawing_files(attachments, drawing.drawing_id, files_to_delete)
+            replace_files('drawing', drawing.drawing_id, attachments, files_to_delete)
         
         # Commit all changes 
         db.session.commit()
@@ -393,7 +397,7 @@ def create_drawing():
         db.session.add(new_drawing)
         db.session.flush()
         # db.session.commit()
-        upload_drawing_files(attachments, new_drawing.drawing_id)
+        attach_files('drawing', new_drawing.drawing_id, attachments)
         db.session.commit()
         return jsonify({
             "message": "Drawing and file uploaded successfully", 
@@ -508,7 +512,7 @@ def update_drawing_by_space_id(space_id):
             drawing.revision_number = (drawing.revision_number or 0) + 1
             
             # Call your file utility function
-            update_drawing_files(attachments, drawing.drawing_id, files_to_delete)
+            replace_files('drawing', drawing.drawing_id, attachments, files_to_delete)
         
         # Commit all changes 
         db.session.commit()
@@ -581,4 +585,78 @@ def delete_drawing_by_space_id(space_id):
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error deleting drawing {drawing_id} in space {space_id}: {e}")
-        return jsonify({"error": "Failed to delete drawing"}), 500
\ No newline at end of file
+        return jsonify({"error": "Failed to delete drawing"}), 500
+
+
+# --- Deep-zoom tiles ---
+# GET /api/drawings/<drawing_id>/tiles            -> pyramid size and tile_url template
+# GET /api/drawings/<drawing_id>/tiles/<z>/<x>/<y>?v=<digest>  (cached as immutable)
+
+@drawings_bp.route('/<string:drawing_id>/tiles', methods=['GET'])
+@jwt_required
+def get_drawing_tiles(drawing_id):
+    """
+    Describes the Deep Zoom pyramid of the drawing's latest image (or of
+    ?file_id=...). Answers 202 while the pyramid is still being built.
+    """
+    if db.session.get(Drawings, drawing_id) is None:
+        return jsonify({"error": "Drawing not found"}), 404
+    source = drawing_tile_source(drawing_id, file_id=request.args.get('file_id'))
+    if source is None:
+        return jsonify({"error": "Drawing has no image file to tile"}), 404
+
+    upload, blob = source
+    if not blob.tiles:
+        return jsonify({"file_id": upload.file_id, "status": "processing"}), 202
+    return jsonify({
+        "file_id": upload.file_id,
+        "status": "ready",
+        "version": blob.digest,
+        "width": blob.tiles['width'],
+        "height": blob.tiles['height'],
+        "tile_size": blob.tiles['tile_size'],
+        "overlap": blob.tiles['overlap'],
+        "format": blob.tiles['format'],
+        "max_level": blob.tiles['max_level'],
+        "tile_url": f"/api/drawings/{drawing_id}/tiles/{{z}}/{{x}}/{{y}}?v={blob.digest}",
+    }), 200
+
+
+@drawings_bp.route('/<string:drawing_id>/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+@jwt_required
+def get_drawing_tile(drawing_id, z, x, y):
+    """
+    Serves one tile. With ?v=<digest> the URL names a single revision's
+    tile, so it is cached as immutable; without it the latest revision is
+    served and revalidated.
+    """
+    version = request.args.get('v')
+    source = drawing_tile_source(drawing_id, file_id=request.args.get('file_id'), digest=version)
+    if source is None or not source[1].tiles:
+        return jsonify({"error": "Tile not found"}), 404
+
+    blob = source[1]
+    if not 0 <= z <= blob.tiles['max_level']:
+        return jsonify({"error": "Tile not found"}), 404
+    columns, rows = level_grid(blob.tiles, z)
+    if not (0 <= x < columns and 0 <= y < rows):
+        return jsonify({"error": "Tile not found"}), 404
+
+    etag = f"sha256-{blob.digest}-{z}-{x}-{y}"
+    if version:
+        cache_control = f"private, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        cache_control = "private, no-cache"
+    path = tile_locator(blob, z, x, y)
+    backend = get_storage_backend(blob.backend)
+    if backend.name == 'local':
+        response = send_upload(os.path.relpath(path, UPLOAD_FOLDER), etag, cache_control)
+    elif backend.exists(path):
+        response = send_file(backend.open(path), request.environ, mimetype=f"image/{blob.tiles['format']}",
+                             conditional=True, etag=etag, response_class=current_app.response_class)
+        response.headers['Cache-Control'] = cache_control
+    else:
+        response = None
+    if response is None:
+        return jsonify({"error": "Tile not found"}), 404
+    return response
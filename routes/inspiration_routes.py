@@ -1,6 +1,6 @@
 from flask import Blueprint , jsonify , request , current_app
 from models import db , Inspiration , Upload_Files , User , Pin , Boards , Pinterest
-from .upload_files_routes import upload_inspiration_files , update_inspiration_files
+from utils.storage import attach_files , replace_files
 from flask_jwt_extended import jwt_required , get_jwt_identity , create_access_token , create_refresh_token
 import logging
 import json
@@ -13,33 +13,17 @@ import requests
 import io
 from auth.auth import jwt_required
 from utils.email_utils import send_email
+from utils.file_store import release_legacy_file
+from utils.pinterest_client import PinterestAPIError, rate_limit_headers
+from utils.pinterest_sync import ensure_board_synced, mirrored_pins_page, page_size_arg, serialize_mirrored_pin
+from utils.image_fetch import ImageFetchError, check_url, queue_image_fetch
 
 inspiration_bp = Blueprint('Inspiration' , __name__)
 
+logger = logging.getLogger(__name__)
+
 CORS(inspiration_bp)
 
-def download_url_to_filestorage(url, filename="external_image"):
-    """Downloads an image from a URL and converts it into a FileStorage object."""
-    # (Implementation copied from previous answer)
-    try:
-        response = requests.get(url, stream=True, timeout=10)
-        response.raise_for_status()
-        
-        content_type = response.headers.get('Content-Type', 'image/jpeg')
-        ext = '.' + content_type.split('/')[-1] if 'image/' in content_type else '.jpg'
-        
-        file_data = io.BytesIO(response.content)
-        
-        return FileStorage(
-            stream=file_data,
-            filename=filename + ext,
-            content_type=content_type,
-            name='uploads'
-        )
-    except requests.exceptions.RequestException as e:
-        current_app.logger.error(f"Error downloading external URL {url}: {e}")
-        return None
-    
 def _serialize_inspiration(inspiration):
     """Helper function to serialize an Inspiration object into a dictionary, including its files."""
     insp_dict = {
@@ -58,6 +42,7 @@ def _serialize_inspiration(inspiration):
             "file_id": file.file_id,
             "filename": file.filename,
             "file_path": file.file_path,
+            "derivatives": file.derivatives,
             "file_size": file.file_size
         })
     return insp_dict
@@ -72,6 +57,34 @@ def _serialize_pin(pin, board_name):
         "link": pin.link
     }
 
+def _pinterest_error_response(e, note):
+    """Turns a PinterestAPIError from a board's first sync into the endpoints' error response."""
+    if e.status_code is None:
+        # Handle network issues, timeouts, etc.
+        return jsonify({
+            "error": "Network or connection error while connecting to Pinterest.",
+            "details": str(e)
+        }), 500
+    return jsonify({
+        "error": "Failed to fetch pins from Pinterest API.",
+        "http_status_code": e.status_code,
+        "api_details": e.details,
+        "note": note
+    }), e.status_code, rate_limit_headers(e)
+
+def _mirrored_board_pins(board, bookmark=None):
+    """
+    One page of a board's pins from the local mirror (see utils.pinterest_sync),
+    syncing the board first if it has never been mirrored. `page_size` is
+    read from the query string. Returns (pins, next bookmark). Raises
+    ValueError on bad paging arguments and PinterestAPIError if the first
+    sync fails.
+    """
+    page_size = page_size_arg(request.args)
+    ensure_board_synced(board)
+    pins, next_bookmark = mirrored_pins_page(board.board_id, bookmark, page_size)
+    return [serialize_mirrored_pin(pin, board.pinterest_board_id) for pin in pins], next_bookmark
+
 
 @inspiration_bp.route('/get/all_pins_and_inspirations', methods=['GET'])
 @jwt_required
@@ -176,6 +189,7 @@ def get_all_inspirations():
                     "file_id":file.file_id , 
                     "filename":file.filename,
                     "file_path":file.file_path,
+                    "derivatives":file.derivatives,
                     "file_size":file.file_size
                 }
                 insp_dict["files"].append(file_dict)
@@ -250,6 +264,7 @@ def get_inspiration_by_id(inspiration_id):
                 "file_id" : file.file_id , 
                 "filename" : file.filename , 
                 "file_path" : file.file_path , 
+                "derivatives" : file.derivatives ,
                 "file_size":file.file_size
             }
             insp_dict["files"].append(file_dict)
@@ -327,6 +342,7 @@ def get_inspirations_by_space_id(space_id):
                     "file_id": file.file_id,
                     "filename": file.filename,
                     "file_path": file.file_path,
+                    "derivatives": file.derivatives,
                     "file_size": file.file_size
                 })
             all_insp.append(insp_dict)
@@ -376,7 +392,7 @@ def create_inspiration():
         in: formData
         type: string
         required: false
-        description: External image URL to download.
+        description: External image URL; copied into storage in the background after the inspiration is created.
     responses:
       201:
         description: Inspiration and file uploaded successfully.
@@ -420,24 +436,11 @@ def create_inspiration():
         ])
     
     if has_url:
-        downloaded_file = download_url_to_filestorage(
-            external_url, 
-            filename=data.get('title', 'external_insp')
-        )
-        if downloaded_file:
-            files_to_process.append(downloaded_file)
-            processed_file_info.append({
-                "filename": downloaded_file.filename, 
-                "source": "url", 
-                "url": external_url,
-                "mime_type": downloaded_file.mimetype
-            })
-        else:
-            return jsonify({"error": "Failed to download image from the provided URL."}), 400
-        #     files_to_process.append(downloaded_file)
-        #     # message_detail = f"URL downloaded and stored ({external_url})"
-        # else:
-        #     return jsonify({"error": "Failed to download image from the provided URL."}), 400
+        # The image is downloaded by the fetch pool once the inspiration is committed
+        try:
+            check_url(external_url)
+        except ImageFetchError as e:
+            return jsonify({"error": str(e)}), 400
 
     # 2. FIX TAGS DATA TYPE: Form data comes as strings.
     # If the database expects a comma-separated string, we can use the form data directly.
@@ -459,7 +462,10 @@ def create_inspiration():
         
         # Now the helper can safely use new_inspiration.inspiration_id
         # Assuming upload_inspiration_files is defined and handles child record creation
-        upload_inspiration_files(files_to_process, new_inspiration.inspiration_id)
+        attach_files('inspiration', new_inspiration.inspiration_id, files_to_process)
+        if has_url:
+            fetch_id = queue_image_fetch(db.session, 'inspiration', new_inspiration.inspiration_id, external_url)
+            processed_file_info.append({"source": "url", "url": external_url, "status": "pending", "fetch_id": fetch_id})
         
         # ✅ FIX: Perform ONE single, atomic commit for both the Inspiration record and file records.
         db.session.commit()
@@ -716,11 +722,11 @@ def update_inspiration(inspiration_id):
         
         if file_action_requested:
             # Call the helper function to handle I/O and DB updates for files
-            update_inspiration_files(files, inspiration_id, files_to_delete) 
+            replace_files('inspiration', inspiration_id, files, files_to_delete) 
 
         
         # --- C. Commit & Full Response ---
-        # Commit the metadata changes (file changes are typically committed inside the helper)
+        # Commit the metadata and file changes together
         db.session.commit()
         
         # 🔑 FIX: Re-read the object to get the latest file relationships
@@ -827,7 +833,7 @@ def update_inspirations_by_space_id_with_files(space_id):
                 return jsonify({"error": f"Inspiration ID '{inspiration_id}' not found in Space ID '{space_id}'."}), 404
             
             # Call the dedicated file update handler
-            update_inspiration_files(files, inspiration_id, files_to_delete)
+            replace_files('inspiration', inspiration_id, files, files_to_delete)
             
             files_action_message = f"File changes applied to Inspiration ID {inspiration_id} ({len(files)} new file(s), {len(files_to_delete)} deleted)."
 
@@ -935,9 +941,8 @@ def delete_inspirations_by_space_id(space_id):
                 # Construct the full path if file_path is relative
                 # full_file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], file_path) 
                 
-                # Assuming file_path is the correct server path for demonstration:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                # Blob-store files are shared and removed with their last reference
+                release_legacy_file(upload)
                 # Catch case where file is already gone but record exists
                 # NOTE: You may need a logger here to track failures
                 # --- END Physical File Deletion Logic ---
@@ -1073,12 +1078,10 @@ def get_board_pins():
     space_id = board_entry.space_id
     inspiration_id = board_entry.inspiration_id
 
-    # 2. 🔑 Fetch Pinterest token from local DB
+    # 2. 🔑 Check the Pinterest account is connected (its token is used by the board's sync)
     pinterest_auth = Pinterest.query.filter_by(company_id=company_id).first()
     if not pinterest_auth or not pinterest_auth.access_token:
         return jsonify({"error": "Pinterest account not connected or token missing."}), 403
-
-    pinterest_token = pinterest_auth.access_token
     
     # 🌟 CHANGE APPLIED HERE: Using the new field 'pinterest_board_id' from the board_entry object
     # This ID is the one used in the Pinterest API URL.
@@ -1087,45 +1090,18 @@ def get_board_pins():
     if not pinterest_board_id:
          return jsonify({"error": "Pinterest board ID is missing in the database entry."}), 500
 
-    # 3. 📤 Call Pinterest API
-    # 🌟 CHANGE APPLIED HERE: Using the new variable name 'pinterest_board_id'
-    api_url = f"https://api.pinterest.com/v5/boards/{pinterest_board_id}/pins"
-    headers = {
-        "Authorization": f"Bearer {pinterest_token}",
-        "Accept": "application/json"
-    }
-
+    # 3. 📤 Serve the page from the local mirror of the board, kept current by `flask sync-pinterest-pins`
     try:
-        response = requests.get(api_url, headers=headers)
-        response.raise_for_status() # Raises an HTTPError for bad responses (4xx or 5xx)
-
-    except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code
-        try:
-            error_details = e.response.json()
-        except requests.exceptions.JSONDecodeError:
-            # Fallback for non-JSON error response
-            error_details = {"message": e.response.text}
-
-        # 4. ❌ Handle Pinterest API Errors
+        pins, next_bookmark = _mirrored_board_pins(board_entry, request.args.get('bookmark'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except PinterestAPIError as e:
+        # 4. ❌ Handle Pinterest API Errors of the board's first sync
         # Specifically target the 404/403 errors that cause the "Board not found"
-        return jsonify({
-            "error": "Failed to fetch pins from Pinterest API.",
-            "http_status_code": status_code,
-            "api_details": error_details,
-            "note": "A 'Board not found' error often means the board ID is invalid or inaccessible (e.g., deleted, private, or the wrong format - ensure it is the correct numeric/UUID Pinterest ID)."
-        }), status_code
-    
-    except requests.exceptions.RequestException as e:
-        # Handle network issues, timeouts, etc.
-        return jsonify({
-            "error": "Network or connection error while connecting to Pinterest.",
-            "details": str(e)
-        }), 500
+        return _pinterest_error_response(e, "A 'Board not found' error often means the board ID is invalid or inaccessible (e.g., deleted, private, or the wrong format - ensure it is the correct numeric/UUID Pinterest ID).")
 
 
     # 5. ✅ Success Response
-    pinterest_data = response.json()
     return jsonify({
         # 🌟 CHANGE APPLIED HERE: Returning 'pinterest_board_id' in the response
         "inspiration_id": local_board_id,
@@ -1134,8 +1110,8 @@ def get_board_pins():
         "local_board_id": local_board_id,
         "pinterest_board_id": board_entry.pinterest_board_id, 
         "board_name": board_entry.board_name, # Assuming this is still correct
-        "pins": pinterest_data.get("items", []),
-        "bookmark": pinterest_data.get("bookmark") # Include bookmark for pagination if needed
+        "pins": pins,
+        "bookmark": next_bookmark # Pass back as ?bookmark= for the next page
     }), 200
 
 # --- End of API Endpoint Definition ---
@@ -1246,68 +1222,37 @@ def get_board_pins_by_id(inspiration_id):
     project_id = board_entry.project_id
     space_id = board_entry.space_id
 
-    # 2. 🔑 Fetch Pinterest token from local DB
+    # 2. 🔑 Check the Pinterest account is connected (its token is used by the board's sync)
     pinterest_auth = Pinterest.query.filter_by(company_id=company_id).first()
     if not pinterest_auth or not pinterest_auth.access_token:
         return jsonify({"error": "Pinterest account not connected or token missing."}), 403
-
-    pinterest_token = pinterest_auth.access_token
     pinterest_board_id = board_entry.pinterest_board_id 
     
     if not pinterest_board_id:
          return jsonify({"error": "Pinterest board ID is missing in the database entry."}), 500
 
-    # 3. 📤 Call Pinterest API
-    api_url = f"https://api.pinterest.com/v5/boards/{pinterest_board_id}/pins"
-    headers = {
-        "Authorization": f"Bearer {pinterest_token}",
-        "Accept": "application/json"
-    }
-
+    # 3. 📤 Serve the page from the local mirror of the board
     try:
-        # The 'response' object is defined here
-        response = requests.get(api_url, headers=headers)
-        response.raise_for_status() # Check for HTTP errors (4xx/5xx)
-
-        # 5. ✅ Success Response (Move success logic here, inside the try block)
-        pinterest_data = response.json()
-        
-        return jsonify({
-            # Contextual IDs
-            "inspiration_id": inspiration_id,
-            "project_id": project_id, # Added back
-            "space_id": space_id, # Added back
-            
-            # Pinterest Data
-            "pinterest_board_id": board_entry.pinterest_board_id, 
-            "board_name": board_entry.board_name,
-            "pins": pinterest_data.get("items", []),
-            "bookmark": pinterest_data.get("bookmark")
-        }), 200
-
-    except requests.exceptions.HTTPError as e:
-        # 4. ❌ Handle Pinterest API HTTP Errors
-        status_code = e.response.status_code
-        try:
-            error_details = e.response.json()
-        except requests.exceptions.JSONDecodeError:
-            error_details = {"message": e.response.text}
-
-        return jsonify({
-            "error": "Failed to fetch pins from Pinterest API.",
-            "http_status_code": status_code,
-            "api_details": error_details,
-            "note": "Board not found or inaccessible."
-        }), status_code
-    
-    except requests.exceptions.RequestException as e:
-        # Handle network issues, timeouts, etc.
-        return jsonify({
-            "error": "Network or connection error while connecting to Pinterest.",
-            "details": str(e)
-        }), 500
+        pins, next_bookmark = _mirrored_board_pins(board_entry, request.args.get('bookmark'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except PinterestAPIError as e:
+        # 4. ❌ Handle Pinterest API Errors of the board's first sync
+        return _pinterest_error_response(e, "Board not found or inaccessible.")
 
-    # No need for any code here, as the try/except blocks handle all returns.
+    # 5. ✅ Success Response
+    return jsonify({
+        # Contextual IDs
+        "inspiration_id": inspiration_id,
+        "project_id": project_id, # Added back
+        "space_id": space_id, # Added back
+
+        # Pinterest Data
+        "pinterest_board_id": board_entry.pinterest_board_id,
+        "board_name": board_entry.board_name,
+        "pins": pins,
+        "bookmark": next_bookmark
+    }), 200
 
 
 
@@ -1415,24 +1360,26 @@ def get_board_pins_by_space_id(space_id):
             "error": "Pinterest account not connected."
         }), 403
 
-    headers = {
-        "Authorization": f"Bearer {pinterest_auth.access_token}",
-        "Accept": "application/json"
-    }
+    try:
+        page_size = page_size_arg(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     results = []
 
+    # First page of each board from the local mirror only; boards page on via
+    # /inspiration/<inspiration_id>?bookmark=. A board never mirrored yet is
+    # reported as pending and synced by the sync-pinterest-pins worker, so
+    # this request makes no Pinterest calls however many boards the space has.
     for board in board_entries:
         if not board.pinterest_board_id:
             continue
-
-        pins_url = f"https://api.pinterest.com/v5/boards/{board.pinterest_board_id}/pins"
-        response = requests.get(pins_url, headers=headers)
-
-        if response.status_code != 200:
-            continue
-
-        pinterest_data = response.json()
+        if board.pins_synced_at is None:
+            pins, next_bookmark, sync_status = [], None, "pending"
+        else:
+            pins, next_bookmark = mirrored_pins_page(board.board_id, None, page_size)
+            pins = [serialize_mirrored_pin(pin, board.pinterest_board_id) for pin in pins]
+            sync_status = "synced"
 
         results.append({
             "inspiration_id": board.inspiration_id,
@@ -1440,8 +1387,10 @@ def get_board_pins_by_space_id(space_id):
             "space_id": space_id,
             "pinterest_board_id": board.pinterest_board_id,
             "board_name": board.board_name,
-            "pins": pinterest_data.get("items", []),
-            "bookmark": pinterest_data.get("bookmark")
+            "pins": pins,
+            "bookmark": next_bookmark,
+            "sync_status": sync_status,
+            "synced_at": board.pins_synced_at.isoformat() if board.pins_synced_at else None
         })
 
     return jsonify({
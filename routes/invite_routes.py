@@ -7,19 +7,21 @@ import uuid
 import logging
 from flask_cors import CORS
 from utils.email_utils import send_email
+from utils.invites import create_invites, find_invite, MAX_INVITES_PER_REQUEST
 import os
 import secrets
 import hashlib
 from auth.auth import jwt_required
+from utils.permission_cache import permission_cache
 from functools import wraps
 from utils.email_utils import send_email
-from flask_bcrypt import Bcrypt
+from utils.passwords import hash_password
+from utils.token_revocation import revoke_user_tokens
 from datetime import timedelta
 from werkzeug.security import generate_password_hash, check_password_hash 
 
 invite_bp = Blueprint('Invite' , __name__)
 CORS(invite_bp)
-bcrypt = Bcrypt()
 
 
 # ... imports and setup ...
@@ -43,103 +45,37 @@ def send_invite():
     
     if not emails or not isinstance(emails, list):
         return jsonify({"error": "A list of emails is required"}), 400
+    if len(emails) > MAX_INVITES_PER_REQUEST:
+        return jsonify({"error": f"At most {MAX_INVITES_PER_REQUEST} emails can be invited per request"}), 400
 
-    invite_links = []
-    successful_sends = []
-    failed_sends = []
-    already_registered = []
-
-    expiry_time = datetime.utcnow() + timedelta(hours=72)
-
-    for email in emails:
-        # Assuming you have access to the User model here.
-        existing_user = User.query.filter_by(user_email=email, company_id=company_id).first()
-        if existing_user:
-            already_registered.append(email)
-            logging.warning(f"Invite skipped: {email} is already a user in company {company_id}.")
-            continue
-
-        active_invite = Invite.query.filter_by(
-            email=email, 
-            company_id=company_id, 
-            single_use=True
-        ).filter(Invite.expires_at > datetime.utcnow()).first()
-
-        if active_invite:
-             # Just resend the existing invite link if it's still valid
-            raw_token = active_invite.raw_token_id # Fetch token ID to reconstruct link
-            token_hash = active_invite.token_hash
-            salt = active_invite.salt
-            invite_link = f"http://localhost:5173/invite/accept?token={raw_token}"
-            logging.info(f"Using existing active invite for {email}")
-
-            invite = active_invite  # Reuse existing invite
-
-        else:
-            raw_token = secrets.token_urlsafe(16)
-            salt = secrets.token_hex(16)
-            token_hash = hashlib.sha256((salt + raw_token).encode()).hexdigest()
-        
-        # 1. Prepare the invite link
-        invite_link = f"http://localhost:5173/invite/accept?token={raw_token}"
-
-        invite = Invite(
-            email=email,
-            company_id=company_id,
-            created_by_user_id=created_by_user_id, 
-            raw_token_id=raw_token[:8],
-            token_hash=token_hash,
-            salt=salt,
-            expires_at=expiry_time,
-            single_use=True
-        )
-
-        db.session.add(invite)
-        
-        # 2. Add the link to the response list
-        invite_links.append({"email": email, "invite_link": invite_link})
-
-        # 3. *** ADDED: Logic to send the email ***
-        try:
-            subject = "You've been invited to join Architect's App!"
-            # You should use an HTML template in a real app, but this is a simple text body
-            body = f"Hello,\n\nYou have been invited to join a company on Architect App. Click the link below to accept the invitation and set up your account:\n\n{invite_link}\n\nThis link will expire in 72 hours."
-            
-            # Assuming send_email(recipient, subject, body) is the correct signature
-            send_email(
-                recipients=[email], # Changed from (email, subject, body)
-                subject=subject,
-                body=body
-            )
-            successful_sends.append({
-                "email": email,
-                "invite_link": invite_link,
-                "company_id": company_id
-            })
-            logging.info(f"Invite email successfully queued for {email}")
-
-        except Exception as e:
-            failed_sends.append(email)
-            # Log the error, but continue processing other emails
-            logging.error(f"FATAL: Failed to send invite email to {email} - Error: {e}")
-
+    def build_email(email, invite_link):
+        subject = "You've been invited to join Architect's App!"
+        # You should use an HTML template in a real app, but this is a simple text body
+        body = f"Hello,\n\nYou have been invited to join a company on Architect App. Click the link below to accept the invitation and set up your account:\n\n{invite_link}\n\nThis link will expire in 72 hours."
+        return subject, body
 
     try:
-        # Commit all invites to the database *after* attempting to send emails
+        # Invites and their emails are written together; the email worker delivers them
+        results = create_invites(emails, company_id, created_by_user_id, build_email)
         db.session.commit()
     except Exception as e:
-        # Handle database commit error (e.g., rollback)
         logging.error(f"Database commit failed after processing invites: {e}")
         db.session.rollback()
-        return jsonify({"error": "Failed to save invites to database after email attempts."}), 500
-
+        return jsonify({"error": "Failed to save invites to database."}), 500
+
+    successful_sends = [
+        {"email": r["email"], "invite_link": r["invite_link"], "company_id": company_id}
+        for r in results if r["status"] in ("invited", "reinvited")
+    ]
+    failed_sends = [r["email"] for r in results if r["status"] == "invalid"]
+    already_registered = [r["email"] for r in results if r["status"] == "already_registered"]
     
     # 4. Refine the final response to include status
     response_message = "Invites processed."
     if successful_sends:
-        response_message += f" Successfully sent {len(successful_sends)} emails."
+        response_message += f" Queued {len(successful_sends)} emails."
     if failed_sends:
-        response_message += f" Failed to send {len(failed_sends)} emails."
+        response_message += f" Skipped {len(failed_sends)} invalid emails."
     if already_registered:
         response_message += f" Skipped {len(already_registered)} emails (users already registered)."
 
@@ -148,7 +84,8 @@ def send_invite():
         "invite_links": [s['invite_link'] for s in successful_sends],
         "successful_sends": successful_sends,
         "failed_sends": failed_sends,
-        "already_registered": already_registered
+        "already_registered": already_registered,
+        "results": results
     }), 201
 
 
@@ -158,17 +95,12 @@ def validate_invite():
     data = request.get_json()
     raw_token = data.get("token")
 
-    invite = Invite.query.filter_by(raw_token_id=raw_token[:8]).first()
+    # Selector lookup + constant-time verifier check
+    invite = find_invite(raw_token)
 
     if not invite:
         return jsonify({"error": "Invalid invite"}), 400
 
-    # Validate hash
-    computed_hash = hashlib.sha256((invite.salt + raw_token).encode()).hexdigest()
-
-    if computed_hash != invite.token_hash:
-        return jsonify({"error": "Invalid token"}), 400
-
     if datetime.utcnow() > invite.expires_at:
         return jsonify({"error": "Invite expired"}), 400
 
@@ -190,15 +122,10 @@ def register_from_invite():
     if not all([raw_token, name, password]):
         return jsonify({"error": "Missing required fields: token, name, and password"}), 400
 
-    invite = Invite.query.filter_by(raw_token_id=raw_token[:8]).first()
+    invite = find_invite(raw_token)
 
     if not invite:
-        return jsonify({"error": "Invalid invite or token prefix"}), 400
-    
-    computed_hash = hashlib.sha256((invite.salt + raw_token).encode()).hexdigest()
-
-    if computed_hash != invite.token_hash:
-        return jsonify({"error": "Invalid token signature"}), 400
+        return jsonify({"error": "Invalid invite"}), 400
 
     if datetime.utcnow() > invite.expires_at:
         return jsonify({"error": "Invite expired"}), 400
@@ -213,7 +140,7 @@ def register_from_invite():
         # Mark invite as accepted/used even if a user somehow got created outside the flow
         invite.single_use = False
         invite.accepted = True
-        invite.accepted_by_user_id = user.user_id
+        invite.accepted_by_user_id = existing_user.user_id
         invite.accepted_at = datetime.utcnow()
         db.session.commit()
         return jsonify({"message": "Account already exists and invite marked as used."}), 409
@@ -225,7 +152,7 @@ def register_from_invite():
         user_name=name,
         user_email=invite.email,
         company_id=invite.company_id,
-        user_password=bcrypt.generate_password_hash(password).decode("utf-8"),
+        user_password=hash_password(password),
         is_active=True
     )
     db.session.add(user)
@@ -372,6 +299,7 @@ def grant_admin():
     # Grant admin
     target_user.is_admin = True
     db.session.commit()
+    permission_cache.invalidate_user(target_user.user_id)
 
     return jsonify({"message": f"Admin rights granted to {target_user.user_name}"}), 200
 
@@ -436,7 +364,9 @@ def revoke_access():
         }), 200
 
     target_user.is_active = False # Assuming 'is_active' is the field for access control
+    revoke_user_tokens(target_user.user_id)
     db.session.commit()
+    permission_cache.invalidate_user(target_user.user_id)
 
     return jsonify({
         "message": f"Access successfully revoked (user deactivated) for {target_user.user_name if target_user.user_name else target_user.user_email}"
@@ -576,102 +506,35 @@ def send_invite_with_role():
         return jsonify({"error": f"Role '{selected_role_name}' does not exist"}), 400
     
 
-    try:
-        # Get FRONTEND_BASE_URL from the Flask config
-        base_url = current_app.config.get("FRONTEND_BASE_URL")
-        if not base_url:
-             raise KeyError("FRONTEND_BASE_URL not configured")
-    except (RuntimeError, KeyError) as e:
-        # Fallback if current_app isn't available or key is missing
-        # NOTE: Using environment variables is the standard fallback for non-app contexts
-        import os
-        base_url = os.environ.get("FRONTEND_BASE_URL", "http://localhost:5173")
-        if str(e) == "FRONTEND_BASE_URL not configured":
-             print(f"WARNING: FRONTEND_BASE_URL not in config, falling back to {base_url}")
-        
-    # Standard cleanup for base_url (remove trailing slash if present)
-    base_url = base_url.rstrip("/")
-
-    invite_links = []
-    successful_sends = []
-    failed_sends = []
-    already_registered = []
-
-    expiry_time = datetime.utcnow() + timedelta(hours=72)
-    invites_to_commit = [] # List to hold Invite objects before final commit
-
-    for email in emails:
-        email = email.strip().lower() # Basic sanitization
-
-        # Check if user already exists in this company
-        existing_user = User.query.filter_by(user_email=email, company_id=company_id).first()
-        if existing_user:
-            already_registered.append(email)
-            continue
-
-        # Generate unique token, salt, and hash
-        raw_token = secrets.token_urlsafe(16)
-        salt = secrets.token_hex(16)
-        token_hash = hashlib.sha256((salt + raw_token).encode()).hexdigest()
-
-        invite_link = f"{base_url}/invite/accept?token={raw_token}"
-
-        # 4. Create Invite Object
-        # THIS IS WHERE role.role_id IS CORRECTLY ASSIGNED
-        invite = Invite(
-            email=email,
-            company_id=company_id,
-            created_by_user_id=created_by_user_id,
-            raw_token_id=raw_token[:8],
-            token_hash=token_hash,
-            salt=salt,
-            role_id=role.role_id,       # <—— Correctly saves the Role ID
-            expires_at=expiry_time,
-            single_use=True
-        )
+    if len(emails) > MAX_INVITES_PER_REQUEST:
+        return jsonify({"error": f"At most {MAX_INVITES_PER_REQUEST} emails can be invited per request"}), 400
+
+    def build_email(email, invite_link):
+        subject = "You've been invited!"
+        body = f"You were invited as '{selected_role_name}'. Click link:\n{invite_link}"
+        return subject, body
 
-        invites_to_commit.append(invite)
-
-        # 5. Send Email
-        try:
-            subject = "You've been invited!"
-            body = f"You were invited as '{selected_role_name}'. Click link:\n{invite_link}"
-
-            # Ensure send_email is properly implemented to handle SMTP errors
-            send_email(
-                recipients=[email],
-                subject=subject,
-                body=body
-            )
-            successful_sends.append({"email": email, "invite_link": invite_link})
-        except Exception as e:
-            # Catch specific email errors if possible, otherwise general Exception
-            failed_sends.append(email)
-            # Log the error (optional)
-            # print(f"Failed to send email to {email}: {e}")
-            
-    # Add all successfully created invites to the session (moved outside the loop for one block of work)
-    for invite in invites_to_commit:
-        # Only commit invites whose emails were attempted to be sent
-        if invite.email in [s['email'] for s in successful_sends]:
-             db.session.add(invite)
-        # OPTION: You might choose to add ALL invites and then manually mark those that failed email as 'pending' or 'failed_send' status if your model supported it.
-        # For simplicity, we only commit those that *successfully* sent an email.
-        
     try:
+        # Invites (with role.role_id) and their emails are written together; the email worker delivers them
+        results = create_invites(emails, company_id, created_by_user_id, build_email, role_id=role.role_id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         # Log the database error
+        logging.error(f"Database commit failed after processing invites: {e}")
         return jsonify({"error": "An internal database error occurred while saving invites."}), 500
 
 
     # 6. Final Response
     return jsonify({
         "message": "Invites processed.",
-        "successful_sends": successful_sends,
-        "failed_sends": failed_sends,
-        "already_registered": already_registered
+        "successful_sends": [
+            {"email": r["email"], "invite_link": r["invite_link"]}
+            for r in results if r["status"] in ("invited", "reinvited")
+        ],
+        "failed_sends": [r["email"] for r in results if r["status"] == "invalid"],
+        "already_registered": [r["email"] for r in results if r["status"] == "already_registered"],
+        "results": results
     }), 201
 
 
@@ -681,14 +544,10 @@ def validate_invite_with_role():
     data = request.get_json()
     raw_token = data.get("token")
 
-    invite = Invite.query.filter_by(raw_token_id=raw_token[:8]).first()
+    invite = find_invite(raw_token)
     if not invite:
         return jsonify({"error": "Invalid invite"}), 400
 
-    computed_hash = hashlib.sha256((invite.salt + raw_token).encode()).hexdigest()
-    if computed_hash != invite.token_hash:
-        return jsonify({"error": "Invalid token"}), 400
-
     if datetime.utcnow() > invite.expires_at:
         return jsonify({"error": "Invite expired"}), 400
 
@@ -710,13 +569,9 @@ def register_from_invite_with_role():
     name = data.get("name")
     password = data.get("password")
 
-    invite = Invite.query.filter_by(raw_token_id=raw_token[:8]).first()
+    invite = find_invite(raw_token)
     if not invite:
         return jsonify({"error": "Invalid invite"}), 400
-
-    computed_hash = hashlib.sha256((invite.salt + raw_token).encode()).hexdigest()
-    if computed_hash != invite.token_hash:
-        return jsonify({"error": "Invalid token"}), 400
     
     existing_user = User.query.filter_by(user_email=invite.email).first()
     if existing_user:
@@ -733,7 +588,7 @@ def register_from_invite_with_role():
         user_name=name,
         user_email=invite.email,
         company_id=invite.company_id,
-        user_password=bcrypt.generate_password_hash(password).decode("utf-8"),
+        user_password=hash_password(password),
         is_active=True,
         role_id=invite.role_id,
 
@@ -756,6 +611,7 @@ def register_from_invite_with_role():
     invite.accepted_by_user_id = user.user_id
 
     db.session.commit()
+    permission_cache.invalidate_user(user.user_id)
 
     role = Role.query.get(invite.role_id)
 
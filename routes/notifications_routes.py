@@ -3,6 +3,7 @@ from models import Notification, User, db , Projects ,ProjectAssignments , Tasks
 from datetime import datetime
 import uuid
 from flask_cors import CORS
+from utils.project_stats import get_project_stats
 
 notifications_bp = Blueprint('notifications', __name__)
 
@@ -125,17 +126,17 @@ def send_completion_notification(project_id):
         if not client_user_id:
             return jsonify({"error": "Client not assigned to this project"}), 404
         
-        # 2. Query all tasks for the project
-        tasks = Tasks.query.filter_by(project_id=project_id).all()
+        # 2. Read the task counters from the project_stats rollup
+        stats = get_project_stats([project_id]).get(project_id)
+        total_tasks = stats.total_tasks if stats else 0
         
-        if not tasks:
+        if not total_tasks:
             # Send notification that the project has no tasks yet
             message = f"Project '{project.project_name}' has been created but no tasks have been assigned yet."
             completion_percentage = 0
         else:
             # 3. Calculate completion status
-            total_tasks = len(tasks)
-            completed_tasks = sum(1 for task in tasks if task.status.lower() == 'completed')
+            completed_tasks = stats.completed_tasks
             completion_percentage = (completed_tasks / total_tasks) * 100
             
             # 4. Format the message
@@ -1,6 +1,5 @@
 from flask import Blueprint , jsonify , request
 from models import OtpCode,db , User
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import create_access_token
 from datetime import datetime , timedelta
 import random
@@ -9,10 +8,12 @@ from email.message import EmailMessage
 import smtplib
 import uuid
 from flask_cors import CORS
+from utils.rate_limit import check_rate_limits
 
 otp_bp = Blueprint('otp', __name__)
 CORS(otp_bp)
-bcrypt = Bcrypt()
+# Every OTP endpoint is throttled before it touches the database
+otp_bp.before_request(lambda: check_rate_limits('otp', (('ip', 20, 60), ('user', 5, 300), ('email', 5, 300))))
 
 # Helper function to send email
 def send_email(recipients, subject, body):
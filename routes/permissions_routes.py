@@ -3,6 +3,9 @@ from models import Permission, db , RolePermission
 import uuid
 import datetime
 from flask_cors import CORS
+from utils.permission_cache import permission_cache
+from auth.authhelpers import jwt_required
+from decoraters import admin_required
 
 permissions_bp = Blueprint('permissions', __name__)
 
@@ -49,6 +52,7 @@ def add_permission():
         new_permission = Permission(permission_name=permission_name)
         db.session.add(new_permission)
         db.session.commit()
+        permission_cache.invalidate_all()
         return jsonify({'message': 'Permission added successfully', 'permission_id': new_permission.permission_id}), 201
     except Exception as e:
         db.session.rollback()
@@ -65,6 +69,7 @@ def update_permission(permission_id):
             permission.permission_name = data['permission_name']
             
         db.session.commit()
+        permission_cache.invalidate_all()
         return jsonify({'message': 'Permission updated successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -104,6 +109,7 @@ def delete_permission(permission_id):
 
         db.session.delete(permission)
         db.session.commit()
+        permission_cache.invalidate_all()
 
         return jsonify({
             "message": "Permission deleted successfully",
@@ -136,6 +142,7 @@ def seed_permissions():
             created.append(p)
 
     db.session.commit()
+    permission_cache.invalidate_all()
     return jsonify({"created_permissions": created}), 201
 
 
@@ -161,8 +168,16 @@ def add_missing_permissions():
             created.append(permission_name)
 
     db.session.commit()
+    permission_cache.invalidate_all()
 
     return jsonify({
         "added_permissions": created,
         "already_exist": skipped
     }), 200
+
+
+@permissions_bp.route('/permissions/cache_stats', methods=['GET'])
+@jwt_required
+@admin_required
+def get_permission_cache_stats():
+    return jsonify(permission_cache.stats()), 200
@@ -2,17 +2,15 @@ from flask import Blueprint , jsonify , request , current_app
 import uuid
 from datetime import datetime
 from models import Pin, Boards, db , Upload_Files 
-from .upload_files_routes import upload_pin_files,update_pin_files
+from utils.storage import attach_files , replace_files
 import os
 from sqlalchemy.exc import IntegrityError 
 from flask_cors import CORS
 import requests
-from dotenv import load_dotenv
 import os
 import json
 
 
-load_dotenv()
 pins_bp = Blueprint("pins" , __name__)
 
 CORS(pins_bp)
@@ -100,6 +98,7 @@ def get_all_pins():
                     "file_id":file.file_id , 
                     "filename":file.filename , 
                     "file_path":file.file_path , 
+                    "derivatives":file.derivatives ,
                     "file_size":file.file_size
                 }
                 pin_dict['files'].append(file_dict)
@@ -137,6 +136,7 @@ def get_one_pin(pin_id):
                 "file_id":file.file_id , 
                 "filename":file.filename , 
                 "file_path":file.file_path , 
+                "derivatives":file.derivatives ,
                 "file_size":file.file_size
             }
             pin_dict["files"].append(file_dict)
@@ -177,7 +177,7 @@ def add_pin():
         # )
         db.session.add(new_pin)
         db.session.flush()
-        upload_pin_files(attachments , new_pin.pin_id)
+        attach_files('pin', new_pin.pin_id, attachments)
         db.session.commit()
         return jsonify({'message': 'Pin added successfully', 'pin_id': new_pin.pin_id , 
                         'file_location' : f"Processed {len(attachments)} file(s)"
@@ -233,7 +233,7 @@ def update_pin(pin_id):
         if attachments or files_to_delete:
             if attachments or files_to_delete:
                 pin.revision_number = (pin.revision_number or 0)+1
-            update_pin_files(attachments,pin_id,files_to_delete)
+            replace_files('pin', pin_id, attachments, files_to_delete)
         db.session.commit()
         return jsonify({
             "message": "Pin updated successfully.",
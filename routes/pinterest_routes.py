@@ -25,15 +25,15 @@ from flask_cors import CORS
 import requests
 import jwt
 from flask import Blueprint, request, jsonify, redirect, url_for, session, current_app
-from models import db, Pinterest
+from models import db, Pinterest, Boards
+from utils.pinterest_client import get_pinterest_client, PinterestAPIError, rate_limit_headers
+from utils.pinterest_tokens import get_access_token, refresh_access_token, forget_token, PinterestTokenError
+from utils.pinterest_sync import ensure_board_synced, mirrored_pins_page, page_size_arg, serialize_mirrored_pin
 from flask_login import current_user, login_required
 from flask import Blueprint, request, jsonify, redirect, url_for, session, current_app
 from flask_jwt_extended import get_jwt_identity
 
 
-app = Flask(__name__)
-
-
 
 
 # CORS(app, supports_credentials=True, origins=["http://localhost:5173"])
@@ -297,6 +297,7 @@ def save_user_pinterest_token(user_id, company_id, token_data):
         db.session.add(token_entry)
 
     db.session.commit()
+    forget_token(token_entry.pinterest_id)
 
 
 @pinterest_bp.route("/start", methods=["GET"])
@@ -800,49 +801,13 @@ def pinterest_callback():
 def refresh_pinterest_token(token_entry):
     """
     Given a Pinterest model instance with a refresh_token, attempt to refresh.
+    Concurrent calls for one account share a single refresh (see utils.pinterest_tokens).
     Returns (success: bool, new_access_token_or_none)
     """
-    from models import db  # local import to avoid circulars
-
-    if not getattr(token_entry, "refresh_token", None):
-        logger.warning("No refresh token present for user %s", getattr(token_entry, "user_id", "<unknown>"))
-        return False, None
-
-    payload = {
-        "grant_type": "refresh_token",
-        "refresh_token": token_entry.refresh_token,
-        # scope may be optional; include if you want:
-        # "scope": token_entry.scopes or "ads:read,pins:read,boards:read",
-    }
-
-    # Pinterest allows basic auth (client_id/client_secret) or header — use tuple auth for requests
     try:
-        resp = requests.post(TOKEN_URL, data=payload, auth=(PINTEREST_CLIENT_ID, PINTEREST_CLIENT_SECRET), timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.RequestException as exc:
-        logger.exception("Pinterest refresh token request failed")
-        return False, None
-
-    new_access = data.get("access_token")
-    if not new_access:
-        logger.error("Refresh token response did not include access_token")
-        return False, None
-
-    try:
-        token_entry.access_token = new_access
-        if data.get("refresh_token"):
-            token_entry.refresh_token = data.get("refresh_token")
-        expires_in = data.get("expires_in")
-        if isinstance(expires_in, (int, float)):
-            token_entry.expires_at = datetime.utcnow() + timedelta(seconds=int(expires_in))
-        else:
-            token_entry.expires_at = datetime.utcnow() + timedelta(seconds=3600)
-        db.session.commit()
-        return True, new_access
-    except Exception:
-        db.session.rollback()
-        logger.exception("Failed to update token entry after refresh")
+        return True, refresh_access_token(token_entry.pinterest_id)
+    except PinterestTokenError:
+        logger.exception("Pinterest token refresh failed for user %s", getattr(token_entry, "user_id", "<unknown>"))
         return False, None
 
 
@@ -868,25 +833,18 @@ def get_pinterest_me():
     if not token_entry:
         return jsonify({"error": "No Pinterest account linked. Please connect Pinterest."}), 404
 
-    access_token = token_entry.access_token
-
-    # Refresh token if missing or expiring in 5 minutes
-    if not token_entry.expires_in or datetime.datetime.utcnow() >= (token_entry.expires_in - timedelta(minutes=5)):
-        success, new_token = refresh_pinterest_token(token_entry)
-        if not success:
-            return jsonify({"error": "Token refresh failed. Please re-authenticate with Pinterest."}), 401
-        access_token = new_token
+    # Cached token, refreshed (once per account) if it is expiring in 5 minutes
+    try:
+        access_token = get_access_token(token_entry)
+    except PinterestTokenError:
+        return jsonify({"error": "Token refresh failed. Please re-authenticate with Pinterest."}), 401
 
     try:
-        resp = requests.get(
-            "https://api.pinterest.com/v5/user_account",
-            headers={"Authorization": f"Bearer {access_token}"},
-            timeout=10
-        )
-        resp.raise_for_status()
-        return jsonify(resp.json()), 200
+        return jsonify(get_pinterest_client().get("/user_account", access_token)), 200
 
-    except requests.RequestException as exc:
+    except PinterestAPIError as exc:
+        if exc.status_code == 429:
+            return jsonify({"error": "Pinterest rate limit reached, try again later."}), 429, rate_limit_headers(exc)
         return jsonify({"error": "Pinterest API request failed", "details": str(exc)}), 502
 
 
@@ -945,7 +903,7 @@ def exchange_code_manual():
         if record:
             record.access_token = access_token
             record.refresh_token = refresh_token or record.refresh_token
-            record.expires_at = expires_at
+            record.expires_in = expires_at
             record.scopes = scopes
             record.token_type = token_type
         else:
@@ -953,12 +911,13 @@ def exchange_code_manual():
                 user_id=user_id,
                 access_token=access_token,
                 refresh_token=refresh_token,
-                expires_at=expires_at,
+                expires_in=expires_at,
                 scopes=scopes,
                 token_type=token_type,
             )
             db.session.add(new_rec)
         db.session.commit()
+        forget_token((record or new_rec).pinterest_id)
     except Exception:
         db.session.rollback()
         logger.exception("Failed to save tokens (manual exchange)")
@@ -976,18 +935,19 @@ def get_pinterest_boards():
     if not token_entry:
         return jsonify({"error": "No Pinterest account linked"}), 404
 
-    access_token = token_entry.access_token
-
-    url = "https://api.pinterest.com/v5/boards"
-
-    resp = requests.get(url, headers={
-        "Authorization": f"Bearer {access_token}"
-    })
+    try:
+        access_token = get_access_token(token_entry)
+    except PinterestTokenError:
+        return jsonify({"error": "Token refresh failed. Re-authenticate."}), 401
 
-    if resp.status_code != 200:
-        return jsonify({"error": "Failed to fetch boards", "details": resp.text}), 400
+    try:
+        boards = get_pinterest_client().get("/boards", access_token)
+    except PinterestAPIError as exc:
+        if exc.status_code == 429:
+            return jsonify({"error": "Pinterest rate limit reached, try again later."}), 429, rate_limit_headers(exc)
+        return jsonify({"error": "Failed to fetch boards", "details": exc.details or str(exc)}), 400
 
-    return jsonify(resp.json())
+    return jsonify(boards)
 
 
 @pinterest_bp.route("/auth/pinterest", methods=["POST"])
@@ -1154,31 +1114,23 @@ def get_board_by_url():
     if not token_entry:
         return jsonify({"error": "No Pinterest account linked."}), 404
 
-    access_token = token_entry.access_token
-    # Assuming refresh_pinterest_token is available and works as defined
-    # if token_entry.expires_in and datetime.datetime.utcnow() >= (token_entry.expires_in - timedelta(minutes=5)):
-    #     success, access_token = refresh_pinterest_token(token_entry)
-    #     if not success:
-    #         return jsonify({"error": "Token refresh failed. Re-authenticate."}), 401
+    try:
+        access_token = get_access_token(token_entry)
+    except PinterestTokenError:
+        return jsonify({"error": "Token refresh failed. Re-authenticate."}), 401
 
-    headers = {"Authorization": f"Bearer {access_token}"}
-    
-    # --- 2. Lookup Board ID using URL ---
-    lookup_url = "https://api.pinterest.com/v5/boards/lookup"
-    lookup_params = {
-        "url": board_url,
-        "fields": "id"  # Only need the ID for the next step
-    }
+    client = get_pinterest_client()
 
+    # --- 2. Lookup Board ID using URL (cached, so repeated lookups stay in-process) ---
     try:
-        lookup_resp = requests.get(lookup_url, headers=headers, params=lookup_params, timeout=10)
-        lookup_resp.raise_for_status()
-        lookup_data = lookup_resp.json()
-    except requests.RequestException as exc:
+        lookup_data = client.lookup_board(access_token, board_url, fields="id")  # Only need the ID for the next step
+    except PinterestAPIError as exc:
         logger.error(f"Pinterest Board Lookup failed: {exc}")
+        if exc.status_code == 429:
+            return jsonify({"error": "Pinterest rate limit reached, try again later."}), 429, rate_limit_headers(exc)
         return jsonify({
             "error": "Failed to look up board ID from URL.", 
-            "details": lookup_resp.text if 'lookup_resp' in locals() else str(exc)
+            "details": exc.details or str(exc)
         }), 400
 
     board_id = lookup_data.get("id")
@@ -1188,21 +1140,18 @@ def get_board_by_url():
     # --- 3. Fetch Full Board Details using Board ID ---
     board_fields = "id,name,description,pin_count,follower_count,owner,created_at,privacy"
     
-    board_url_final = f"https://api.pinterest.com/v5/boards/{board_id}"
-    board_params_final = {"fields": board_fields}
-    
     try:
-        final_resp = requests.get(board_url_final, headers=headers, params=board_params_final, timeout=10)
-        final_resp.raise_for_status()
-        board_data = final_resp.json()
+        board_data = client.board(access_token, board_id, fields=board_fields)
         
         return jsonify(board_data), 200
 
-    except requests.RequestException as exc:
+    except PinterestAPIError as exc:
         logger.error(f"Pinterest Board Fetch failed for ID {board_id}: {exc}")
+        if exc.status_code == 429:
+            return jsonify({"error": "Pinterest rate limit reached, try again later."}), 429, rate_limit_headers(exc)
         return jsonify({
             "error": "Failed to fetch board details.", 
-            "details": final_resp.text if 'final_resp' in locals() else str(exc)
+            "details": exc.details or str(exc)
         }), 502
     
 
@@ -1229,41 +1178,40 @@ def import_pinterest_board():
     if not token_entry:
         return jsonify({"error": "No Pinterest account linked. Please connect Pinterest."}), 404
 
-    # Refresh token check (omitted here for brevity, but should be included as in /me)
-    access_token = token_entry.access_token 
+    # Refreshed (once per account) if expiring, as in /me
+    try:
+        access_token = get_access_token(token_entry)
+    except PinterestTokenError:
+        return jsonify({"error": "Token refresh failed. Please re-authenticate with Pinterest."}), 401
     
-    # --- 2. Lookup Board ID using URL (Pinterest API Step 1) ---
-    lookup_url = "https://api.pinterest.com/v5/boards/lookup"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    lookup_params = {"url": board_url, "fields": "id"}
+    client = get_pinterest_client()
 
+    # --- 2. Lookup Board ID using URL (Pinterest API Step 1, cached) ---
     try:
-        lookup_resp = requests.get(lookup_url, headers=headers, params=lookup_params, timeout=10)
-        lookup_resp.raise_for_status()
-        lookup_data = lookup_resp.json()
+        lookup_data = client.lookup_board(access_token, board_url, fields="id")
         
         pinterest_board_id = lookup_data.get("id")
         if not pinterest_board_id:
              return jsonify({"error": "Invalid board URL or board not found."}), 404
 
-    except requests.RequestException as exc:
-        logger.error(f"Pinterest Board Lookup failed: {exc}. Response: {lookup_resp.text}")
+    except PinterestAPIError as exc:
+        logger.error(f"Pinterest Board Lookup failed: {exc}. Response: {exc.details}")
+        if exc.status_code == 429:
+            return jsonify({"error": "Pinterest rate limit reached, try again later."}), 429, rate_limit_headers(exc)
         return jsonify({"error": "Failed to resolve board URL.", "details": str(exc)}), 502
 
     # --- 3. Fetch Board Metadata (Pinterest API Step 2) ---
     # Fetch full name and URL for saving
     board_fields = "id,name,url"
-    board_url_final = f"https://api.pinterest.com/v5/boards/{pinterest_board_id}"
-    board_params_final = {"fields": board_fields}
     
     try:
-        final_resp = requests.get(board_url_final, headers=headers, params=board_params_final, timeout=10)
-        final_resp.raise_for_status()
-        board_data = final_resp.json()
+        board_data = client.board(access_token, pinterest_board_id, fields=board_fields)
         board_name = board_data.get("name")
         board_canonical_url = board_data.get("url")
-    except requests.RequestException as exc:
+    except PinterestAPIError as exc:
         logger.error(f"Pinterest Board Fetch failed: {exc}")
+        if exc.status_code == 429:
+            return jsonify({"error": "Pinterest rate limit reached, try again later."}), 429, rate_limit_headers(exc)
         # Allow import even if metadata fetch fails, or return error
         return jsonify({"error": "Failed to fetch board metadata."}), 502
 
@@ -1390,8 +1338,9 @@ def import_pinterest_board():
 @jwt_required
 def get_pins_in_board(board_id):
     """
-    Retrieves all Pins in a specified Pinterest Board.
-    Requires 'boards:read' scope.
+    Retrieves a page of the Pins in a specified Pinterest Board.
+    Requires 'boards:read' scope. Boards the company has imported are read
+    from the local mirror; pass the returned 'bookmark' back for the next page.
     
     NOTE: In this version, company_id is expected as a query parameter.
     """
@@ -1427,26 +1376,39 @@ def get_pins_in_board(board_id):
     if not token_entry:
         return jsonify({"error": "Pinterest account not linked for this user/company combination"}), 404
 
-    # --- 3. Pinterest API Call ---
-    url = f"https://api.pinterest.com/v5/boards/{board_id}/pins"
-    headers = {"Authorization": f"Bearer {token_entry.access_token}"}
-
-    # Set page_size, and you might want to add pagination logic here later
-    params = { "page_size": 50 } 
+    try:
+        page_size = page_size_arg(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    bookmark = request.args.get('bookmark')
+    try:
+        access_token = get_access_token(token_entry)
+    except PinterestTokenError:
+        return jsonify({"error": "Token refresh failed. Re-authenticate."}), 401
 
+    # --- 3. Boards imported by the company are served from the local mirror ---
+    board = Boards.query.filter_by(company_id=company_id, pinterest_board_id=board_id).first()
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
-        resp.raise_for_status() # Raise an exception for HTTP error codes (4xx or 5xx)
-        return jsonify(resp.json()), resp.status_code
+        if board:
+            ensure_board_synced(board, access_token)
+            pins, next_bookmark = mirrored_pins_page(board.board_id, bookmark, page_size)
+            return jsonify({
+                "items": [serialize_mirrored_pin(pin, board_id) for pin in pins],
+                "bookmark": next_bookmark
+            }), 200
 
-    except requests.RequestException as exc:
+        # --- 4. Any other board is proxied to the Pinterest API ---
+        return jsonify(get_pinterest_client().board_pins(
+            access_token, board_id, bookmark=bookmark, page_size=page_size)), 200
+
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except PinterestAPIError as exc:
         # Handle errors during the external Pinterest API call
-        error_details = resp.text if 'resp' in locals() else str(exc)
-        status_code = resp.status_code if 'resp' in locals() else 500
         return jsonify({
             "error": "Failed to retrieve pins from Pinterest.",
-            "details": error_details
-        }), status_code
+            "details": exc.details or str(exc)
+        }), exc.status_code or 500, rate_limit_headers(exc)
     
 
 
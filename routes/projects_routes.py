@@ -6,6 +6,7 @@ from datetime import datetime, date # Import date for correct data type
 from flask_cors import CORS
 from flask_jwt_extended import  get_jwt_identity , create_access_token , create_refresh_token
 from auth.authhelpers import jwt_required
+from utils.project_stats import get_project_stats, serialize_project_stats
 
 projects_bp = Blueprint('projects', __name__)
 
@@ -74,6 +75,9 @@ def get_all_projects():
         #     project_id=project.project_id, 
         #     company_id=company_id
         # ).first_or_404(description=f"Project with ID {project.project_id} not found for this company.")
+
+        # Counters come from the project_stats rollup in one query for the whole page
+        stats_by_project = get_project_stats([project.project_id for project in projects])
         
         result = []
         for project in projects: # 'project' is now correctly defined in this loop scope
@@ -87,7 +91,8 @@ def get_all_projects():
                 'due_date': project.due_date.isoformat() if project.due_date else None,
                 'status': project.status or 'Not Started',
                 'updated_at': project.updated_at.isoformat() if project.updated_at else None,
-                'company_id':project.company_id
+                'company_id':project.company_id,
+                'stats': serialize_project_stats(stats_by_project.get(project.project_id))
             })
 
         # Return the full list of projects
@@ -168,15 +173,10 @@ def get_project_by_id(project_id):
             company_id=company_id
         ).first_or_404(description=f"Project with ID {project_id} not found for this company.")
         
-        # 2. Count related entities
-        spaces_count = Spaces.query.filter_by(project_id=project_id).count()
-
-        tasks_performed_count = Tasks.query.filter_by(
-            project_id=project_id,
-           # is_completed=True # Removed comment for clarity if this was meant to be active
-        ).count()
+        # 2. Read the related entity counts from the project_stats rollup
+        stats = get_project_stats([project_id]).get(project_id)
 
-        total_actions = tasks_performed_count + spaces_count
+        total_actions = (stats.total_tasks + stats.space_count) if stats else 0
 
         # 3. Prepare the response
         result = {
@@ -194,6 +194,7 @@ def get_project_by_id(project_id):
             'budget': project.budget,
             'updated_at': project.updated_at.isoformat() if project.updated_at else None,
             'total_actions_count': total_actions,
+            'stats': serialize_project_stats(stats),
             # Typo corrected: 'company_id' instead of 'compamy_id'
             "company_id": project.company_id, 
             # 'created_at': project.created_at.isoformat() if project.created_at else None
@@ -474,6 +475,7 @@ def get_projects_by_company(company_id):
             }), 200
 
         # 2. Serialize the projects
+        stats_by_project = get_project_stats([project.project_id for project in projects])
         result = []
         for project in projects:
             result.append({
@@ -485,7 +487,8 @@ def get_projects_by_company(company_id):
                 'due_date': project.due_date.isoformat() if project.due_date else None,
                 'status': project.status or 'Not Started',
                 'updated_at': project.updated_at.isoformat() if project.updated_at else None,
-                'company_id': project.company_id # Include the company_id for verification
+                'company_id': project.company_id, # Include the company_id for verification
+                'stats': serialize_project_stats(stats_by_project.get(project.project_id))
             })
 
         # 3. Return the list of projects
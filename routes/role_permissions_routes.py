@@ -4,6 +4,7 @@ from models import RolePermission, Role, Permission, db
 import uuid
 import datetime
 from flask_cors import CORS
+from utils.permission_cache import permission_cache
 
 role_permissions_bp = Blueprint('role_permissions', __name__)
 CORS(role_permissions_bp)
@@ -40,6 +41,7 @@ def add_role_permission():
                                         )
         db.session.add(new_assignment)
         db.session.commit()
+        permission_cache.invalidate_all()
         return jsonify({'message': 'Permission assigned to role successfully',
                         "role_id":role_id,
                         "permission_id":permission_id ,
@@ -133,6 +135,7 @@ def update_role_permission(assignment_id):
             assignment.permission_id = new_permission_id
 
         db.session.commit()
+        permission_cache.invalidate_all()
         return jsonify({'message': 'Assignment updated successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -145,6 +148,7 @@ def delete_role_permission(role_permission_id):
     try:
         db.session.delete(assignment)
         db.session.commit()
+        permission_cache.invalidate_all()
         return jsonify({'message': 'Permission revoked from role successfully'}), 200
     except Exception as e:
         db.session.rollback()
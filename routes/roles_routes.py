@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from models import Role, db
+from utils.permission_cache import permission_cache
 import uuid
 from datetime import datetime
 from flask_cors import CORS
@@ -78,6 +79,8 @@ def delete_role(role_id):
         # or has any permissions linked to it, to prevent a foreign key error.
         db.session.delete(role)
         db.session.commit()
+        # Every user holding the role loses its permissions
+        permission_cache.invalidate_all()
         return jsonify({'message': 'Role deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
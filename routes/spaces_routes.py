@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app
 from models import db, Spaces , Upload_Files , Drawings , Preset , Projects ,  Tasks , PresetSpace
-from .upload_files_routes import upload_space_files
+from utils.storage import attach_files , replace_files
 import logging
 import os
 from flask_cors import CORS
@@ -37,7 +37,8 @@ def serialize_space(space):
             'file_id': file.file_id,
             'filename': file.filename,
             'file_size': file.file_size,
-            'file_path': file.file_path
+            'file_path': file.file_path,
+            'derivatives': file.derivatives
         }
         space_dict['files'].append(file_dict)
     return space_dict
@@ -80,7 +81,8 @@ def get_all_spaces():
                 'file_id':file.file_id,
                 'filename':file.filename,
                 'file_size':file.file_size,
-                'file_path':file.file_path
+                'file_path':file.file_path,
+                'derivatives':file.derivatives
             }
             space_dict['files'].append(file_dict)
         all_spaces.append(space_dict)
@@ -142,6 +144,7 @@ def get_space_by_id(space_id):
                 'file_id':file.file_id,
                 'filename':file.filename , 
                 'file_path':file.file_path,
+                'derivatives':file.derivatives,
                 'file_size':file.file_size
             }
             space_dict['files'].append(file_dict)
@@ -245,7 +248,7 @@ def create_space():
         db.session.add(new_space)
         db.session.flush()
         # db.session.commit()
-        upload_space_files(attachments , new_space.space_id)
+        attach_files('space', new_space.space_id, attachments)
         db.session.commit()
         return jsonify(
             # "message": "Space created successfully", 
@@ -467,7 +470,7 @@ def update_space_by_project_id_with_files(project_id):
                 db.session.delete(file_to_delete)
 
         if attachments:
-            upload_space_files(attachments, space.space_id)
+            attach_files('space', space.space_id, attachments)
         
         db.session.commit()
         return jsonify(serialize_space(space)), 200
@@ -1,10 +1,12 @@
 from flask import Blueprint , jsonify , request , current_app
 from models import Tasks , db , Vendors , Upload_Files , Clients, Projects , User
 import datetime
-from  .upload_files_routes import upload_task_files , update_task_files
+from utils.storage import attach_files , replace_files
 import uuid
 import logging
 import json
+import base64
+from sqlalchemy import and_ , or_
 from utils.email_utils import send_email
 from flask_cors import CORS
 from auth.auth import jwt_required
@@ -17,110 +19,235 @@ CORS(tasks_bp)
 # Setup basic logging (Should typically be done in __init__.py or app.py)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO) 
-def serialize_task(task):
+def serialize_tasks(tasks):
     """
-    Converts a Tasks object to a dictionary, resolving foreign keys to names
-    and including associated file metadata.
+    Converts a list of Tasks objects to dictionaries in one batch.
+    Users, vendors, projects and files are loaded with a single IN query per
+    table and joined in memory, so the number of queries does not grow with
+    the number of tasks.
     """
-    
-    # Resolve Assigned User Name
-    assigned_user_name = None
-    if task.assigned_to:
-        user = User.query.get(task.assigned_to) 
-        assigned_user_name = user.user_name if user and hasattr(user, 'user_name') else task.assigned_to 
-
-    # Resolve Assigned Vendor Name
-    assigned_vendor_name = None
-    if getattr(task, 'assigned_vendor', None): # Use getattr for safety if column might be missing
-        vendor = Vendors.query.get(task.assigned_vendor)
-        assigned_vendor_name = vendor.vendor_name if vendor and hasattr(vendor, 'vendor_name') else task.assigned_vendor
-        
-    # Resolve Project Name
-    project_name = task.project_id
-    if task.project_id:
-        project = Projects.query.get(task.project_id)
-        project_name = project.project_name if project and hasattr(project, 'project_name') else task.project_id
-        
-    # Handle completion status field (if it exists)
-    completed_at_iso = task.completed_at.isoformat() if getattr(task, 'completed_at', None) else None
-
-    # Base Task Dictionary
-    task_dict = {
-        'task_id': task.task_id, 
-        'project_id': project_name, 
-        'task_name': task.task_name, 
-        'description': task.description, 
-        'assigned_to': assigned_user_name, 
-        'status': task.status, 
-        'task_type': task.task_type,
-        # 'date': task.date.isoformat() if isinstance(task.date, datetime.date) else str(task.date),
-        'date': task.date.isoformat() if task.date else None,
-        'due_date': task.due_date.isoformat()  if task.due_date else None,
-        'location':task.location,
-        'space_id': getattr(task, 'space_id', None),
-        'assigned_vendor': assigned_vendor_name,
-        'completed_at': completed_at_iso, # Added for completeness
-        'files': []
-    }
-    
-    # Get associated files (retained original logic)
-    find_uploads = Upload_Files.query.filter_by(task_id=task.task_id).all()
-    for file in find_uploads:
-        file_dict = {
+    if not tasks:
+        return []
+
+    user_ids = {task.assigned_to for task in tasks if task.assigned_to}
+    vendor_ids = {task.assigned_vendor for task in tasks if getattr(task, 'assigned_vendor', None)}
+    project_ids = {task.project_id for task in tasks if task.project_id}
+    task_ids = [task.task_id for task in tasks]
+
+    users_by_id = {}
+    if user_ids:
+        users_by_id = {user.user_id: user for user in User.query.filter(User.user_id.in_(user_ids)).all()}
+
+    vendors_by_id = {}
+    if vendor_ids:
+        vendors_by_id = {vendor.vendor_id: vendor for vendor in Vendors.query.filter(Vendors.vendor_id.in_(vendor_ids)).all()}
+
+    projects_by_id = {}
+    if project_ids:
+        projects_by_id = {project.project_id: project for project in Projects.query.filter(Projects.project_id.in_(project_ids)).all()}
+
+    files_by_task = {}
+    for file in Upload_Files.query.filter(Upload_Files.task_id.in_(task_ids)).all():
+        files_by_task.setdefault(file.task_id, []).append({
             'file_id': file.file_id, 
             'filename': file.filename, 
             'file_size': file.file_size, 
             'file_path': file.file_path
-        }
-        task_dict['files'].append(file_dict)
-        
-    return task_dict
+        })
+
+    all_tasks = []
+    for task in tasks:
+        # Resolve Assigned User Name
+        assigned_user_name = None
+        if task.assigned_to:
+            user = users_by_id.get(task.assigned_to)
+            assigned_user_name = user.user_name if user and hasattr(user, 'user_name') else task.assigned_to 
+
+        # Resolve Assigned Vendor Name
+        assigned_vendor_name = None
+        if getattr(task, 'assigned_vendor', None): # Use getattr for safety if column might be missing
+            vendor = vendors_by_id.get(task.assigned_vendor)
+            assigned_vendor_name = vendor.vendor_name if vendor and hasattr(vendor, 'vendor_name') else task.assigned_vendor
+
+        # Resolve Project Name
+        project_name = task.project_id
+        if task.project_id:
+            project = projects_by_id.get(task.project_id)
+            project_name = project.project_name if project and hasattr(project, 'project_name') else task.project_id
+
+        # Handle completion status field (if it exists)
+        completed_at_iso = task.completed_at.isoformat() if getattr(task, 'completed_at', None) else None
+
+        all_tasks.append({
+            'task_id': task.task_id, 
+            'project_id': project_name, 
+            'task_name': task.task_name, 
+            'description': task.description, 
+            'assigned_to': assigned_user_name, 
+            'status': task.status, 
+            'task_type': task.task_type,
+            'date': task.date.isoformat() if task.date else None,
+            'due_date': task.due_date.isoformat()  if task.due_date else None,
+            'location':task.location,
+            'space_id': getattr(task, 'space_id', None),
+            'assigned_vendor': assigned_vendor_name,
+            'completed_at': completed_at_iso, # Added for completeness
+            'files': files_by_task.get(task.task_id, [])
+        })
+
+    return all_tasks
+
+def serialize_task(task):
+    """
+    Converts a Tasks object to a dictionary, resolving foreign keys to names
+    and including associated file metadata.
+    """
+    return serialize_tasks([task])[0]
+TASKS_DEFAULT_PAGE_SIZE = 50
+TASKS_MAX_PAGE_SIZE = 200
+
+def encode_task_cursor(task):
+    """
+    Encodes the (updated_at, task_id) keyset of the last task on a page into an
+    opaque, URL-safe cursor string.
+    """
+    updated_at = task.updated_at.isoformat() if task.updated_at else None
+    raw = json.dumps([updated_at, task.task_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_task_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_task_cursor.
+    Returns: (updated_at or None, task_id)
+    Raises: ValueError if the cursor is malformed.
+    """
+    try:
+        updated_at, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        updated_at = datetime.fromisoformat(updated_at) if updated_at else None
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not task_id:
+        raise ValueError("Invalid cursor.")
+    return updated_at, task_id
+
+def parse_date_arg(name):
+    """Parses a YYYY-MM-DD query argument. Raises ValueError on bad input."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"'{name}' must be in YYYY-MM-DD format.")
+
 #get all tasks
 @tasks_bp.route('/tasks' , methods = ['GET'])
 @jwt_required
 def get_all_tasks():
     """
-    Retrieves all tasks along with their associated file metadata.
+    Retrieves one page of the current company's tasks, newest first.
+    Pagination is keyset based on (updated_at, task_id): pass the returned
+    next_cursor back as 'cursor' to fetch the following page.
     ---
     tags:
       - Tasks
+    parameters:
+      - {in: query, name: cursor, schema: {type: string}, description: Cursor returned by the previous page}
+      - {in: query, name: limit, schema: {type: integer, default: 50, maximum: 200}}
+      - {in: query, name: project_id, schema: {type: string}}
+      - {in: query, name: space_id, schema: {type: string}}
+      - {in: query, name: status, schema: {type: string}}
+      - {in: query, name: priority, schema: {type: string}}
+      - {in: query, name: assigned_to, schema: {type: string}, description: User ID of the assignee}
+      - {in: query, name: due_from, schema: {type: string, format: date}}
+      - {in: query, name: due_to, schema: {type: string, format: date}}
     responses:
       200:
-        description: A list of tasks retrieved successfully.
+        description: A page of tasks retrieved successfully.
         content:
           application/json:
             schema:
-              type: array
-              items:
-                type: object
-                properties:
-                  task_id: {type: string, description: Unique ID of the task}
-                  project_id: {type: string}
-                  task_name: {type: string}
-                  description: {type: string}
-                  status: {type: string, example: pending}
-                  task_type: {type: string}
-                  date: {type: string, format: date-time}
-                  location: {type: string}
-                  assigned_to: {type: string}
-                  files:
-                    type: array
-                    items:
-                      type: object
-                      properties:
-                        file_id: {type: string}
-                        filename: {type: string}
-                        file_size: {type: number}
-                        file_path: {type: string}
+              type: object
+              properties:
+                tasks:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      task_id: {type: string, description: Unique ID of the task}
+                      project_id: {type: string}
+                      task_name: {type: string}
+                      description: {type: string}
+                      status: {type: string, example: pending}
+                      task_type: {type: string}
+                      date: {type: string, format: date-time}
+                      location: {type: string}
+                      assigned_to: {type: string}
+                      files:
+                        type: array
+                        items:
+                          type: object
+                          properties:
+                            file_id: {type: string}
+                            filename: {type: string}
+                            file_size: {type: number}
+                            file_path: {type: string}
+                next_cursor: {type: string, nullable: true}
+                has_next: {type: boolean}
+      400:
+        description: Invalid cursor, limit or date filter.
       500:
         description: Internal server error.
     """
+    limit = request.args.get('limit' , TASKS_DEFAULT_PAGE_SIZE , type = int)
+    if limit < 1:
+        return jsonify({"error": "'limit' must be a positive integer."}), 400
+    limit = min(limit, TASKS_MAX_PAGE_SIZE)
+
+    try:
+        due_from = parse_date_arg('due_from')
+        due_to = parse_date_arg('due_to')
+        cursor = request.args.get('cursor')
+        after = decode_task_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
-        tasks = Tasks.query.all()
-        # Use the utility function to serialize all tasks consistently
-        all_tasks = [serialize_task(task) for task in tasks] 
-        return jsonify(all_tasks) , 200
+        query = Tasks.query.filter(Tasks.company_id == request.current_company_id)
+
+        for field in ('project_id', 'space_id', 'status', 'priority', 'assigned_to'):
+            value = request.args.get(field)
+            if value:
+                query = query.filter(getattr(Tasks, field) == value)
+        if due_from:
+            query = query.filter(Tasks.due_date >= due_from)
+        if due_to:
+            query = query.filter(Tasks.due_date <= due_to)
+
+        # Seek past the last row of the previous page instead of using OFFSET, so
+        # the cost of a page does not depend on how deep into the table it is.
+        # MySQL sorts NULL updated_at last in DESC order, so legacy rows without
+        # a timestamp form the tail of the listing.
+        if after:
+            after_updated_at, after_task_id = after
+            if after_updated_at is None:
+                query = query.filter(Tasks.updated_at.is_(None), Tasks.task_id < after_task_id)
+            else:
+                query = query.filter(or_(
+                    Tasks.updated_at < after_updated_at,
+                    and_(Tasks.updated_at == after_updated_at, Tasks.task_id < after_task_id),
+                    Tasks.updated_at.is_(None)
+                ))
+
+        tasks = query.order_by(Tasks.updated_at.desc(), Tasks.task_id.desc()).limit(limit + 1).all()
+        has_next = len(tasks) > limit
+        tasks = tasks[:limit]
+
+        return jsonify({
+            'tasks': serialize_tasks(tasks),
+            'next_cursor': encode_task_cursor(tasks[-1]) if has_next else None,
+            'has_next': has_next
+        }) , 200
     except Exception as e:
         logger.error(f"Error retrieving all tasks: {e}", exc_info=True)
         return jsonify({"error": str(e)}) , 500
@@ -247,7 +374,7 @@ def get_tasks_by_project_id(project_id):
         description: No tasks found for the project ID (though it returns 200/empty list in current code).
     """
     tasks = Tasks.query.filter_by(project_id = project_id).all()
-    all_tasks = [serialize_task(task) for task in tasks]
+    all_tasks = serialize_tasks(tasks)
     return jsonify(all_tasks) , 200
 
 
@@ -273,7 +400,7 @@ def get_tasks_by_space_id(space_id):
         description: No tasks found for the space ID.
     """
     tasks = Tasks.query.filter_by(space_id = space_id).all()
-    all_tasks = [serialize_task(task) for task in tasks]
+    all_tasks = serialize_tasks(tasks)
     return jsonify(all_tasks) , 200
 
 #post task
@@ -411,9 +538,15 @@ def add_tasks():
         
     attachments = request.files.getlist("uploads")
     logger.info("Detected %d file attachment(s).", len(attachments))
+    # Tasks are listed per company, so stamp the creator's company, or the project's when unauthenticated
+    company_id = getattr(request, 'current_company_id', None)
+    if not company_id and data.get('project_id'):
+        company_id = db.session.query(Projects.company_id).filter_by(project_id=data.get('project_id')).scalar()
+
     try:
         new_task = Tasks(
             project_id = data.get('project_id'),
+            company_id = company_id,
             task_name = data.get('task_name'),
             description = data.get('description'),
             status = data.get('status', 'pending'),
@@ -429,7 +562,7 @@ def add_tasks():
         db.session.add(new_task)
         db.session.flush()
         logger.info("Task created successfully in session with ID: %s", new_task.task_id)
-        upload_task_files(attachments , new_task.task_id)
+        attach_files('task', new_task.task_id, attachments)
         db.session.commit()
         return jsonify({'message':'Task added successfully',
                         'task_id':new_task.task_id , 
@@ -583,7 +716,7 @@ def update_task(task_id):
             # Increment revision number (assuming it exists)
             task.revision_number = (getattr(task, 'revision_number', 0) or 0) + 1
             # NOTE: update_task_files must be imported and defined correctly
-            update_task_files(attachments, task.task_id, files_to_delete)
+            replace_files('task', task.task_id, attachments, files_to_delete)
 
         db.session.commit()
 
@@ -1014,7 +1147,7 @@ def update_tasks_by_project_id(project_id):
             
             if target_task:
                 # 🚨 Use the imported utility function 'upload_task_files'
-                upload_task_files(attachments, target_task.task_id) 
+                attach_files('task', target_task.task_id, attachments) 
                 files_uploaded_count = len([f for f in attachments if f.filename])
             else:
                  return jsonify({"error": f"Task ID '{specific_task_id}' not found within Project ID '{project_id}'."}), 404
@@ -1102,7 +1235,7 @@ def update_tasks_by_space_id(space_id):
             
             if target_task:
                 # 🚨 Use the imported utility function 'upload_task_files'
-                upload_task_files(attachments, target_task.task_id) 
+                attach_files('task', target_task.task_id, attachments) 
                 files_uploaded_count = len([f for f in attachments if f.filename])
             else:
                  return jsonify({"error": f"Task ID '{specific_task_id}' not found within Space ID '{space_id}'."}), 404
@@ -1,6 +1,6 @@
 from flask import Blueprint , jsonify , request , current_app
 from models import Templates , db , Upload_Files  , TemplateCards , Tag
-from .upload_files_routes import upload_template_files , update_template_files , delete_selected_files
+from utils.storage import attach_files , replace_files
 import datetime
 from flask import current_app
 import logging
@@ -148,7 +148,7 @@ def add_templates():
     try:
         db.session.add(new_templates)
         db.session.flush()
-        upload_template_files(attachments, new_templates.template_id)
+        attach_files('template', new_templates.template_id, attachments)
         db.session.commit()
         return jsonify({
             "message" : "Templates and files uploaded successfully",
@@ -187,14 +187,12 @@ def update_template(template_id):
         files_to_delete = json.loads(files_to_delete_str)
         
         # Call the utility function to handle file upload and deletion in one logical step
-        # Note: The utility function `update_template_files` handles its own commit/rollback 
-        # according to your original code's pattern.
+        # (it stages the changes; they are committed below together with the metadata)
         if attachments_to_add or files_to_delete:
-             # update_template_files(files, template_id, files_to_delete) - uses corrected signature
-            update_template_files(attachments_to_add, template_id, files_to_delete)
+            replace_files('template', template_id, attachments_to_add, files_to_delete)
 
 
-        # 3. Commit Template Metadata changes (File changes were committed inside the utility function)
+        # 3. Commit Template Metadata and file changes
         db.session.commit() 
         
         # 4. Prepare Response
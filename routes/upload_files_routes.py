@@ -1,28 +1,46 @@
 import logging
+import mimetypes
 import os
-import uuid
-from flask import Blueprint, jsonify, send_from_directory, request
-from datetime import datetime
-from werkzeug.datastructures import FileStorage
-from werkzeug.utils import secure_filename
-# Assuming api.exceptions.FileTooLargeError is defined elsewhere
-from api.exception import FileTooLargeError 
-# Assuming models.Upload_Files and models.db are defined elsewhere
-from models import Upload_Files, db
+import re
+from datetime import datetime, timezone
+from flask import Blueprint, jsonify, request, current_app, Response
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+# Storing, attaching and deleting files for every entity lives in utils.storage:
+#   attach_files('task', task_id, files) / replace_files('drawing', drawing_id, files, files_to_delete)
+from utils.storage import MAX_FILE_SIZE, validate_file_size, delete_files, can_access_upload
+from utils.storage_backends import UPLOAD_FOLDER
+from utils.ingest import INGEST_TMP_FOLDER
+from utils.resumable_uploads import (
+    UploadSessionError, create_upload_session, write_chunk, complete_upload,
+    discard_upload_session, serialize_upload_session
+)
+from models import db, UploadSession, Upload_Files
+from auth.auth import jwt_required
 
 
 upload_bp = Blueprint("upload_files", __name__)
 CORS(upload_bp)
 
-UPLOAD_FOLDER = "uploads"
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
 ALLOWED_EXTENSIONS = {'pdf', 'jpeg', 'jpg', 'png', 'docx', 'txt'}
 
-# Fallback value is 5 * 1024 * 1024 bytes (5MB)
-MAX_FILE_SIZE = int(os.getenv("MAX_CONTENT_LENGTH", 5 * 1024 * 1024)) 
+# How file bytes leave the server:
+#   direct     - Python streams the file (Range/conditional handled by Werkzeug)
+#   x-sendfile - Apache/lighttpd: respond with X-Sendfile and an empty body
+#   x-accel    - nginx: respond with X-Accel-Redirect to an internal location
+#                mapped onto UPLOAD_FOLDER (X_ACCEL_REDIRECT_PREFIX)
+FILE_SERVE_MODE = os.getenv("FILE_SERVE_MODE", "direct")
+X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX", "/protected-uploads/")
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# uploads/blobs/<xx>/<sha256><ext> and uploads/derivatives/<xx>/<sha256>/<name>
+# (including tiles/<z>/<x>_<y>.<ext>) never change once written
+BLOB_PATH_RE = re.compile(r'^blobs/[0-9a-f]{2}/([0-9a-f]{64})(\.[\w-]+)?$')
+DERIVATIVE_PATH_RE = re.compile(r'^derivatives/[0-9a-f]{2}/([0-9a-f]{64})/(\w[\w./-]*)$')
 
 
 # --- Utility Functions (Copied/Adapted from Original Snippet) ---
@@ -33,1252 +51,211 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def validate_file_size(file):
-    """Checks if the file size exceeds MAX_FILE_SIZE and raises an error if it does."""
-    # Seek to the end of the file to get its size
-    file.seek(0, os.SEEK_END)
-    file_length = file.tell()
-    logging.info(f"The length of {file.filename} is {file_length} bytes")
-    # Reset the file pointer to the beginning for later operations like file.save()
-    file.seek(0)
-    
-    if file_length > MAX_FILE_SIZE:
-        raise FileTooLargeError(file.filename, MAX_FILE_SIZE)
-    
-@upload_bp.route('/uploads/<path:filename>')
-def serve_file(filename):
-    try:
-        print(f"Serving file: {filename}")
-        # This will look for the file in the 'uploads' directory
-        return send_from_directory(UPLOAD_FOLDER, filename)
-    except FileNotFoundError:
-        return "File not found", 404
-
-def delete_selected_files(file_ids):
-    """Deletes files from disk and their records from the database based on a list of file_ids."""
-    for file_id in file_ids:
-        # Use .one_or_none() if using Flask-SQLAlchemy 3 or newer, or .first() as per original code
-        file_record = db.session.query(Upload_Files).filter_by(file_id=file_id).first()
-        if file_record:
-            try:
-                # Delete from disk
-                if os.path.exists(file_record.file_path):
-                    os.remove(file_record.file_path)
-                    logging.info(f"Deleted file from disk: {file_record.file_path}")
-                
-                # Delete DB record
-                db.session.delete(file_record)
-                logging.info(f"Deleted DB record for file_id: {file_id}")
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
 
-            except Exception as e:
-                logging.exception(f"Failed to delete file {file_record.filename}: {str(e)}")
-                # Re-raise to be caught by the calling update function's rollback logic
-                raise e
-
-
-# --- Folder Creation Functions (Provided in the User Prompt) ---
-
-def create_pin_folder(pin_id):
-    """
-    Creates a dedicated upload folder for a specific Pin using its ID.
-    """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "pin_uploads", 
-        str(pin_id)
-    )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Pin: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
 
-# def download_url_to_filestorage(url, filename="external_image"):
-#     """Downloads an image from a URL and converts it into a FileStorage object."""
-#     try:
-#         response = requests.get(url, stream=True, timeout=10)
-#         response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+def _accel_redirect_response(filename, mimetype, etag, last_modified, cache_control):
+    """Python only answers validators; nginx streams the bytes (and handles Range)."""
+    headers = {
+        'ETag': f'"{etag}"',
+        'Last-Modified': last_modified,
+        'Cache-Control': cache_control,
+        'Accept-Ranges': 'bytes',
+    }
+    if _not_modified(etag, last_modified):
+        return Response(status=304, headers=headers)
+    response = Response(status=200, mimetype=mimetype, headers=headers)
+    response.headers['X-Accel-Redirect'] = X_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + filename
+    return response
 
-#         # Determine content type and extension
-#         content_type = response.headers.get('Content-Type', 'application/octet-stream')
-#         ext = '.' + content_type.split('/')[-1] if 'image/' in content_type else '.jpg'
-        
-#         # Create an in-memory file
-#         file_data = io.BytesIO(response.content)
-        
-#         # Create a FileStorage object to mimic a user upload
-#         file_storage = FileStorage(
-#             stream=file_data,
-#             filename=filename + ext,
-#             content_type=content_type,
-#             name='uploads' # Must match the field name your handler expects
-#         )
-#         return file_storage
-#     except requests.exceptions.RequestException as e:
-#         current_app.logger.error(f"Error downloading external URL {url}: {e}")
-#         return None
 
-def create_space_folder(space_id):
+def send_upload(filename, etag=None, cache_control="no-cache"):
     """
-    Creates a dedicated upload folder for a specific Space using its ID.
+    Sends a file stored under UPLOAD_FOLDER according to FILE_SERVE_MODE,
+    answering conditional and Range requests. Without an explicit etag one is
+    derived from mtime and size. Returns None if the file does not exist or
+    is a partial upload under INGEST_TMP_FOLDER, which is never served.
     """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "space_uploads",
-        str(space_id)
+    full_path = safe_join(os.path.abspath(UPLOAD_FOLDER), filename)
+    if full_path is None or not os.path.isfile(full_path):
+        return None
+    tmp_folder = os.path.realpath(INGEST_TMP_FOLDER)
+    if os.path.commonpath([os.path.realpath(full_path), tmp_folder]) == tmp_folder:
+        return None
+
+    stat = os.stat(full_path)
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+    etag = etag or f"{int(stat.st_mtime)}-{stat.st_size}"
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if FILE_SERVE_MODE == 'x-accel':
+        return _accel_redirect_response(filename, mimetype, etag, last_modified, cache_control)
+
+    response = send_file(
+        full_path,
+        request.environ,
+        mimetype=mimetype,
+        conditional=True,  # If-None-Match / If-Modified-Since -> 304, Range -> 206
+        etag=etag,
+        last_modified=last_modified,
+        use_x_sendfile=FILE_SERVE_MODE == 'x-sendfile',
+        response_class=current_app.response_class,
     )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Space: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
+    response.headers['Cache-Control'] = cache_control
+    return response
 
-def create_project_templates_folder(project_templates_id):
-    """
-    Creates a dedicated upload folder for Project Templates using the ID.
-    Note: The path uses 'pin_uploads' which seems inconsistent with the ID name.
-    Retaining original path logic from prompt.
-    """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "project_templates_uploads",
-        str(project_templates_id)
-    )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Project Template: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
 
-def create_template_folder(template_id):
-    """
-    Creates a dedicated upload folder for a specific Template using its ID.
-    Note: The path uses 'pin_uploads' which seems inconsistent with the ID name.
-    Retaining original path logic from prompt.
-    """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "templates_uploads",
-        str(template_id)
-    )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Template: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
-
-def update_template_files(files, template_id,  files_to_delete):
-    """Handles deletion of old files and upload of new files for a Pin."""
-    try:
-        folder_path = create_pin_folder(template_id) 
-        
-        # 1. Delete files marked for deletion
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        # 2. Upload new files
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        template_id=template_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        # record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
-
-                except Exception as e:
-                    logging.exception(f"Error updating Pin file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
-        db.session.commit() # Commit all changes for this update operation
-
-    except Exception as e:
-        logging.exception(f"Failed to update template files for ID {template_id}: {str(e)}")
-        db.session.rollback()
-        raise e
-    
-
-    
-def create_board_folder(board_id):
-    """
-    Creates a dedicated upload folder for a specific Template using its ID.
-    Note: The path uses 'pin_uploads' which seems inconsistent with the ID name.
-    Retaining original path logic from prompt.
-    """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "board_uploads",
-        str(board_id)
-    )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Template: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
-
-def upload_board_files(files, board_id):
-    """Handles the initial upload of multiple files for a Pin."""
-    folder_path = create_pin_folder(board_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for Pin: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
-
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
-
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    board_id=board_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb,
-                    # record_time_according_to_timezone=localized_time
-                    )
-                
-                db.session.add(upload_file)
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Pin {board_id}: {str(e)}")
-                # If you're handling multiple files, you might want to rollback after
-                # the loop or commit after the loop, depending on atomicity requirements.
-                # For consistency with the original `upload_blinding_files`: we raise immediately.
-                raise e
-
-def update_board_files(files, board_id,  files_to_delete):
-    """Handles deletion of old files and upload of new files for a Pin."""
-    try:
-        folder_path = create_pin_folder(board_id) 
-        
-        # 1. Delete files marked for deletion
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        # 2. Upload new files
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
+def _uploads_for_path(relative_path, digest=None):
+    """Upload_Files rows behind a served path: every row of a blob (and its derivatives), or the row of a legacy file."""
+    if digest:
+        return Upload_Files.query.filter_by(blob_digest=digest)
+    return Upload_Files.query.filter(
+        Upload_Files.file_path.in_([relative_path, f"{UPLOAD_FOLDER.rstrip('/')}/{relative_path}"]))
 
-                    file.save(file_path)
 
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        board_id=board_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        # record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
-
-                except Exception as e:
-                    logging.exception(f"Error updating Pin file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
-        db.session.commit() # Commit all changes for this update operation
-
-    except Exception as e:
-        logging.exception(f"Failed to update template files for ID {board_id}: {str(e)}")
-        db.session.rollback()
-        raise e
-
-def create_document_folder(document_id):
-    """
-    Creates a dedicated upload folder for a specific Document using its ID.
-    """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "document_uploads",
-        str(document_id)
-    )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Document: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
-
-def create_asset_folder(asset_id):
-    """
-    Creates a dedicated upload folder for a specific Asset using its ID.
-    """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "asset_uploads",
-        str(asset_id)
-    )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Asset: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
-
-def create_drawing_folder(drawing_id):
-    """
-    Creates a dedicated upload folder for a specific Drawing using its ID.
-    """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "drawing_uploads",
-        str(drawing_id)
-    )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Drawing: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
-
-
-# def create_template_folder(template_id):
-#     """
-#     Creates a dedicated upload folder for a specific template using its ID.
-#     """
-#     folder_path = os.path.join(
-#         UPLOAD_FOLDER, 
-#         "drawing_uploads",
-    #     str(template_id)
-    # )
-    
-    # try:
-    #     if not os.path.exists(folder_path):
-    #         os.makedirs(folder_path, exist_ok=True)
-    #     logging.info(f"Directory verified/created for Drawing: {folder_path}")
-    # except Exception as e:
-    #     logging.error(f"Failed to create directory {folder_path}: {e}")
-    #     raise
-        
-    # return folder_path
-
-def create_inspiration_folder(inspiration_id):
-    """
-    Creates a dedicated upload folder for a specific Inspiration using its ID.
-    """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "inspiration_uploads",
-        str(inspiration_id)
-    )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Inspiration: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
-
-def create_task_folder(inspiration_id):
+@upload_bp.route('/uploads/<path:filename>')
+@jwt_required
+def serve_file(filename):
     """
-    Creates a dedicated upload folder for a specific Inspiration using its ID.
+    Serves a stored upload with strong validators and Range support, once
+    the caller's company is known to own an Upload_Files row for it (in
+    x-accel/x-sendfile mode this is the check before the handoff).
+    Content-addressed blobs get their digest as ETag and are cached as
+    immutable, privately; older per-entity files are revalidated on every use.
     """
-    folder_path = os.path.join(
-        UPLOAD_FOLDER, 
-        "task_uploads",
-        str(inspiration_id)
-    )
-    
-    try:
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
-        logging.info(f"Directory verified/created for Inspiration: {folder_path}")
-    except Exception as e:
-        logging.error(f"Failed to create directory {folder_path}: {e}")
-        raise
-        
-    return folder_path
-# --- File Upload/Update Functions (New Logic) ---
-
-def upload_pin_files(files, pin_id):
-    """Handles the initial upload of multiple files for a Pin."""
-    folder_path = create_pin_folder(pin_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for Pin: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
-
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
-
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    pin_id=pin_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb,
-                    # record_time_according_to_timezone=localized_time
-                    )
-                
-                db.session.add(upload_file)
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Pin {pin_id}: {str(e)}")
-                # If you're handling multiple files, you might want to rollback after
-                # the loop or commit after the loop, depending on atomicity requirements.
-                # For consistency with the original `upload_blinding_files`: we raise immediately.
-                raise e
-
-
-def update_pin_files(files, pin_id, localized_time, files_to_delete):
-    """Handles deletion of old files and upload of new files for a Pin."""
-    try:
-        folder_path = create_pin_folder(pin_id) 
-        
-        # 1. Delete files marked for deletion
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        # 2. Upload new files
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        pin_id=pin_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
+    relative_path = filename.replace(os.sep, '/')
+    blob_match = BLOB_PATH_RE.match(relative_path)
+    derivative_match = DERIVATIVE_PATH_RE.match(relative_path)
+    if blob_match:
+        digest = blob_match.group(1)
+        etag = f"sha256-{digest}"
+        cache_control = f"private, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    elif derivative_match:
+        digest = derivative_match.group(1)
+        etag = f"sha256-{digest}-{derivative_match.group(2)}"
+        cache_control = f"private, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        digest = None
+        etag = None
+        cache_control = "private, no-cache"
+
+    company_id = getattr(request, 'current_company_id', None)
+    if not any(can_access_upload(upload, company_id) for upload in _uploads_for_path(relative_path, digest)):
+        return "File not found", 404
 
-                except Exception as e:
-                    logging.exception(f"Error updating Pin file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
-        db.session.commit() # Commit all changes for this update operation
+    response = send_upload(filename, etag, cache_control)
+    if response is None:
+        return "File not found", 404
+    return response
 
-    except Exception as e:
-        logging.exception(f"Failed to update Pin files for ID {pin_id}: {str(e)}")
-        db.session.rollback()
-        raise e
+def delete_selected_files(file_ids):
+    """Deletes Upload_Files records (and their stored contents once unreferenced) by file_id."""
+    return delete_files(file_ids)
 
-# The logic for space, project_templates, template, document, asset, drawing, and inspiration upload/update
-# will follow the exact same pattern as the Pin functions, substituting the ID and folder creation function.
 
-def upload_space_files(files, space_id):
-    """Handles the initial upload of multiple files for a Space."""
-    folder_path = create_space_folder(space_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for Space: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
+# --- Resumable (chunked) uploads ---
+# 1. POST   /uploads/sessions                               -> upload_id, chunk_size
+# 2. PUT    /uploads/sessions/<upload_id>/chunks/<index>    (raw body, any order, retry freely)
+# 3. GET    /uploads/sessions/<upload_id>                   -> received_ranges / missing_chunks
+# 4. POST   /uploads/sessions/<upload_id>/complete          -> attaches the file to its owner
 
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
+def _get_own_upload_session(upload_id):
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or (upload.user_id and upload.user_id != request.current_user_id):
+        raise UploadSessionError("Upload session not found", 404)
+    return upload
 
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    space_id=space_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb,
-                    # record_time_according_to_timezone=localized_time
-                    )
-                
-                db.session.add(upload_file)
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Space {space_id}: {str(e)}")
-                raise e
 
-def update_space_files(files, space_id, localized_time, files_to_delete):
-    """Handles deletion of old files and upload of new files for a Space."""
+@upload_bp.route('/uploads/sessions', methods=['POST'])
+@jwt_required
+def create_resumable_upload():
+    data = request.get_json(silent=True) or {}
     try:
-        folder_path = create_space_folder(space_id) 
-        
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        space_id=space_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
-
-                except Exception as e:
-                    logging.exception(f"Error updating Space file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
+        upload = create_upload_session(
+            owner_type=data.get('owner_type'),
+            owner_id=data.get('owner_id'),
+            filename=data.get('filename'),
+            total_size=data.get('total_size'),
+            chunk_size=data.get('chunk_size'),
+            user_id=request.current_user_id,
+            company_id=getattr(request, 'current_company_id', None),
+        )
         db.session.commit()
-
-    except Exception as e:
-        logging.exception(f"Failed to update Space files for ID {space_id}: {str(e)}")
+        return jsonify(serialize_upload_session(upload)), 201
+    except UploadSessionError as e:
         db.session.rollback()
-        raise e
-
-# ... Repeat upload/update functions for the other new models (Project Templates, Template, Document, Asset, Drawing, Inspiration)
-
-def upload_project_templates_files(files, project_templates_id):
-    """Handles the initial upload of multiple files for Project Templates."""
-    folder_path = create_project_templates_folder(project_templates_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for Project Template: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
-
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
-
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    project_templates_id=project_templates_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb)
-                    # record_time_according_to_timezone=localized_time)
-                
-                db.session.add(upload_file)
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Project Template {project_templates_id}: {str(e)}")
-                raise e
-
-
-def update_project_templates_files(files, project_templates_id, localized_time, files_to_delete):
-    """Handles deletion of old files and upload of new files for Project Templates."""
-    try:
-        folder_path = create_project_templates_folder(project_templates_id) 
-        
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        project_templates_id=project_templates_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
-
-                except Exception as e:
-                    logging.exception(f"Error updating Project Template file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
-        db.session.commit()
-
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
-        logging.exception(f"Failed to update Project Template files for ID {project_templates_id}: {str(e)}")
         db.session.rollback()
-        raise e
-
-
-def upload_template_files(files, template_id):
-    """Handles the initial upload of multiple files for a Template."""
-    folder_path = create_template_folder(template_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for Template: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
+        logging.exception(f"Failed to create upload session: {e}")
+        return jsonify({"error": "Failed to create upload session"}), 500
 
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
 
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    template_id=template_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb)
-                    # record_time_according_to_timezone=localized_time)
-                
-                db.session.add(upload_file)
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Template {template_id}: {str(e)}")
-                raise e
-            
-def update_task_files(files, task_id,  files_to_delete):
-    """Handles deletion of old files and upload of new files for a Pin."""
+@upload_bp.route('/uploads/sessions/<string:upload_id>', methods=['GET'])
+@jwt_required
+def get_resumable_upload(upload_id):
     try:
-        folder_path = create_pin_folder(task_id) 
-        
-        # 1. Delete files marked for deletion
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        # 2. Upload new files
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        template_id=task_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        # record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
+        upload = _get_own_upload_session(upload_id)
+        return jsonify(serialize_upload_session(upload)), 200
+    except UploadSessionError as e:
+        return jsonify({"error": str(e)}), e.status
 
-                except Exception as e:
-                    logging.exception(f"Error updating Pin file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
-        db.session.commit() # Commit all changes for this update operation
 
-    except Exception as e:
-        logging.exception(f"Failed to update template files for ID {task_id}: {str(e)}")
-        db.session.rollback()
-        raise e
-    
-
-
-def update_template_files(files, template_id, localized_time, files_to_delete):
-    """Handles deletion of old files and upload of new files for a Template."""
+@upload_bp.route('/uploads/sessions/<string:upload_id>/chunks/<int:chunk_index>', methods=['PUT'])
+@jwt_required
+def put_resumable_upload_chunk(upload_id, chunk_index):
     try:
-        folder_path = create_template_folder(template_id) 
-        
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        template_id=template_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
-
-                except Exception as e:
-                    logging.exception(f"Error updating Template file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
+        upload = _get_own_upload_session(upload_id)
+        # Chunks may be larger than MAX_CONTENT_LENGTH, but never than their session's chunk size
+        request.max_content_length = upload.chunk_size
+        written = write_chunk(upload, chunk_index, request.stream)
         db.session.commit()
-
-    except Exception as e:
-        logging.exception(f"Failed to update Template files for ID {template_id}: {str(e)}")
+        return jsonify({"upload_id": upload_id, "chunk_index": chunk_index, "size": written}), 200
+    except UploadSessionError as e:
         db.session.rollback()
-        raise e
-
-
-def upload_document_files(files, document_id, localized_time):
-    """Handles the initial upload of multiple files for a Document."""
-    folder_path = create_document_folder(document_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for Document: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
-
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
-
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    document_id=document_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb,
-                    record_time_according_to_timezone=localized_time)
-                
-                db.session.add(upload_file)
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Document {document_id}: {str(e)}")
-                raise e
-
-
-def update_document_files(files, document_id, localized_time, files_to_delete):
-    """Handles deletion of old files and upload of new files for a Document."""
-    try:
-        folder_path = create_document_folder(document_id) 
-        
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        document_id=document_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
-
-                except Exception as e:
-                    logging.exception(f"Error updating Document file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
-        db.session.commit()
-
+        return jsonify({"error": str(e)}), e.status
+    except RequestEntityTooLarge as e:
+        db.session.rollback()
+        return jsonify({"error": e.description}), 413
     except Exception as e:
-        logging.exception(f"Failed to update Document files for ID {document_id}: {str(e)}")
         db.session.rollback()
-        raise e
-
-
-def upload_asset_files(files, asset_id, localized_time):
-    """Handles the initial upload of multiple files for an Asset."""
-    folder_path = create_asset_folder(asset_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for Asset: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
+        logging.exception(f"Failed to write chunk {chunk_index} of upload {upload_id}: {e}")
+        return jsonify({"error": "Failed to write chunk"}), 500
 
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
 
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    asset_id=asset_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb,
-                    record_time_according_to_timezone=localized_time)
-                
-                db.session.add(upload_file)
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Asset {asset_id}: {str(e)}")
-                raise e
-
-
-def update_asset_files(files, asset_id, localized_time, files_to_delete):
-    """Handles deletion of old files and upload of new files for an Asset."""
+@upload_bp.route('/uploads/sessions/<string:upload_id>/complete', methods=['POST'])
+@jwt_required
+def complete_resumable_upload(upload_id):
     try:
-        folder_path = create_asset_folder(asset_id) 
-        
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        asset_id=asset_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
-
-                except Exception as e:
-                    logging.exception(f"Error updating Asset file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
+        _get_own_upload_session(upload_id)
+        upload = complete_upload(upload_id)
         db.session.commit()
-
-    except Exception as e:
-        logging.exception(f"Failed to update Asset files for ID {asset_id}: {str(e)}")
+        return jsonify(serialize_upload_session(upload)), 200
+    except UploadSessionError as e:
         db.session.rollback()
-        raise e
-
-
-def upload_drawing_files(files, drawing_id):
-    """Handles the initial upload of multiple files for a Drawing."""
-    folder_path = create_drawing_folder(drawing_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for Drawing: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
-
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
-
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    drawing_id=drawing_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb,
-                    # record_time_according_to_timezone=localized_time
-                    )
-                
-                db.session.add(upload_file)
-                # db.session.commit()
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Drawing {drawing_id}: {str(e)}")
-                raise e
-
-
-# def update_drawing_files(files, drawing_id, localized_time, files_to_delete):
-#     """Handles deletion of old files and upload of new files for a Drawing."""
-#     try:
-#         folder_path = create_drawing_folder(drawing_id) 
-        
-#         if files_to_delete:
-#             delete_selected_files(files_to_delete)
-        
-#         for file in files:
-#             if isinstance(file, FileStorage):
-#                 try:
-#                     original_filename = secure_filename(file.filename)
-#                     validate_file_size(file)
-#                     base, ext = os.path.splitext(original_filename)
-#                     unique_filename = f"{base}{ext}"
-#                     file_path = os.path.join(folder_path, unique_filename)
-
-#                     file.save(file_path)
-
-#                     file_id = str(uuid.uuid4())
-#                     file_size_kb = os.path.getsize(file_path) / 1024
-
-#                     upload_file = Upload_Files(
-#                         file_id=file_id,
-#                         drawing_id=drawing_id,
-#                         filename=unique_filename,
-#                         file_path=file_path,
-#                         file_size=file_size_kb,
-#                         record_time_according_to_timezone=localized_time
-#                     )
-#                     db.session.add(upload_file)
-
-#                 except Exception as e:
-#                     logging.exception(f"Error updating Drawing file {original_filename}: {str(e)}")
-#                     db.session.rollback() 
-#                     raise e
-        
-#         db.session.commit()
-
-#     except Exception as e:
-#         logging.exception(f"Failed to update Drawing files for ID {drawing_id}: {str(e)}")
-#         db.session.rollback()
-#         raise e
-
-def update_drawing_files(files, drawing_id, files_to_delete):
-    """Handles deletion of old files and upload of new files for a Drawing."""
-    try:
-        # Create folder if it doesn't exist
-        folder_path = create_drawing_folder(drawing_id) 
-        
-        # 1. Handle File Deletions
-        if files_to_delete:
-            # Assumes delete_selected_files also handles DB record deletion and file system deletion
-            delete_selected_files(files_to_delete)
-        
-        # 2. Handle File Uploads
-        for file in files:
-            if file and isinstance(file, FileStorage): # Added 'file' check for robustness
-                try:
-                    original_filename = secure_filename(file.filename)
-                    # Assuming validate_file_size raises an exception on failure
-                    validate_file_size(file) 
-                    
-                    base, ext = os.path.splitext(original_filename)
-                    # The original code uses a non-unique filename, which can overwrite existing files.
-                    # A better practice is to ensure uniqueness, e.g., using a UUID prefix.
-                    # unique_filename = f"{uuid.uuid4()}_{original_filename}"
-                    # Keeping the original logic's filename for minimal change:
-                    unique_filename = original_filename 
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    # Save the file to the file system
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    # Check for file existence before getting size to prevent errors
-                    file_size_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-                    file_size_kb = file_size_bytes / 1024
-
-                    # Create and add the new database record for the uploaded file
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        drawing_id=drawing_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        # Use the passed-in localized_time
-                       
-                    )
-                    db.session.add(upload_file)
-
-                except Exception as e:
-                    # Log the error, rollback the session changes *within this function*
-                    # and re-raise to be caught by the outer function's handler.
-                    logging.exception(f"Error saving Drawing file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
-        # Note: We do NOT commit here because the outer function `update_drawing`
-        # needs to commit both the Drawing metadata change (revision_number) AND
-        # the file changes (uploads/deletions) together in a single transaction.
-        # Removing the `db.session.commit()` from here prevents a premature commit.
-        
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
-        logging.exception(f"Failed to process Drawing files for ID {drawing_id}: {str(e)}")
-        # If an error happens outside the file loop (e.g., in create_drawing_folder or delete_selected_files),
-        # we rollback and re-raise. The outer function will also catch this and rollback.
         db.session.rollback()
-        raise e
+        logging.exception(f"Failed to complete upload {upload_id}: {e}")
+        return jsonify({"error": "Failed to complete upload"}), 500
 
-def upload_inspiration_files(files, inspiration_id):
-    """Handles the initial upload of multiple files for an Inspiration."""
-    folder_path = create_inspiration_folder(inspiration_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for Inspiration: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
 
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
-
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    inspiration_id=inspiration_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb
-                    # record_time_according_to_timezone=localized_time
-                    )
-                
-                db.session.add(upload_file)
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Inspiration {inspiration_id}: {str(e)}")
-                raise e
-
-def upload_task_files(files, task_id):
-    """Handles the initial upload of multiple files for an Inspiration."""
-    folder_path = create_task_folder(task_id)
-    
-    for file in files:
-        if isinstance(file, FileStorage):
-            original_filename = secure_filename(file.filename)
-            try:
-                validate_file_size(file)
-            except ValueError as ve:
-                logging.warning(f"Oversized file upload attempt for task: {str(ve)}")
-                raise
-            
-            base, ext = os.path.splitext(original_filename)
-            unique_filename = f"{base}{ext}"
-            file_path = os.path.join(folder_path, unique_filename)
-
-            try:
-                file.save(file_path)
-                file_id = str(uuid.uuid4())
-                file_size_kb = os.path.getsize(file_path) / 1024
-
-                upload_file = Upload_Files(
-                    file_id=file_id,
-                    task_id=task_id, # Use the correct foreign key
-                    filename=unique_filename,
-                    file_path=file_path,
-                    file_size=file_size_kb
-                    # record_time_according_to_timezone=localized_time
-                    )
-                
-                db.session.add(upload_file)
-                                
-            except Exception as e:
-                logging.exception(f"Error uploading file for Inspiration {task_id}: {str(e)}")
-                raise e
-
-def update_inspiration_files(files, inspiration_id ,  files_to_delete):
-    """Handles deletion of old files and upload of new files for an Inspiration."""
+@upload_bp.route('/uploads/sessions/<string:upload_id>', methods=['DELETE'])
+@jwt_required
+def abort_resumable_upload(upload_id):
     try:
-        folder_path = create_inspiration_folder(inspiration_id) 
-        
-        if files_to_delete:
-            delete_selected_files(files_to_delete)
-        
-        for file in files:
-            if isinstance(file, FileStorage):
-                try:
-                    original_filename = secure_filename(file.filename)
-                    validate_file_size(file)
-                    base, ext = os.path.splitext(original_filename)
-                    unique_filename = f"{base}{ext}"
-                    file_path = os.path.join(folder_path, unique_filename)
-
-                    file.save(file_path)
-
-                    file_id = str(uuid.uuid4())
-                    file_size_kb = os.path.getsize(file_path) / 1024
-
-                    upload_file = Upload_Files(
-                        file_id=file_id,
-                        inspiration_id=inspiration_id,
-                        filename=unique_filename,
-                        file_path=file_path,
-                        file_size=file_size_kb,
-                        # record_time_according_to_timezone=localized_time
-                    )
-                    db.session.add(upload_file)
-
-                except Exception as e:
-                    logging.exception(f"Error updating Inspiration file {original_filename}: {str(e)}")
-                    db.session.rollback() 
-                    raise e
-        
+        upload = _get_own_upload_session(upload_id)
+        discard_upload_session(upload)
         db.session.commit()
-
-    except Exception as e:
-        logging.exception(f"Failed to update Inspiration files for ID {inspiration_id}: {str(e)}")
+        return jsonify({"message": "Upload session aborted"}), 200
+    except UploadSessionError as e:
         db.session.rollback()
-        raise e
+        return jsonify({"error": str(e)}), e.status
 
 
 # --- Flask Route (Copied from Original Snippet) ---
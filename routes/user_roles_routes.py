@@ -3,6 +3,7 @@ from flask import Blueprint, jsonify, request
 from models import User, Role, UserRole, db
 from flask_cors import CORS
 from auth.auth import jwt_required
+from utils.permission_cache import permission_cache
 
 user_roles_bp = Blueprint('user_roles', __name__)
 CORS(user_roles_bp)
@@ -22,6 +23,7 @@ def assign_role_to_user(user_id, role_id):
         new_link = UserRole(user_id=user.user_id, role_id=role.role_id)
         db.session.add(new_link)
         db.session.commit()
+        permission_cache.invalidate_user(user.user_id)
         return jsonify({"message": "Role assigned to user successfully"}), 201
     except Exception as e:
         db.session.rollback()
@@ -35,6 +37,7 @@ def remove_role_from_user(user_id, role_id):
     try:
         db.session.delete(link)
         db.session.commit()
+        permission_cache.invalidate_user(user_id)
         return jsonify({"message": "Role removed from user successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -91,6 +94,7 @@ def grant_role(company_id, user_id, role_id):
         user_role = UserRole(user_id=user_id, role_id=role_id)
         db.session.add(user_role)
         db.session.commit()
+        permission_cache.invalidate_user(user_id)
 
         return jsonify({"message": "Role granted successfully"}), 201
     except Exception as e:
@@ -9,7 +9,10 @@ import logging
 from sqlalchemy import and_
 from sqlalchemy.exc import SQLAlchemyError
 # from flask_bcrypt import bcrypt
-from flask_bcrypt import Bcrypt
+from utils.passwords import hash_password
+from utils.token_revocation import revoke_user_tokens
+from utils.rate_limit import rate_limited
+from utils.permission_cache import permission_cache
 from email.message import EmailMessage
 from werkzeug.security import generate_password_hash , check_password_hash
 import smtplib
@@ -28,7 +31,6 @@ from datetime import datetime, timedelta , timezone
 import uuid
 
 user_bp = Blueprint('user' , __name__)
-bcrypt = Bcrypt()
 
 CORS(user_bp)
 
@@ -174,7 +176,7 @@ def post_user():
     for field in required_fields:
         if field not in data:
             return jsonify({'error': f"'{field}' is required"}), 400
-        hashed_password = bcrypt.generate_password_hash(data['user_password']).decode('utf-8')
+        hashed_password = hash_password(data['user_password'])
         try:
             new_user = User(
                 user_name = data['user_name'] , 
@@ -241,7 +243,7 @@ def update_user(user_id):
     if "user_phone" in data:
         user.user_phone = data["user_phone"]
     if "user_password" in data:
-        hashed_password = bcrypt.generate_password_hash(data['user_password']).decode('utf-8')
+        hashed_password = hash_password(data['user_password'])
         user.user_password = hashed_password
     if "user_address" in data:
         user.user_address = data["user_address"]
@@ -271,6 +273,7 @@ def del_user(user_id):
 
         # DELETE CHILD RECORDS FIRST
         UserToken.query.filter_by(user_id=user_id).delete()
+        revoke_user_tokens(user_id)
         OtpCode.query.filter_by(user_id=user_id).delete()   # <-- ADD THIS
         Invite.query.filter_by(created_by_user_id=user.user_id).delete()  # <-- ADD THIS IF INVITE MODEL IS IMPORTED
         Invite.query.filter_by(accepted_by_user_id=user.user_id).delete()
@@ -291,130 +294,162 @@ def del_user(user_id):
         print("DELETE ERROR:", str(e))
         return jsonify({"error": str(e)}), 500
 
+DASHBOARD_SECTIONS = ('client', 'tasks', 'templates', 'vendors', 'boards', 'pins')
+
 @user_bp.route('/dashboard/<string:user_id>', methods=['GET'])
 def get_user_dashboard(user_id):
+    """
+    Builds the project dashboard for a user with a fixed number of set-based
+    queries (one per section) and groups the rows per project in memory.
+    Optional 'include' is a comma-separated subset of client, tasks, templates,
+    vendors, boards and pins; sections left out are skipped entirely.
+    """
     try:
         # Get optional search parameters from the URL
         project_name_query = request.args.get('project_name')
         task_status_query = request.args.get('task_status')
         vendor_name_query = request.args.get('vendor_name')
 
+        include_arg = request.args.get('include')
+        if include_arg:
+            include = {section.strip() for section in include_arg.split(',') if section.strip()}
+            unknown = include - set(DASHBOARD_SECTIONS)
+            if unknown:
+                return jsonify({"error": f"Unknown include section(s): {', '.join(sorted(unknown))}"}), 400
+        else:
+            include = set(DASHBOARD_SECTIONS)
+
         # Check if the user exists
-        user = User.query.get(user_id)
-        if not user:
+        if not db.session.query(User.user_id).filter_by(user_id=user_id).first():
             return jsonify({"message": "User not found."}), 404
 
-        # Start with a base query for the user's project assignments
-        assignments_query = ProjectAssignments.query.filter_by(user_id=user_id)
-        
-        # Apply filters to the project assignments query if parameters are provided
+        # 1. The user's assignments together with their projects, filtered in SQL
+        assignments_query = db.session.query(ProjectAssignments, Projects).join(
+            Projects, Projects.project_id == ProjectAssignments.project_id
+        ).filter(ProjectAssignments.user_id == user_id)
+
         if project_name_query:
-            # We need to join with the Projects table to filter by project name
-            assignments_query = assignments_query.join(Projects).filter(
+            assignments_query = assignments_query.filter(
                 Projects.project_name.ilike(f'%{project_name_query}%')
             )
 
-        # Apply vendor filter
         if vendor_name_query:
-            # Join with Projectvendor and Vendors to filter by vendor name
-            assignments_query = assignments_query.join(Projectvendor).join(Vendors).filter(
+            # Keep only projects that have at least one matching vendor
+            matching_vendor = db.session.query(Projectvendor.project_vendor_id).join(
+                Vendors, Vendors.vendor_id == Projectvendor.vendor_id
+            ).filter(
+                Projectvendor.project_id == Projects.project_id,
                 Vendors.company_name.ilike(f'%{vendor_name_query}%')
             )
-            
-        assignments = assignments_query.all()
-        dashboard_data = []
-
-        for assignment in assignments:
-            project = Projects.query.get(assignment.project_id)
-            if not project:
-                continue
-
-            # Your existing logic to get client, templates, etc.
-            client_info = None
-            client_assignment = ProjectAssignments.query.filter_by(
-                project_id=project.project_id,
-                role='client'
-            ).first()
-            if client_assignment:
-                client = Clients.query.filter_by(user_id=client_assignment.user_id).first()
-                if client:
-                    client_info = {
-                        "client_name": client.client_name,
-                        "client_email": client.client_email,
-                        "client_phone": client.client_phone
-                    }
+            assignments_query = assignments_query.filter(matching_vendor.exists())
+
+        rows = assignments_query.all()
+        project_ids = list({project.project_id for _, project in rows})
+        if not project_ids:
+            return jsonify([]), 200
+
+        # 2. Clients assigned to those projects
+        clients_by_project = {}
+        if 'client' in include:
+            client_rows = db.session.query(ProjectAssignments.project_id, Clients).join(
+                Clients, Clients.user_id == ProjectAssignments.user_id
+            ).filter(
+                ProjectAssignments.project_id.in_(project_ids),
+                ProjectAssignments.role == 'client'
+            ).all()
+            for project_id, client in client_rows:
+                clients_by_project.setdefault(project_id, {
+                    "client_name": client.client_name,
+                    "client_email": client.client_email,
+                    "client_phone": client.client_phone
+                })
 
-            # --- Apply task status filter here ---
-            tasks_query = Tasks.query.filter_by(project_id=project.project_id)
+        # 3. Tasks, with the status filter applied in SQL
+        tasks_by_project = {}
+        if 'tasks' in include:
+            tasks_query = Tasks.query.filter(Tasks.project_id.in_(project_ids))
             if task_status_query:
                 tasks_query = tasks_query.filter(Tasks.status.ilike(f'%{task_status_query}%'))
-            
-            tasks = tasks_query.all()
-            task_list = []
-            for task in tasks:
-                task_list.append({
+            for task in tasks_query.all():
+                tasks_by_project.setdefault(task.project_id, []).append({
                     "task_id": task.task_id,
                     "task_name": task.task_name,
                     "status": task.status,
-                    "due_date": task.due_date.isoformat(),
+                    "due_date": task.due_date.isoformat() if task.due_date else None,
                     "priority": task.priority,
                     "assigned_to": task.assigned_to
                 })
 
-            # Existing logic for templates, vendors, boards, and pins
-            project_templates = ProjectTemplates.query.filter_by(project_id=project.project_id).all()
-            template_list = []
-            for pt in project_templates:
-                template = Templates.query.get(pt.template_id)
-                if template:
-                    template_list.append({
-                        "template_id": template.template_id,
-                        "template_name": template.template_name,
-                        "file_url": pt.template_file_url
-                    })
+        # 4. Templates attached to those projects
+        templates_by_project = {}
+        if 'templates' in include:
+            template_rows = db.session.query(ProjectTemplates, Templates).join(
+                Templates, Templates.template_id == ProjectTemplates.template_id
+            ).filter(ProjectTemplates.project_id.in_(project_ids)).all()
+            for pt, template in template_rows:
+                templates_by_project.setdefault(pt.project_id, []).append({
+                    "template_id": template.template_id,
+                    "template_name": template.template_name,
+                    "file_url": getattr(pt, 'template_file_url', None)
+                })
 
-            project_vendors = Projectvendor.query.filter_by(project_id=project.project_id).all()
-            vendor_list = []
-            for pv in project_vendors:
-                vendor = Vendors.query.get(pv.vendor_id)
-                if vendor:
-                    vendor_list.append({
-                        "vendor_id": vendor.vendor_id,
-                        "company_name": vendor.company_name,
-                        "role": pv.role
-                    })
+        # 5. Vendors attached to those projects
+        vendors_by_project = {}
+        if 'vendors' in include:
+            vendor_rows = db.session.query(Projectvendor, Vendors).join(
+                Vendors, Vendors.vendor_id == Projectvendor.vendor_id
+            ).filter(Projectvendor.project_id.in_(project_ids)).all()
+            for pv, vendor in vendor_rows:
+                vendors_by_project.setdefault(pv.project_id, []).append({
+                    "vendor_id": vendor.vendor_id,
+                    "company_name": vendor.company_name,
+                    "role": pv.role
+                })
+
+        # 6. Boards and their pins
+        boards_by_project = {}
+        if 'boards' in include:
+            boards = Boards.query.filter(Boards.project_id.in_(project_ids)).all()
 
-            project_boards = Boards.query.filter_by(project_id=project.project_id).all()
-            board_list = []
-            for board in project_boards:
-                pins = Pin.query.filter_by(board_id=board.board_id).all()
-                pin_list = []
+            pins_by_board = {}
+            if 'pins' in include and boards:
+                pins = Pin.query.filter(Pin.board_id.in_([board.board_id for board in boards])).all()
                 for pin in pins:
-                    pin_list.append({
+                    pins_by_board.setdefault(pin.board_id, []).append({
                         "pin_id": pin.pin_id,
                         "pin_type": pin.pin_type,
                         "content": pin.content,
                         "position_x": pin.position_x,
                         "position_y": pin.position_y
                     })
-                
-                board_list.append({
+
+            for board in boards:
+                board_dict = {
                     "board_id": board.board_id,
                     "board_name": board.board_name,
-                    "board_description": board.board_description,
-                    "pins": pin_list
-                })
+                    "board_description": board.board_description
+                }
+                if 'pins' in include:
+                    board_dict["pins"] = pins_by_board.get(board.board_id, [])
+                boards_by_project.setdefault(board.project_id, []).append(board_dict)
 
+        dashboard_data = []
+        for assignment, project in rows:
             project_data = {
                 "project_id": project.project_id,
                 "project_name": project.project_name,
-                "project_status": project.status,
-                "assigned_client": client_info,
-                "assigned_tasks": task_list,
-                "assigned_templates": template_list,
-                "assigned_vendors": vendor_list,
-                "project_boards": board_list
+                "project_status": project.status
             }
+            if 'client' in include:
+                project_data["assigned_client"] = clients_by_project.get(project.project_id)
+            if 'tasks' in include:
+                project_data["assigned_tasks"] = tasks_by_project.get(project.project_id, [])
+            if 'templates' in include:
+                project_data["assigned_templates"] = templates_by_project.get(project.project_id, [])
+            if 'vendors' in include:
+                project_data["assigned_vendors"] = vendors_by_project.get(project.project_id, [])
+            if 'boards' in include:
+                project_data["project_boards"] = boards_by_project.get(project.project_id, [])
             dashboard_data.append(project_data)
 
         return jsonify(dashboard_data), 200
@@ -444,6 +479,7 @@ logger = logging.getLogger(__name__)
 
 
 @user_bp.route('/forgot-password', methods=['POST'])
+@rate_limited(('ip', 5, 300), ('email', 3, 3600))
 def forgot_password():
     """
     Initiates the password reset process by generating a JWT token and sending a link.
@@ -553,12 +589,13 @@ def reset_password():
 
     try:
         # 4. Hash the new password and update the user record
-        hashed_password = bcrypt.generate_password_hash(new_password).decode('utf-8')
+        hashed_password = hash_password(new_password)
         user.user_password = hashed_password
         
         # 5. Security: Invalidate all existing refresh tokens for the user
         # This forces the user to log in again with the new password.
         tokens_revoked = UserToken.query.filter_by(user_id=user.user_id).delete()
+        revoke_user_tokens(user.user_id)
         
         db.session.commit()
         
@@ -624,6 +661,7 @@ def assign_role():
     new_role = UserRole(user_id=user_id, role_id=role_id)
     db.session.add(new_role)
     db.session.commit()
+    permission_cache.invalidate_user(user_id)
 
     return jsonify({"message": "Role assigned successfully"}), 201
 
@@ -0,0 +1,178 @@
+# utils/derivatives.py
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy import event, update
+
+from models import db, FileBlob, Upload_Files
+from utils.ingest import INGEST_TMP_FOLDER
+from utils.storage_backends import get_storage_backend
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # derivatives are skipped when Pillow is missing
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# name -> bounding box; images are never upscaled
+DERIVATIVE_SIZES = {
+    'thumbnail': (320, 320),
+    'preview': (1280, 1280),
+}
+# extension -> (Pillow format, save options)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+IMAGE_CONTENT_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/bmp', 'image/tiff'}
+DERIVATIVE_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", 2))
+
+# Key under session.info: {job: blob digests} to run once the transaction commits
+PENDING_KEY = 'derivatives_pending'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def wants_derivatives(blob):
+    return Image is not None and blob.content_type in IMAGE_CONTENT_TYPES and not blob.derivatives
+
+
+def derivative_locators(blob):
+    """Backend locations of every derivative recorded for a blob."""
+    backend = get_storage_backend(blob.backend)
+    return [
+        backend.derivative_locator(blob.digest, f"{name}.{ext}")
+        for name, entry in (blob.derivatives or {}).items()
+        for ext in entry if ext in DERIVATIVE_FORMATS
+    ]
+
+
+def queue_blob_jobs(session, job, digests):
+    """Schedules job(digest) on the worker pool for each blob once the current transaction commits."""
+    if digests:
+        session.info.setdefault(PENDING_KEY, {}).setdefault(job, set()).update(digests)
+
+
+def queue_derivatives(session, digests):
+    queue_blob_jobs(session, generate_derivatives, digests)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DERIVATIVE_WORKERS, thread_name_prefix='derivatives')
+        return _executor
+
+
+def submit_blob_jobs(job, digests, app=None):
+    """Runs job(digest) for each blob on the shared image worker pool, inside an app context."""
+    app = app or current_app._get_current_object()
+    executor = _get_executor()
+    for digest in digests:
+        executor.submit(_run_in_app_context, app, job, digest)
+
+
+def _run_in_app_context(app, job, digest):
+    with app.app_context():
+        try:
+            job(digest)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"{job.__name__} failed for blob {digest}: {e}")
+        finally:
+            db.session.remove()
+
+
+def _render(image, size, pillow_format, options):
+    """Writes one resized copy to a temp file; EXIF and other metadata are not carried over."""
+    resized = image.copy()
+    resized.thumbnail(size, Image.LANCZOS)
+    has_alpha = resized.mode in ('RGBA', 'LA') or (resized.mode == 'P' and 'transparency' in resized.info)
+    if pillow_format == 'JPEG' and resized.mode != 'RGB':
+        if has_alpha:
+            background = Image.new('RGB', resized.size, (255, 255, 255))
+            background.paste(resized, mask=resized.convert('RGBA').getchannel('A'))
+            resized = background
+        else:
+            resized = resized.convert('RGB')
+    elif pillow_format == 'WEBP' and resized.mode not in ('RGB', 'RGBA'):
+        resized = resized.convert('RGBA' if has_alpha else 'RGB')
+
+    os.makedirs(INGEST_TMP_FOLDER, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=INGEST_TMP_FOLDER, suffix='.derivative')
+    with os.fdopen(fd, 'wb') as out:
+        resized.save(out, pillow_format, **options)
+    return tmp_path, resized.size
+
+
+def generate_derivatives(digest):
+    """
+    Builds the thumbnail and preview renditions of an image blob, stores them
+    next to the blob, and records them on the blob and on every Upload_Files
+    row that points at it.
+    """
+    blob = db.session.get(FileBlob, digest)
+    if blob is None or Image is None or blob.content_type not in IMAGE_CONTENT_TYPES:
+        return None
+    if blob.derivatives:
+        # Already built; fill in rows attached while the first run was in flight
+        db.session.execute(
+            update(Upload_Files)
+                .where(Upload_Files.blob_digest == digest, Upload_Files.derivatives.is_(None))
+                .values(derivatives=blob.derivatives)
+        )
+        db.session.commit()
+        return blob.derivatives
+
+    backend = get_storage_backend(blob.backend)
+    largest = max(DERIVATIVE_SIZES.values())
+    with backend.open(blob.storage_path) as source:
+        image = Image.open(source)
+        image.draft('RGB', largest)  # JPEG: decode at reduced scale when possible
+        image = ImageOps.exif_transpose(image)  # bake in the orientation before EXIF is dropped
+        image.load()
+
+    derivatives = {}
+    for name, size in DERIVATIVE_SIZES.items():
+        entry = {}
+        for ext, (pillow_format, options) in DERIVATIVE_FORMATS.items():
+            tmp_path, (width, height) = _render(image, size, pillow_format, options)
+            path = backend.derivative_locator(digest, f"{name}.{ext}")
+            backend.save_file(tmp_path, path, f"image/{ext}")
+            entry[ext] = backend.public_path(path)
+            entry['width'], entry['height'] = width, height
+        derivatives[name] = entry
+
+    blob.derivatives = derivatives
+    db.session.execute(
+        update(Upload_Files).where(Upload_Files.blob_digest == digest).values(derivatives=derivatives)
+    )
+    db.session.commit()
+    logger.info(f"Generated derivatives for blob {digest}")
+    return derivatives
+
+
+def _after_commit(session):
+    if session.get_nested_transaction() is not None:
+        return
+    for job, digests in session.info.pop(PENDING_KEY, {}).items():
+        submit_blob_jobs(job, digests)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_KEY, None)
+
+
+def register_derivative_listeners():
+    """Hands queued blob jobs (derivatives, tiles) to the worker pool once their upload has committed."""
+    if not event.contains(db.session, 'after_commit', _after_commit):
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
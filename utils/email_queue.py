@@ -0,0 +1,229 @@
+# utils/email_queue.py
+import logging
+import os
+import random
+import smtplib
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, insert, or_
+
+from models import db, EmailJob, generate_uuid
+from utils.smtp_pool import smtp_pool, deliver_email, SMTP_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+EMAIL_RETRY_MAX_SECONDS = int(os.getenv("EMAIL_RETRY_MAX_SECONDS", 3600))
+# A job left in 'sending' this long belongs to a worker that died; it is picked up again
+EMAIL_LOCK_TIMEOUT_SECONDS = int(os.getenv("EMAIL_LOCK_TIMEOUT_SECONDS", 300))
+EMAIL_WORKER_BATCH_SIZE = int(os.getenv("EMAIL_WORKER_BATCH_SIZE", 50))
+EMAIL_WORKER_POLL_SECONDS = float(os.getenv("EMAIL_WORKER_POLL_SECONDS", 2))
+# Sent and failed jobs are kept this long (without their body) before the worker deletes them
+EMAIL_RETENTION_DAYS = int(os.getenv("EMAIL_RETENTION_DAYS", 14))
+EMAIL_PURGE_INTERVAL_SECONDS = 3600
+EMAIL_PURGE_BATCH_SIZE = 1000
+
+
+def enqueue_email(recipients, subject, body, session=None, max_attempts=EMAIL_MAX_ATTEMPTS):
+    """
+    Adds an email job to the session. It is only delivered if the caller's
+    transaction commits, so invites and similar records never announce
+    something that was rolled back. The caller commits.
+    """
+    session = session or db.session
+    job = EmailJob(recipients=list(recipients), subject=subject, body=body, max_attempts=max_attempts)
+    session.add(job)
+    return job
+
+
+def enqueue_emails(messages, session=None, max_attempts=EMAIL_MAX_ATTEMPTS):
+    """
+    Bulk version of enqueue_email for (recipients, subject, body) tuples:
+    one INSERT for the whole batch. The caller commits.
+    """
+    session = session or db.session
+    now = datetime.utcnow()
+    rows = [
+        {'job_id': generate_uuid(), 'recipients': list(recipients), 'subject': subject, 'body': body,
+         'status': 'queued', 'attempts': 0, 'max_attempts': max_attempts, 'run_after': now, 'created_at': now}
+        for recipients, subject, body in messages
+    ]
+    if rows:
+        session.execute(insert(EmailJob), rows)
+    return len(rows)
+
+
+def enqueue_email_now(recipients, subject, body, max_attempts=EMAIL_MAX_ATTEMPTS):
+    """Writes an email job on its own connection so it is queued regardless of the caller's transaction."""
+    job_id = generate_uuid()
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        conn.execute(insert(EmailJob).values(
+            job_id=job_id, recipients=list(recipients), subject=subject, body=body,
+            status='queued', attempts=0, max_attempts=max_attempts, run_after=now, created_at=now,
+        ))
+    return job_id
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: ~30s, 1m, 2m, 4m ... capped at EMAIL_RETRY_MAX_SECONDS."""
+    delay = min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def is_permanent_failure(error):
+    """5xx answers to the message itself (bad recipient, rejected content) will not succeed on retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in error.recipients.values())
+    return (isinstance(error, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError))
+            and 500 <= error.smtp_code < 600)
+
+
+def claim_jobs(worker_id, limit=EMAIL_WORKER_BATCH_SIZE):
+    """
+    Locks up to `limit` due jobs for this worker and marks them 'sending'.
+    SKIP LOCKED lets several workers poll the same table without handing
+    out the same job twice. Returns (job_id, recipients, subject, body) tuples.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=EMAIL_LOCK_TIMEOUT_SECONDS)
+    jobs = (
+        db.session.query(EmailJob)
+            .filter(or_(
+                and_(EmailJob.status == 'queued', EmailJob.run_after <= now),
+                and_(EmailJob.status == 'sending', EmailJob.locked_at < stale),
+            ))
+            .order_by(EmailJob.run_after)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+    )
+    claimed = []
+    for job in jobs:
+        job.status = 'sending'
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts = (job.attempts or 0) + 1
+        claimed.append((job.job_id, job.recipients, job.subject, job.body))
+    db.session.commit()
+    return claimed
+
+
+def _deliver(payload):
+    job_id, recipients, subject, body = payload
+    try:
+        deliver_email(recipients, subject, body, pool=smtp_pool)
+        return job_id, None
+    except Exception as e:
+        return job_id, e
+
+
+def record_results(worker_id, results):
+    """
+    Marks delivered jobs sent and reschedules (or fails) the rest. Finished
+    jobs lose their body (OTP codes, invite links), which is not needed
+    once nothing will send it again. Commits.
+    """
+    now = datetime.utcnow()
+    for job_id, error in results:
+        job = db.session.get(EmailJob, job_id)
+        if job is None or job.locked_by != worker_id:
+            continue  # reclaimed by another worker after our lock timed out
+        job.locked_by = None
+        job.locked_at = None
+        if error is None:
+            job.status = 'sent'
+            job.sent_at = now
+            job.last_error = None
+            job.body = ''
+            continue
+        job.last_error = f"{type(error).__name__}: {error}"[:2000]
+        if is_permanent_failure(error) or job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.body = ''
+            logger.error(f"Email job {job_id} to {job.recipients} failed permanently: {error}")
+        else:
+            job.status = 'queued'
+            job.run_after = now + retry_delay(job.attempts)
+            logger.warning(f"Email job {job_id} attempt {job.attempts} failed, retrying after {job.run_after}: {error}")
+    db.session.commit()
+
+
+def process_email_batch(worker_id, executor, limit=EMAIL_WORKER_BATCH_SIZE):
+    """Claims one batch, delivers it over the SMTP pool and records the outcome. Returns the batch size."""
+    payloads = claim_jobs(worker_id, limit)
+    if payloads:
+        record_results(worker_id, list(executor.map(_deliver, payloads)))
+    return len(payloads)
+
+
+def purge_email_jobs(retention_days=EMAIL_RETENTION_DAYS, batch_size=EMAIL_PURGE_BATCH_SIZE):
+    """
+    Deletes sent and failed jobs whose last attempt was more than
+    `retention_days` ago. Works in batches of primary keys found through
+    the (status, run_after) index, committing after each, so no long-running
+    delete holds locks on the table. Returns the number of rows deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    for status in ('sent', 'failed'):
+        while True:
+            ids = [job_id for (job_id,) in db.session.query(EmailJob.job_id).filter(
+                EmailJob.status == status, EmailJob.run_after < cutoff).limit(batch_size)]
+            if not ids:
+                break
+            db.session.execute(delete(EmailJob).where(EmailJob.job_id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+    return deleted
+
+
+def run_email_worker(once=False, batch_size=EMAIL_WORKER_BATCH_SIZE, poll_seconds=EMAIL_WORKER_POLL_SECONDS,
+                     retention_days=EMAIL_RETENTION_DAYS):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Email worker {worker_id} started")
+    next_purge = 0.0
+    with ThreadPoolExecutor(max_workers=SMTP_POOL_SIZE, thread_name_prefix='email') as executor:
+        try:
+            while True:
+                if time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + EMAIL_PURGE_INTERVAL_SECONDS
+                    try:
+                        purged = purge_email_jobs(retention_days)
+                        if purged:
+                            logger.info(f"Purged {purged} finished email job(s)")
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.exception(f"Email job purge failed: {e}")
+                try:
+                    processed = process_email_batch(worker_id, executor, batch_size)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception(f"Email worker batch failed: {e}")
+                    processed = 0
+                if processed:
+                    continue
+                if once:
+                    break
+                time.sleep(poll_seconds)
+        finally:
+            smtp_pool.close_all()
+            db.session.remove()
+
+
+@click.command('email-worker')
+@click.option('--once', is_flag=True, help='Exit once no job is due instead of polling.')
+@click.option('--batch-size', default=EMAIL_WORKER_BATCH_SIZE, show_default=True)
+@click.option('--poll-seconds', default=EMAIL_WORKER_POLL_SECONDS, show_default=True)
+@click.option('--retention-days', default=EMAIL_RETENTION_DAYS, show_default=True,
+              help='Days sent and failed jobs are kept; purged hourly by the worker.')
+@with_appcontext
+def email_worker_command(once, batch_size, poll_seconds, retention_days):
+    """Delivers queued emails (email_jobs) over pooled SMTP sessions and purges old finished jobs."""
+    run_email_worker(once=once, batch_size=batch_size, poll_seconds=poll_seconds, retention_days=retention_days)
@@ -1,25 +1,17 @@
 # utils/email_utils.py
-import os
-from email.message import EmailMessage
-import smtplib
 import logging
 
+from utils.email_queue import enqueue_email_now
+
 logger = logging.getLogger(__name__)
 
 def send_email(recipients, subject, body):
-    """Send a simple plaintext email via SMTP (Gmail example)."""
-    msg = EmailMessage()
-    msg['Subject'] = subject
-    msg['From'] = os.getenv('EMAIL_SENDER')
-    msg['To'] = ', '.join(recipients)
-    msg.set_content(body)
-
-    try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as smtp:
-            smtp.starttls()
-            smtp.login(os.getenv('EMAIL_SENDER'), os.getenv('EMAIL_PASSWORD'))
-            smtp.send_message(msg)
-        logger.info("Email sent to %s", recipients)
-    except Exception as e:
-        logger.exception("Failed to send email: %s", e)
-        raise
+    """
+    Queue a simple plaintext email; `flask email-worker` delivers it.
+    The job is durable as soon as this returns, independent of the caller's
+    transaction. To send only if the caller's transaction commits, use
+    utils.email_queue.enqueue_email instead.
+    """
+    job_id = enqueue_email_now(recipients, subject, body)
+    logger.info("Email to %s queued as job %s", recipients, job_id)
+    return job_id
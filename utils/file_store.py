@@ -0,0 +1,218 @@
+# utils/file_store.py
+import logging
+import os
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+from models import db, FileBlob, Upload_Files
+from utils.derivatives import derivative_locators
+from utils.ingest import as_ingest_stream
+from utils.storage_backends import get_storage_backend
+from utils.tiles import tile_locators
+
+logger = logging.getLogger(__name__)
+
+# Keys under session.info used to carry state until the transaction ends
+DELTAS_KEY = 'file_store_ref_deltas'     # {digest: +/- references}
+WRITTEN_KEY = 'file_store_written'       # {digest: (backend, path)} blobs first written in this transaction
+RELEASED_KEY = 'file_store_released'     # [(backend, path)] blob files to remove once the commit succeeds
+
+
+def blob_public_path(blob):
+    """Value to store in Upload_Files.file_path for a blob."""
+    return get_storage_backend(blob.backend).public_path(blob.storage_path)
+
+
+def _release(backend_name, path):
+    try:
+        get_storage_backend(backend_name).delete(path)
+    except Exception as e:
+        logger.error(f"Failed to remove blob {path} from {backend_name} storage: {e}")
+
+
+def store_blob(file, session=None, backend=None):
+    """
+    Stores the contents of an uploaded FileStorage once per digest and returns
+    its FileBlob. The upload's digest, size and type come from the single
+    ingest pass (utils.ingest); a new blob is moved into place from the ingest
+    temp file and a known one just drops it. Reference counts are kept by the
+    session listeners below, based on the Upload_Files rows that point at the
+    blob.
+    """
+    session = session or db.session
+    ingest = as_ingest_stream(file)
+    digest, size, content_type = ingest.digest, ingest.size, ingest.mimetype
+
+    with session.no_autoflush:
+        blob = session.get(FileBlob, digest)
+    if blob is not None:
+        existing_backend = get_storage_backend(blob.backend)
+        if existing_backend.exists(blob.storage_path):
+            ingest.close()
+            return blob
+        # Row exists but its file went missing; put it back where the row points
+        existing_backend.save_file(ingest.claim(), blob.storage_path, blob.content_type)
+        logger.warning(f"Restored missing blob {blob.storage_path}")
+        return blob
+
+    backend = backend or get_storage_backend()
+    ext = os.path.splitext(secure_filename(file.filename or ''))[1].lower()
+    path = backend.locator(digest, ext)
+    backend.save_file(ingest.claim(), path, content_type)
+
+    blob = FileBlob(digest=digest, backend=backend.name, storage_path=path, size=size,
+                    content_type=content_type, ref_count=0)
+    try:
+        with session.begin_nested():
+            session.add(blob)
+    except IntegrityError:
+        # Another request stored the same contents first; use its row. It was
+        # committed after this transaction's snapshot, which a plain read may
+        # not see under REPEATABLE READ; a locking read always does.
+        existing = session.execute(
+            select(FileBlob).where(FileBlob.digest == digest).with_for_update()
+            .execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if existing is not None:
+            if (existing.backend, existing.storage_path) != (backend.name, path):
+                _release(backend.name, path)
+            return existing
+        # The other row was removed again (e.g. released as unreferenced); keep ours
+        with session.begin_nested():
+            session.add(blob)
+
+    session.info.setdefault(WRITTEN_KEY, {})[digest] = (backend.name, path)
+    return blob
+
+
+def _add_delta(session, digest, delta):
+    if digest:
+        deltas = session.info.setdefault(DELTAS_KEY, {})
+        deltas[digest] = deltas.get(digest, 0) + delta
+
+
+def add_blob_references(session, digests):
+    """
+    Counts references for Upload_Files rows inserted with a bulk INSERT, which
+    the flush hooks below never see.
+    """
+    for digest in digests:
+        _add_delta(session, digest, 1)
+
+
+def _before_flush(session, flush_context, instances):
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Upload_Files):
+                _add_delta(session, obj.blob_digest, 1)
+        for obj in session.deleted:
+            if isinstance(obj, Upload_Files):
+                history = inspect(obj).attrs.blob_digest.history
+                digest = history.deleted[0] if history.deleted else obj.blob_digest
+                _add_delta(session, digest, -1)
+        for obj in session.dirty:
+            if isinstance(obj, Upload_Files):
+                history = inspect(obj).attrs.blob_digest.history
+                for digest in history.added or ():
+                    _add_delta(session, digest, 1)
+                for digest in history.deleted or ():
+                    _add_delta(session, digest, -1)
+
+
+def _before_commit(session):
+    if session.get_nested_transaction() is not None:
+        return  # savepoint release; wait for the real commit
+    # Flush first so every Upload_Files change in this transaction is counted
+    session.flush()
+    deltas = session.info.pop(DELTAS_KEY, {})
+    for digest, delta in deltas.items():
+        if delta:
+            session.execute(
+                update(FileBlob.__table__)
+                    .where(FileBlob.__table__.c.digest == digest)
+                    .values(ref_count=FileBlob.__table__.c.ref_count + delta)
+            )
+
+    # Blobs that lost a reference, or were stored but never attached, may now be unused
+    candidates = {digest for digest, delta in deltas.items() if delta < 0}
+    candidates |= set(session.info.get(WRITTEN_KEY, {}))
+    if not candidates:
+        return
+    orphans = session.query(FileBlob).filter(
+        FileBlob.digest.in_(candidates), FileBlob.ref_count <= 0
+    ).execution_options(populate_existing=True).all()
+    released = session.info.setdefault(RELEASED_KEY, [])
+    for blob in orphans:
+        released.append((blob.backend, blob.storage_path))
+        released.extend((blob.backend, path) for path in derivative_locators(blob))
+        released.extend((blob.backend, path) for path in tile_locators(blob))
+        session.delete(blob)
+    if orphans:
+        session.flush()
+
+
+def _after_commit(session):
+    if session.get_nested_transaction() is not None:
+        return
+    session.info.pop(WRITTEN_KEY, None)
+    for backend_name, path in session.info.pop(RELEASED_KEY, []):
+        _release(backend_name, path)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if previous_transaction.nested:
+        return
+    session.info.pop(DELTAS_KEY, None)
+    session.info.pop(RELEASED_KEY, None)
+    # Files written for blobs that were never committed are orphans now
+    for backend_name, path in session.info.pop(WRITTEN_KEY, {}).values():
+        _release(backend_name, path)
+
+
+def register_file_store_listeners():
+    """
+    Keeps FileBlob.ref_count in sync with the Upload_Files rows that point at
+    each blob and removes a blob's file once its last reference is deleted.
+    Counts are adjusted just before commit; files are removed after it.
+    Bulk Query.delete() calls and ON DELETE CASCADE bypass these hooks; use
+    the rebuild-file-blob-refs command to repair any drift they cause.
+    """
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'before_commit', _before_commit)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
+
+
+def release_legacy_file(upload):
+    """Removes the on-disk file of an upload stored before the blob store existed."""
+    if upload.blob_digest is None and upload.file_path and os.path.exists(upload.file_path):
+        os.remove(upload.file_path)
+        logger.info(f"Deleted file from disk: {upload.file_path}")
+
+
+@click.command('rebuild-file-blob-refs')
+@with_appcontext
+def rebuild_file_blob_refs_command():
+    """Recounts blob references from upload_files and removes unused blobs."""
+    counts = dict(db.session.execute(
+        select(Upload_Files.blob_digest, func.count(Upload_Files.file_id))
+            .where(Upload_Files.blob_digest.isnot(None))
+            .group_by(Upload_Files.blob_digest)
+    ).all())
+    removed = 0
+    for blob in FileBlob.query.all():
+        blob.ref_count = counts.get(blob.digest, 0)
+        if blob.ref_count <= 0:
+            db.session.delete(blob)
+            removed += 1
+    # Deleted blobs are queued by the commit hooks and their files removed after commit
+    db.session.info.setdefault(RELEASED_KEY, []).extend(
+        (blob.backend, blob.storage_path) for blob in db.session.deleted if isinstance(blob, FileBlob)
+    )
+    db.session.commit()
+    click.echo(f"Recounted {len(counts)} blob(s), removed {removed} unused blob(s).")
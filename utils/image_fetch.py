@@ -0,0 +1,379 @@
+# utils/image_fetch.py
+import hashlib
+import ipaddress
+import logging
+import os
+import posixpath
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import click
+import httpcore
+import httpx
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, insert, or_
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from models import db, FileBlob, ImageFetch, Pin, generate_uuid
+from utils.derivatives import IMAGE_CONTENT_TYPES
+from utils.file_store import store_blob, blob_public_path
+from utils.ingest import IngestStream, COPY_CHUNK_SIZE
+from utils.storage import attach_blobs, delete_files, get_upload_owner
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FETCH_WORKERS = int(os.getenv("IMAGE_FETCH_WORKERS", 4))
+IMAGE_FETCH_MAX_BYTES = int(os.getenv("IMAGE_FETCH_MAX_BYTES", 10 * 1024 * 1024))
+IMAGE_FETCH_TIMEOUT = httpx.Timeout(15, connect=5)
+IMAGE_FETCH_MAX_ATTEMPTS = 3
+# Each redirect is checked like the original URL before it is followed
+IMAGE_FETCH_MAX_REDIRECTS = 3
+# Pending fetches older than this were lost with their process and are picked up by the sweeper
+IMAGE_FETCH_STALE_MINUTES = 15
+# Allow fetching from private/loopback addresses (local testing only)
+IMAGE_FETCH_ALLOW_PRIVATE = os.getenv("IMAGE_FETCH_ALLOW_PRIVATE", "").lower() in ("1", "true", "yes")
+FETCHED_EXTENSIONS = {'image/png': '.png', 'image/jpeg': '.jpg', 'image/gif': '.gif',
+                      'image/webp': '.webp', 'image/bmp': '.bmp', 'image/tiff': '.tiff'}
+
+# Key under session.info: fetch ids to start once the transaction commits
+PENDING_KEY = 'image_fetches_pending'
+
+_executor = None
+_http = None
+_lock = threading.Lock()
+# Fetches of the same URL serialize on one of these, picked by the URL's hash; a fixed set, so it never grows
+URL_LOCK_STRIPES = 64
+_url_locks = [threading.Lock() for _ in range(URL_LOCK_STRIPES)]
+
+
+class ImageFetchError(Exception):
+    """The remote image could not be fetched or is not an acceptable image."""
+
+
+def url_hash(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def queue_image_fetches(session, owner_type, targets):
+    """
+    Records a fetch for each (owner_id, url) with one bulk INSERT; the
+    downloads start on the fetch pool once the transaction commits. Returns
+    the fetch ids. The caller commits.
+    """
+    rows = [{
+        'fetch_id': generate_uuid(),
+        'owner_type': owner_type,
+        'owner_id': owner_id,
+        'url': url,
+        'url_hash': url_hash(url),
+        'status': 'pending',
+        'attempts': 0,
+        'created_at': datetime.utcnow(),
+    } for owner_id, url in targets if url]
+    if rows:
+        session.execute(insert(ImageFetch), rows)
+        session.info.setdefault(PENDING_KEY, []).extend(row['fetch_id'] for row in rows)
+    return [row['fetch_id'] for row in rows]
+
+
+def queue_image_fetch(session, owner_type, owner_id, url):
+    fetch_ids = queue_image_fetches(session, owner_type, [(owner_id, url)])
+    return fetch_ids[0] if fetch_ids else None
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_FETCH_WORKERS, thread_name_prefix='image-fetch')
+        return _executor
+
+
+class PublicOnlyBackend(httpcore.SyncBackend):
+    """
+    Connects only to addresses that passed the public-address check, and to
+    exactly the address that was checked, so DNS answering differently for
+    the connection (rebinding) cannot reach an internal service.
+    """
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        address = resolve_public(host, port)[0]
+        return super().connect_tcp(address, port, timeout=timeout, local_address=local_address,
+                                   socket_options=socket_options)
+
+
+class PublicOnlyTransport(httpx.HTTPTransport):
+    """HTTP transport whose connections go through PublicOnlyBackend; TLS is still verified against the hostname."""
+
+    def __init__(self, limits):
+        super().__init__(limits=limits)
+        self._pool = httpcore.ConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=PublicOnlyBackend(),
+        )
+
+
+def _get_http():
+    global _http
+    with _lock:
+        if _http is None:
+            # Redirects are followed by download_image, which checks each hop; no proxies from the environment
+            _http = httpx.Client(timeout=IMAGE_FETCH_TIMEOUT, follow_redirects=False, trust_env=False,
+                                 transport=PublicOnlyTransport(httpx.Limits(max_connections=IMAGE_FETCH_WORKERS * 2)),
+                                 headers={"Accept": "image/*"})
+        return _http
+
+
+def _url_lock(key):
+    return _url_locks[int(key[:8], 16) % URL_LOCK_STRIPES]
+
+
+def submit_image_fetches(fetch_ids, app=None):
+    """Runs fetch_image for each id on the fetch pool (at most IMAGE_FETCH_WORKERS downloads at a time)."""
+    app = app or current_app._get_current_object()
+    executor = _get_executor()
+    for fetch_id in fetch_ids:
+        executor.submit(_run_in_app_context, app, fetch_id)
+
+
+def _run_in_app_context(app, fetch_id):
+    with app.app_context():
+        try:
+            fetch_image(fetch_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Image fetch {fetch_id} failed: {e}")
+        finally:
+            db.session.remove()
+
+
+def resolve_public(host, port):
+    """
+    The addresses of `host`, refusing hosts that resolve to any non-public
+    address (unless IMAGE_FETCH_ALLOW_PRIVATE).
+    """
+    try:
+        addresses = list(dict.fromkeys(info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)))
+    except socket.gaierror as e:
+        raise ImageFetchError(f"Cannot resolve {host}: {e}")
+    if not IMAGE_FETCH_ALLOW_PRIVATE:
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split('%')[0])
+            if not ip.is_global:
+                raise ImageFetchError(f"Refusing to fetch from non-public address {address}.")
+    return addresses
+
+
+def check_url(url):
+    """Only http(s) URLs of public hosts are fetched, so user-supplied URLs cannot reach internal services."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ImageFetchError("Only http(s) image URLs can be fetched.")
+    resolve_public(parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80))
+
+
+def download_image(url, max_bytes=IMAGE_FETCH_MAX_BYTES):
+    """
+    Streams a remote image into an IngestStream (hashed and sniffed on the
+    way, never more than `max_bytes` on disk or in memory) and returns it as
+    a FileStorage ready for store_blob. Redirects are followed here, up to
+    IMAGE_FETCH_MAX_REDIRECTS, and each target is checked like the original URL.
+    """
+    name = posixpath.basename(urlparse(url).path) or 'image'
+    # No filename, so the type comes from the magic bytes alone and not from the URL's extension
+    ingest = IngestStream(limit=max_bytes)
+    http = _get_http()
+    try:
+        for _ in range(IMAGE_FETCH_MAX_REDIRECTS + 1):
+            check_url(url)
+            response = http.send(http.build_request('GET', url), stream=True)
+            try:
+                if response.is_redirect:
+                    url = str(response.next_request.url)
+                    continue
+                response.raise_for_status()
+                if int(response.headers.get('Content-Length') or 0) > max_bytes:
+                    raise ImageFetchError(f"Image is larger than {max_bytes} bytes.")
+                for chunk in response.iter_bytes(COPY_CHUNK_SIZE):
+                    ingest.write(chunk)
+                break
+            finally:
+                response.close()
+        else:
+            raise ImageFetchError(f"More than {IMAGE_FETCH_MAX_REDIRECTS} redirects.")
+    except RequestEntityTooLarge:
+        ingest.close()
+        raise ImageFetchError(f"Image is larger than {max_bytes} bytes.")
+    except httpx.HTTPError as e:
+        ingest.close()
+        raise ImageFetchError(f"Download failed: {e}")
+    except Exception:
+        ingest.close()
+        raise
+
+    content_type = ingest.mimetype
+    if content_type not in IMAGE_CONTENT_TYPES:
+        ingest.close()
+        raise ImageFetchError(f"Not an image ({content_type}).")
+    ingest.seek(0)
+    stem = os.path.splitext(name)[0] or 'image'
+    return FileStorage(stream=ingest, filename=stem + FETCHED_EXTENSIONS[content_type], content_type=content_type)
+
+
+def _known_blob(fetch):
+    """The blob of an earlier fetch of the same URL, if its contents are still stored."""
+    digest = db.session.query(ImageFetch.blob_digest).filter(
+        ImageFetch.url_hash == fetch.url_hash, ImageFetch.status == 'done', ImageFetch.blob_digest.isnot(None)
+    ).order_by(ImageFetch.fetched_at.desc()).limit(1).scalar()
+    return db.session.get(FileBlob, digest) if digest else None
+
+
+def fetch_image(fetch_id):
+    """
+    Copies one remote image into the blob store and attaches it to its owner:
+    a pin's image_url is rewritten to the local copy; an inspiration gets it
+    as an upload. A URL fetched before is not downloaded again, and identical
+    contents share one blob. Fetches of the same URL run one at a time.
+    """
+    fetch = db.session.get(ImageFetch, fetch_id)
+    if fetch is None or fetch.status != 'pending':
+        return None
+
+    with _url_lock(fetch.url_hash):
+        db.session.refresh(fetch)
+        if fetch.status != 'pending':
+            return None
+        fetch.attempts += 1
+        try:
+            blob = _known_blob(fetch)
+            if blob is not None:
+                filename = posixpath.basename(blob.storage_path)
+            else:
+                file = download_image(fetch.url)
+                filename = file.filename
+                blob = store_blob(file)
+        except ImageFetchError as e:
+            fetch.status = 'failed' if fetch.attempts >= IMAGE_FETCH_MAX_ATTEMPTS else 'pending'
+            fetch.last_error = str(e)
+            db.session.commit()
+            logger.warning(f"Could not fetch image {fetch.url} for {fetch.owner_type} {fetch.owner_id}: {e}")
+            return None
+
+        if get_upload_owner(fetch.owner_type, fetch.owner_id) is None:
+            fetch.status, fetch.last_error = 'failed', f"The {fetch.owner_type} no longer exists."
+            db.session.commit()
+            return None
+
+        row = attach_blobs(fetch.owner_type, fetch.owner_id, [(blob, filename)])[0]
+        # The copy replaces earlier ones made for the same owner (e.g. the pin's image changed)
+        previous = db.session.query(ImageFetch).filter(
+            ImageFetch.owner_type == fetch.owner_type, ImageFetch.owner_id == fetch.owner_id,
+            ImageFetch.status == 'done', ImageFetch.fetch_id != fetch.fetch_id,
+        ).all()
+        if fetch.owner_type == 'pin':
+            delete_files([old.file_id for old in previous if old.file_id], 'pin', fetch.owner_id)
+            for old in previous:
+                db.session.delete(old)
+            db.session.query(Pin).filter(Pin.pin_id == fetch.owner_id).update(
+                {Pin.image_url: blob_public_path(blob)}, synchronize_session=False)
+
+        fetch.status = 'done'
+        fetch.blob_digest = blob.digest
+        fetch.file_id = row['file_id']
+        fetch.fetched_at = datetime.utcnow()
+        fetch.last_error = None
+        db.session.commit()
+        logger.info(f"Fetched image for {fetch.owner_type} {fetch.owner_id} into blob {blob.digest}")
+        return blob.digest
+
+
+def fetched_file_ids(owner_type, owner_ids, session=None):
+    """Upload_Files ids of the local copies made for these owners."""
+    session = session or db.session
+    return {file_id for (file_id,) in session.query(ImageFetch.file_id).filter(
+        ImageFetch.owner_type == owner_type, ImageFetch.owner_id.in_(list(owner_ids)),
+        ImageFetch.file_id.isnot(None))}
+
+
+def forget_fetches(owner_type, owner_ids, session=None):
+    """
+    Deletes the local copies and fetch records of owners about to be deleted.
+    The caller commits.
+    """
+    session = session or db.session
+    owner_ids = list(owner_ids)
+    if not owner_ids:
+        return
+    file_ids = fetched_file_ids(owner_type, owner_ids, session=session)
+    delete_files(file_ids, session=session)
+    session.query(ImageFetch).filter(ImageFetch.owner_type == owner_type, ImageFetch.owner_id.in_(owner_ids)) \
+        .delete(synchronize_session=False)
+
+
+def retry_image_fetches(limit=500):
+    """
+    Resubmits fetches still pending after IMAGE_FETCH_STALE_MINUTES: those
+    whose process died, and failed attempts with attempts left. Returns how many.
+    """
+    stale = datetime.utcnow() - timedelta(minutes=IMAGE_FETCH_STALE_MINUTES)
+    fetch_ids = [fetch_id for (fetch_id,) in db.session.query(ImageFetch.fetch_id).filter(
+        ImageFetch.status == 'pending', ImageFetch.created_at < stale
+    ).order_by(ImageFetch.created_at).limit(limit)]
+    submit_image_fetches(fetch_ids)
+    return len(fetch_ids)
+
+
+def backfill_pin_images(batch_size=500):
+    """Queues fetches for mirrored pins that still hot-link a remote image and have no fetch yet. Returns how many."""
+    queued = 0
+    while True:
+        pins = db.session.query(Pin.pin_id, Pin.image_url).filter(
+            Pin.pinterest_pin_id.isnot(None),
+            or_(Pin.image_url.like('http://%'), Pin.image_url.like('https://%')),
+            ~db.session.query(ImageFetch.fetch_id).filter(
+                ImageFetch.owner_type == 'pin', ImageFetch.owner_id == Pin.pin_id).exists(),
+        ).limit(batch_size).all()
+        if not pins:
+            return queued
+        queue_image_fetches(db.session, 'pin', pins)
+        db.session.commit()
+        queued += len(pins)
+
+
+def _after_commit(session):
+    if session.get_nested_transaction() is not None:
+        return
+    fetch_ids = session.info.pop(PENDING_KEY, None)
+    if fetch_ids:
+        submit_image_fetches(fetch_ids)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_KEY, None)
+
+
+def register_image_fetch_listeners():
+    """Starts queued image fetches on the fetch pool once the rows that asked for them have committed."""
+    if not event.contains(db.session, 'after_commit', _after_commit):
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
+
+
+@click.command('fetch-remote-images')
+@click.option('--backfill', is_flag=True, help='Also queue mirrored pins that still hot-link their image.')
+@with_appcontext
+def fetch_remote_images_command(backfill):
+    """Copies remote inspiration and pin images into the local blob store."""
+    if backfill:
+        click.echo(f"Queued {backfill_pin_images()} pin image(s).")
+    click.echo(f"Retrying {retry_image_fetches()} stale image fetch(es).")
+    _get_executor().shutdown(wait=True)  # let the queued downloads finish before exiting
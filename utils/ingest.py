@@ -0,0 +1,172 @@
+# utils/ingest.py
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from flask import Request, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from utils.storage_backends import UPLOAD_FOLDER
+
+logger = logging.getLogger(__name__)
+
+# Per-file limit. Fallback value is 5 * 1024 * 1024 bytes (5MB)
+MAX_FILE_SIZE = int(os.getenv("MAX_CONTENT_LENGTH", 5 * 1024 * 1024))
+# Whole-request limits (Flask's MAX_CONTENT_LENGTH / MAX_FORM_PARTS, see app.default_config)
+MAX_REQUEST_SIZE = int(os.getenv("MAX_REQUEST_SIZE", 50 * 1024 * 1024))
+MAX_FORM_PARTS = int(os.getenv("MAX_FORM_PARTS", 50))
+# Kept on the same filesystem as the blobs so finished files are renamed, not copied
+INGEST_TMP_FOLDER = os.path.join(UPLOAD_FOLDER, "tmp")
+COPY_CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 512
+
+# (magic prefix, offset, mimetype)
+MAGIC_NUMBERS = (
+    (b'%PDF-', 0, 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 0, 'image/png'),
+    (b'\xff\xd8\xff', 0, 'image/jpeg'),
+    (b'GIF87a', 0, 'image/gif'),
+    (b'GIF89a', 0, 'image/gif'),
+    (b'WEBP', 8, 'image/webp'),
+    (b'II*\x00', 0, 'image/tiff'),
+    (b'MM\x00*', 0, 'image/tiff'),
+    (b'BM', 0, 'image/bmp'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 0, 'application/msword'),
+)
+
+
+def sniff_mimetype(head, filename=None):
+    """Detects the type from the leading bytes; zip containers (docx, xlsx...) fall back to the extension."""
+    for magic, offset, mimetype in MAGIC_NUMBERS:
+        if head[offset:offset + len(magic)] == magic:
+            return mimetype
+    guessed = mimetypes.guess_type(filename or '')[0]
+    if head.startswith(b'PK\x03\x04'):
+        return guessed if guessed and guessed.startswith('application/vnd.') else 'application/zip'
+    return guessed or 'application/octet-stream'
+
+
+class IngestStream:
+    """
+    Writable temp file that hashes, measures and sniffs bytes as they are
+    written, and refuses to grow past `limit`. Werkzeug writes multipart file
+    parts straight into it (see IngestRequest), so by the time a view sees the
+    FileStorage its digest, size and type are already known.
+    """
+
+    def __init__(self, filename=None, limit=MAX_FILE_SIZE):
+        os.makedirs(INGEST_TMP_FOLDER, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=INGEST_TMP_FOLDER, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self.filename = filename
+        self.limit = limit
+        self.size = 0
+        self._sha = hashlib.sha256()
+        self._head = b''
+        self._claimed = False
+
+    @classmethod
+    def from_file(cls, path, filename=None):
+        """
+        Wraps a file that was assembled elsewhere (e.g. a finished chunked
+        upload) so it can be stored like any other upload. Its bytes are read
+        once to hash and sniff them; claim() then hands over the same path.
+        """
+        stream = cls.__new__(cls)
+        stream.path = path
+        stream._file = open(path, 'r+b')
+        stream.filename = filename
+        stream.limit = None
+        stream.size = 0
+        stream._sha = hashlib.sha256()
+        stream._head = b''
+        stream._claimed = False
+        for chunk in iter(lambda: stream._file.read(COPY_CHUNK_SIZE), b''):
+            stream._track(chunk)
+        stream._file.seek(0)
+        return stream
+
+    def _track(self, data):
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            self.close()
+            raise RequestEntityTooLarge(f"File '{self.filename}' exceeds the {self.limit} byte limit.")
+        self._sha.update(data)
+        if len(self._head) < SNIFF_BYTES:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+
+    def write(self, data):
+        self._track(data)
+        return self._file.write(data)
+
+    @property
+    def digest(self):
+        return self._sha.hexdigest()
+
+    @property
+    def mimetype(self):
+        return sniff_mimetype(self._head, self.filename)
+
+    def claim(self):
+        """Hands the finished temp file over to the caller, who must move or delete it."""
+        self._file.flush()
+        self._file.close()
+        self._claimed = True
+        return self.path
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self._claimed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def __getattr__(self, name):
+        # read/seek/tell/flush etc. go to the underlying file
+        return getattr(self._file, name)
+
+
+def as_ingest_stream(file, limit=MAX_FILE_SIZE):
+    """
+    Returns the IngestStream behind a FileStorage. Files that did not come
+    through IngestRequest (e.g. built from a download) are copied into one in
+    a single pass.
+    """
+    if isinstance(file.stream, IngestStream):
+        return file.stream
+    ingest = IngestStream(filename=file.filename, limit=limit)
+    try:
+        file.stream.seek(0)
+        shutil.copyfileobj(file.stream, ingest, COPY_CHUNK_SIZE)
+    except Exception:
+        ingest.close()
+        raise
+    return ingest
+
+
+class IngestRequest(Request):
+    """Streams multipart file parts into IngestStreams instead of Werkzeug's temp files."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return IngestStream(filename=filename)
+
+
+def parse_uploads():
+    """
+    Parses a multipart body now, so an oversized file is answered with a 413
+    instead of surfacing from inside a view's try/except. Called by
+    jwt_required once the caller is authenticated; anonymous requests never
+    get their parts written to INGEST_TMP_FOLDER up front.
+    """
+    if request.mimetype == 'multipart/form-data':
+        request.files
+
+
+def register_ingest(app):
+    app.request_class = IngestRequest
@@ -0,0 +1,188 @@
+# utils/invites.py
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, insert, update
+
+from models import db, Invite, User, generate_uuid
+from utils.email_queue import enqueue_emails
+
+INVITE_TTL = timedelta(hours=72)
+MAX_INVITES_PER_REQUEST = int(os.getenv("MAX_INVITES_PER_REQUEST", 1000))
+# Expired and accepted invites are kept this long before the sweeper deletes them
+INVITE_RETENTION_DAYS = int(os.getenv("INVITE_RETENTION_DAYS", 7))
+INVITE_PURGE_BATCH_SIZE = 1000
+# Compared against when no invite matches, so misses take as long as hash mismatches
+_DUMMY_HASH = hashlib.sha256(b'').hexdigest()
+
+
+def frontend_base_url():
+    base_url = current_app.config.get("FRONTEND_BASE_URL") or os.environ.get("FRONTEND_BASE_URL", "http://localhost:5173")
+    return base_url.rstrip("/")
+
+
+def hash_verifier(salt, verifier):
+    return hashlib.sha256((salt + verifier).encode()).hexdigest()
+
+
+def new_invite_token():
+    """
+    Returns (token, selector, salt, token_hash). The token handed out is
+    "<selector>.<verifier>": the selector is stored as-is (unique, indexed)
+    to find the invite, the verifier only as a salted hash.
+    """
+    selector = secrets.token_urlsafe(12)
+    verifier = secrets.token_urlsafe(32)
+    salt = secrets.token_hex(16)
+    return f"{selector}.{verifier}", selector, salt, hash_verifier(salt, verifier)
+
+
+def find_invite(raw_token):
+    """
+    Returns the invite a token belongs to, or None. The selector is an
+    indexed point lookup; the verifier hash is compared in constant time.
+    """
+    if not isinstance(raw_token, str) or not raw_token:
+        return None
+    selector, dot, verifier = raw_token.partition('.')
+    if dot:
+        invite = Invite.query.filter_by(selector=selector).first()
+        if invite is None:
+            hmac.compare_digest(hash_verifier('', verifier), _DUMMY_HASH)
+            return None
+        return invite if hmac.compare_digest(hash_verifier(invite.salt, verifier), invite.token_hash) else None
+
+    # Links sent before selectors existed: "<raw_token>" hashed whole, found by its 8-char prefix.
+    # They expire within INVITE_TTL, so only unexpired ones (via the expires_at index) are checked.
+    legacy = Invite.query.filter(Invite.selector.is_(None), Invite.expires_at > datetime.utcnow(),
+                                 Invite.raw_token_id == raw_token[:8])
+    for invite in legacy:
+        if hmac.compare_digest(hash_verifier(invite.salt, raw_token), invite.token_hash):
+            return invite
+    return None
+
+
+def normalize_emails(emails):
+    """Strips, lowercases and de-duplicates the list; returns (emails, invalid entries)."""
+    valid, invalid, seen = [], [], set()
+    for entry in emails:
+        email = entry.strip().lower() if isinstance(entry, str) else ''
+        if '@' not in email:
+            invalid.append(entry)
+        elif email not in seen:
+            seen.add(email)
+            valid.append(email)
+    return valid, invalid
+
+
+def create_invites(emails, company_id, created_by_user_id, build_email, role_id=None, session=None):
+    """
+    Invites a whole list of addresses to a company in a fixed number of
+    statements: one IN query for registered users, one for active invites,
+    one bulk INSERT for new invites, one bulk UPDATE for re-sent ones and one
+    bulk INSERT into the email queue. An address with an active invite gets a
+    fresh token on that invite (only the token hash is stored, so the old
+    link cannot be rebuilt). `build_email(email, invite_link)` returns
+    (subject, body). Returns a status entry per address. The caller commits.
+    """
+    session = session or db.session
+    valid, invalid = normalize_emails(emails)
+    results = [{"email": entry, "status": "invalid"} for entry in invalid]
+    if not valid:
+        return results
+
+    now = datetime.utcnow()
+    # Emails are compared case-insensitively by MySQL's default collation
+    registered = {
+        email.lower() for (email,) in session.query(User.user_email)
+            .filter(User.company_id == company_id, User.user_email.in_(valid))
+    }
+    active_invites = {
+        email.lower(): invite_id for invite_id, email in session.query(Invite.invite_id, Invite.email)
+            .filter(Invite.company_id == company_id, Invite.single_use.is_(True),
+                    Invite.expires_at > now, Invite.email.in_(valid))
+            .order_by(Invite.created_at)  # the newest invite per address wins
+    }
+
+    base_url = frontend_base_url()
+    expires_at = now + INVITE_TTL
+    new_rows, resent_rows, messages = [], [], []
+    for email in valid:
+        if email in registered:
+            results.append({"email": email, "status": "already_registered"})
+            continue
+
+        raw_token, selector, salt, token_hash = new_invite_token()
+        token_fields = {
+            'raw_token_id': None,
+            'selector': selector,
+            'token_hash': token_hash,
+            'salt': salt,
+            'expires_at': expires_at,
+        }
+        if role_id is not None:
+            token_fields['role_id'] = role_id
+        if email in active_invites:
+            resent_rows.append({'invite_id': active_invites[email], **token_fields})
+            status = "reinvited"
+        else:
+            new_rows.append({
+                'invite_id': generate_uuid(),
+                'email': email,
+                'company_id': company_id,
+                'created_by_user_id': created_by_user_id,
+                'single_use': True,
+                'accepted': False,
+                'created_at': now,
+                **token_fields,
+            })
+            status = "invited"
+
+        invite_link = f"{base_url}/invite/accept?token={raw_token}"
+        subject, body = build_email(email, invite_link)
+        messages.append(([email], subject, body))
+        results.append({"email": email, "status": status, "invite_link": invite_link})
+
+    if new_rows:
+        session.execute(insert(Invite), new_rows)
+    if resent_rows:
+        session.execute(update(Invite), resent_rows)  # bulk UPDATE by primary key
+    enqueue_emails(messages, session=session)
+    return results
+
+
+def purge_invites(retention_days=INVITE_RETENTION_DAYS, batch_size=INVITE_PURGE_BATCH_SIZE):
+    """
+    Deletes invites that expired, or were accepted, more than
+    `retention_days` ago. Works in batches of primary keys, committing after
+    each, so no long-running delete holds locks on the table. Returns the
+    number of rows deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    # One pass per indexed column rather than an OR across both
+    for condition in (Invite.expires_at < cutoff, Invite.accepted_at < cutoff):
+        while True:
+            ids = [invite_id for (invite_id,) in
+                   db.session.query(Invite.invite_id).filter(condition).limit(batch_size)]
+            if not ids:
+                break
+            db.session.execute(delete(Invite).where(Invite.invite_id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+    return deleted
+
+
+@click.command('purge-invites')
+@click.option('--retention-days', default=INVITE_RETENTION_DAYS, show_default=True)
+@with_appcontext
+def purge_invites_command(retention_days):
+    """Deletes expired and accepted invites older than the retention period."""
+    deleted = purge_invites(retention_days)
+    click.echo(f"Purged {deleted} invite(s).")
@@ -0,0 +1,49 @@
+# utils/latency.py
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """
+    Per-stage wall-clock breakdown of one request. Wrap each stage in
+    `with timer.stage('name'):`, then `log()` it and/or send it to the
+    browser as a Server-Timing header (shown in the devtools network panel).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, (time.perf_counter() - start) * 1000))
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages]
+        parts.append(f"total;dur={self.total_ms:.1f}")
+        return ", ".join(parts)
+
+    def log(self, outcome, level=logging.INFO):
+        breakdown = " ".join(f"{name}={ms:.1f}ms" for name, ms in self.stages)
+        logger.log(level, f"{self.name} {outcome} total={self.total_ms:.1f}ms {breakdown}")
+
+    def apply(self, response, outcome):
+        """Logs the breakdown and adds it to a view's (body, status) or Response as Server-Timing."""
+        self.log(outcome)
+        if isinstance(response, tuple):
+            body, status = response
+            return body, status, {"Server-Timing": self.server_timing()}
+        response.headers["Server-Timing"] = self.server_timing()
+        return response
@@ -0,0 +1,108 @@
+# utils/passwords.py
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost for new hashes; hashes of any other cost are rehashed on the next successful login
+BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+# bcrypt is CPU-bound, so more workers than cores only adds queueing inside the CPU
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 0)) or os.cpu_count() or 1
+# A request gives up on a hash taking longer than this (pool saturated)
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+# Workers must not be forked from the threaded server process, with its open DB/SMTP sockets;
+# they only need this module and bcrypt. forkserver is not available on Windows.
+PASSWORD_HASH_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_executor = None
+_executor_lock = threading.Lock()
+_dummy_hash = None
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password_hash, password, rounds):
+    """Runs in a pool process: checks the password and, if it matches a hash of another cost, rehashes it."""
+    try:
+        if not bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')):
+            return False, None
+    except ValueError:
+        # Malformed hash, or a password bcrypt refuses (over 72 bytes)
+        return False, None
+    if hash_rounds(password_hash) != rounds:
+        return True, _hash(password, rounds)
+    return True, None
+
+
+def hash_rounds(password_hash):
+    """The cost of a bcrypt hash ("$2b$12$..." -> 12), or None if it is not one."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                            mp_context=multiprocessing.get_context(PASSWORD_HASH_START_METHOD))
+        return _executor
+
+
+def _run(fn, *args):
+    """Runs fn in the hashing pool, starting a new pool once if a worker process died."""
+    global _executor
+    for attempt in range(2):
+        executor = _get_executor()
+        try:
+            return executor.submit(fn, *args).result(timeout=PASSWORD_HASH_TIMEOUT)
+        except BrokenProcessPool:
+            logger.warning("Password hashing pool broke; starting a new one")
+            with _executor_lock:
+                if _executor is executor:
+                    _executor = None
+            if attempt:
+                raise
+
+
+def hash_password(password, rounds=BCRYPT_LOG_ROUNDS):
+    """bcrypt hash of `password` at the configured cost, computed in the hashing pool."""
+    return _run(_hash, password, rounds)
+
+
+def verify_password(password_hash, password, rounds=BCRYPT_LOG_ROUNDS):
+    """
+    Checks `password` against a stored bcrypt hash in the hashing pool, so
+    the request thread only waits and the number of hashes in flight is
+    bounded by the CPU count. Returns (matches, new_hash); new_hash is set
+    when the password matched a hash of another cost and should replace it.
+    Without a stored hash (unknown user) a dummy one is checked, so response
+    times do not reveal which emails have accounts.
+    """
+    global _dummy_hash
+    if not password:
+        return False, None
+    if not password_hash:
+        if _dummy_hash is None:
+            _dummy_hash = hash_password(os.urandom(16).hex(), rounds)
+        _run(_verify, _dummy_hash, password, rounds)
+        return False, None
+    return _run(_verify, password_hash, password, rounds)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
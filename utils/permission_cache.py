@@ -0,0 +1,110 @@
+# utils/permission_cache.py
+import os
+import threading
+import time
+import logging
+
+from cachetools import TTLCache
+from sqlalchemy import or_
+
+from models import db, Permission, UserRole, RolePermission
+
+logger = logging.getLogger(__name__)
+
+PERMISSION_CACHE_TTL = int(os.getenv("PERMISSION_CACHE_TTL", 300))
+PERMISSION_CACHE_SIZE = int(os.getenv("PERMISSION_CACHE_SIZE", 10000))
+
+
+class PermissionCache:
+    """
+    In-process cache of compiled permission sets keyed by (user_id, company_id).
+    Each entry holds whether the user has any role and the set of permission
+    names granted through those roles, so a warm check runs no queries.
+    Entries expire after `ttl` seconds, at most `maxsize` are kept, and they
+    are dropped explicitly whenever roles, permissions or role assignments
+    are written. Every invalidation bumps a generation counter; a set
+    compiled while the generation changed is returned but not stored, so a
+    stale set cannot outlive the invalidation that raced with it.
+    """
+
+    def __init__(self, ttl=PERMISSION_CACHE_TTL, maxsize=PERMISSION_CACHE_SIZE):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+        self._known_permissions = None  # (expires_at, frozenset of names)
+        self.hits = 0
+        self.misses = 0
+
+    def _compile(self, user_id, company_id):
+        """Loads the user's roles and the permissions they grant in one query."""
+        query = db.session.query(UserRole.role_id, Permission.permission_name).outerjoin(
+            RolePermission, RolePermission.role_id == UserRole.role_id
+        ).outerjoin(
+            Permission, Permission.permission_id == RolePermission.permission_id
+        ).filter(UserRole.user_id == user_id)
+        if company_id:
+            query = query.filter(or_(UserRole.company_id == company_id, UserRole.company_id.is_(None)))
+
+        rows = query.all()
+        has_roles = bool(rows)
+        permissions = frozenset(name for _, name in rows if name)
+        return has_roles, permissions
+
+    def get(self, user_id, company_id=None):
+        """Returns (has_roles, permission_names) for the user, loading on a miss."""
+        key = (user_id, company_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self._generation
+
+        entry = self._compile(user_id, company_id)
+        with self._lock:
+            if self._generation == generation:
+                self._entries[key] = entry
+        return entry
+
+    def permission_exists(self, permission_name):
+        now = time.monotonic()
+        with self._lock:
+            known = self._known_permissions
+            generation = self._generation
+        if not known or known[0] <= now:
+            names = frozenset(name for (name,) in db.session.query(Permission.permission_name).all() if name)
+            known = (now + self.ttl, names)
+            with self._lock:
+                if self._generation == generation:
+                    self._known_permissions = known
+        return permission_name in known[1]
+
+    def invalidate_user(self, user_id):
+        """Drops every cached entry for a user (all companies)."""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def invalidate_all(self):
+        """Drops every cached entry, e.g. after a role's permissions change."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._known_permissions = None
+
+    def stats(self):
+        with self._lock:
+            self._entries.expire()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self._entries.maxsize,
+                "ttl_seconds": self.ttl,
+            }
+
+
+permission_cache = PermissionCache()
@@ -0,0 +1,285 @@
+# utils/pinterest_client.py
+import hashlib
+import importlib.util
+import logging
+import os
+import random
+import threading
+import time
+
+import httpx
+from cachetools import LRUCache, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Point at a local stand-in (`flask pinterest-mock`) for testing
+PINTEREST_API_BASE = os.getenv("PINTEREST_API_BASE", "https://api.pinterest.com/v5")
+PINTEREST_CONNECT_TIMEOUT = float(os.getenv("PINTEREST_CONNECT_TIMEOUT", 3))
+PINTEREST_READ_TIMEOUT = float(os.getenv("PINTEREST_READ_TIMEOUT", 10))
+PINTEREST_MAX_CONNECTIONS = int(os.getenv("PINTEREST_MAX_CONNECTIONS", 20))
+# httpx speaks HTTP/2 only when the optional h2 package is installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Client-side throttling: token buckets (requests per second, burst) for the whole app and per account
+PINTEREST_APP_RATE = float(os.getenv("PINTEREST_APP_RATE", 10))
+PINTEREST_APP_BURST = int(os.getenv("PINTEREST_APP_BURST", 20))
+PINTEREST_ACCOUNT_RATE = float(os.getenv("PINTEREST_ACCOUNT_RATE", 2))
+PINTEREST_ACCOUNT_BURST = int(os.getenv("PINTEREST_ACCOUNT_BURST", 10))
+# A request that would have to wait longer than this for the rate limit fails with 429 instead
+PINTEREST_MAX_THROTTLE_WAIT = float(os.getenv("PINTEREST_MAX_THROTTLE_WAIT", 5))
+# GETs are retried on 429, 5xx and network errors, at most this often per call...
+PINTEREST_MAX_RETRIES = int(os.getenv("PINTEREST_MAX_RETRIES", 3))
+PINTEREST_RETRY_BASE_DELAY = 0.5
+PINTEREST_RETRY_MAX_DELAY = 8.0
+# ...and retries overall may add at most this share to the request volume
+PINTEREST_RETRY_RATIO = float(os.getenv("PINTEREST_RETRY_RATIO", 0.2))
+# Board metadata and board lookups are cached per account for this many seconds
+PINTEREST_CACHE_TTL = int(os.getenv("PINTEREST_CACHE_TTL", 600))
+PINTEREST_CACHE_SIZE = 2048
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PinterestAPIError(Exception):
+    """
+    A Pinterest call failed; `status_code` is None for network errors and
+    timeouts. `retry_after` (seconds) is set when it failed on a rate limit.
+    """
+
+    def __init__(self, message, status_code=None, details=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+        self.retry_after = retry_after
+
+
+def rate_limit_headers(error):
+    """Response headers for an endpoint passing a PinterestAPIError on to its caller."""
+    return {"Retry-After": str(int(error.retry_after + 0.999))} if error.retry_after else {}
+
+
+class TokenBucket:
+    """
+    `rate` requests per second with bursts of up to `capacity`. Callers
+    reserve a token and sleep for the wait returned, so waiters queue in
+    order. The bucket can also be paused until a time the API asked for.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, max_wait):
+        """Takes a token and returns the seconds to wait before using it, or None (taking nothing) if above max_wait."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max((1 - self.tokens) / self.rate if self.tokens < 1 else 0.0, self.paused_until - now)
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def refund(self):
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RetryBudget:
+    """
+    Every request earns `ratio` of a retry and each retry spends one, so
+    retries stay a bounded share of traffic while the API is failing instead
+    of multiplying it. `floor` retries per second are allowed regardless.
+    """
+
+    def __init__(self, ratio=PINTEREST_RETRY_RATIO, floor=1.0, capacity=20):
+        self.ratio = ratio
+        self.floor = floor
+        self.capacity = capacity
+        self.balance = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, earned):
+        now = time.monotonic()
+        self.balance = min(self.capacity, self.balance + earned + (now - self.updated) * self.floor)
+        self.updated = now
+
+    def deposit(self):
+        with self.lock:
+            self._refill(self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            self._refill(0)
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+def _header_seconds(response, name):
+    try:
+        value = float(response.headers[name])
+    except (KeyError, ValueError):
+        return None
+    # X-RateLimit-Reset is seconds until the reset; tolerate an epoch timestamp too
+    return max(value - time.time(), 0.0) if value > 1e9 else value
+
+
+class PinterestClient:
+    """
+    Thin Pinterest v5 client over one pooled httpx.Client: connections are
+    kept alive (and multiplexed over HTTP/2 when available) across requests
+    and threads, and every call has connect/read timeouts. Calls are
+    throttled per app and per account, the X-RateLimit-* headers pause an
+    account whose quota is used up, GETs are retried within a budget and
+    board metadata and lookups are cached.
+    """
+
+    def __init__(self, base_url=PINTEREST_API_BASE):
+        self.http = httpx.Client(
+            base_url=base_url,
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(PINTEREST_READ_TIMEOUT, connect=PINTEREST_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=PINTEREST_MAX_CONNECTIONS,
+                                max_keepalive_connections=PINTEREST_MAX_CONNECTIONS),
+            headers={"Accept": "application/json"},
+        )
+        self.app_bucket = TokenBucket(PINTEREST_APP_RATE, PINTEREST_APP_BURST)
+        self.account_buckets = LRUCache(maxsize=PINTEREST_CACHE_SIZE)
+        self.retry_budget = RetryBudget()
+        self.cache = TTLCache(maxsize=PINTEREST_CACHE_SIZE, ttl=PINTEREST_CACHE_TTL)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def account_key(access_token):
+        return hashlib.sha256(access_token.encode()).hexdigest()[:32]
+
+    def _account_bucket(self, access_token):
+        key = self.account_key(access_token)
+        with self.lock:
+            bucket = self.account_buckets.get(key)
+            if bucket is None:
+                bucket = self.account_buckets[key] = TokenBucket(PINTEREST_ACCOUNT_RATE, PINTEREST_ACCOUNT_BURST)
+            return bucket
+
+    def _throttle(self, buckets, max_wait):
+        """Waits for a token from every bucket, or raises a 429 PinterestAPIError if that takes longer than max_wait."""
+        waits = []
+        for bucket in buckets:
+            wait = bucket.reserve(max_wait)
+            if wait is None:
+                for taken in buckets[:len(waits)]:
+                    taken.refund()
+                raise PinterestAPIError("Pinterest rate limit reached, try again later.",
+                                        status_code=429, retry_after=max(bucket.paused_until - time.monotonic(), 1))
+            waits.append(wait)
+        if max(waits) > 0:
+            time.sleep(max(waits))
+
+    def request(self, method, path, access_token, max_wait=PINTEREST_MAX_THROTTLE_WAIT, **kwargs):
+        """
+        Sends one API request and returns the decoded JSON body, raising
+        PinterestAPIError on failure. GETs are retried on 429, 5xx and
+        network errors with jittered exponential backoff (or the delay the
+        API asks for) while the retry budget allows.
+        """
+        headers = {"Authorization": f"Bearer {access_token}", **kwargs.pop('headers', {})}
+        buckets = (self.app_bucket, self._account_bucket(access_token))
+        retries = PINTEREST_MAX_RETRIES if method == 'GET' else 0
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            self._throttle(buckets, max_wait)
+            try:
+                return self._send(method, path, headers=headers, account_bucket=buckets[1], **kwargs)
+            except PinterestAPIError as e:
+                retryable = e.status_code is None or e.status_code in RETRYABLE_STATUS_CODES
+                if not retryable or attempt >= retries:
+                    raise
+                delay = e.retry_after or random.uniform(0, min(PINTEREST_RETRY_MAX_DELAY,
+                                                               PINTEREST_RETRY_BASE_DELAY * 2 ** attempt))
+                if delay > PINTEREST_RETRY_MAX_DELAY or not self.retry_budget.withdraw():
+                    raise
+                attempt += 1
+                logger.info(f"Retrying Pinterest {method} {path} in {delay:.2f}s (attempt {attempt}): {e}")
+                time.sleep(delay)
+
+    def _send(self, method, path, account_bucket=None, **kwargs):
+        try:
+            response = self.http.request(method, path, **kwargs)
+        except httpx.TimeoutException as e:
+            raise PinterestAPIError(f"Pinterest request timed out: {e}") from e
+        except httpx.HTTPError as e:
+            raise PinterestAPIError(f"Network error while connecting to Pinterest: {e}") from e
+
+        retry_after = None
+        if response.status_code == 429:
+            retry_after = _header_seconds(response, 'Retry-After') or _header_seconds(response, 'X-RateLimit-Reset') or 1.0
+        elif response.headers.get('X-RateLimit-Remaining') == '0':
+            retry_after = _header_seconds(response, 'X-RateLimit-Reset')
+        if retry_after and account_bucket is not None:
+            account_bucket.pause(retry_after)
+
+        if response.is_error:
+            try:
+                details = response.json()
+            except ValueError:
+                details = {"message": response.text}
+            raise PinterestAPIError(f"Pinterest API returned {response.status_code}",
+                                    status_code=response.status_code, details=details,
+                                    retry_after=retry_after if response.status_code == 429 else None)
+        return response.json()
+
+    def get(self, path, access_token, params=None, max_wait=PINTEREST_MAX_THROTTLE_WAIT):
+        return self.request('GET', path, access_token, params=params, max_wait=max_wait)
+
+    def cached_get(self, path, access_token, params=None):
+        """A GET whose successful responses are kept for PINTEREST_CACHE_TTL, per account."""
+        key = (self.account_key(access_token), path, tuple(sorted((params or {}).items())))
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]
+        data = self.get(path, access_token, params=params)
+        with self.lock:
+            self.cache[key] = data
+        return data
+
+    def lookup_board(self, access_token, board_url, fields="id"):
+        return self.cached_get("/boards/lookup", access_token, params={"url": board_url, "fields": fields})
+
+    def board(self, access_token, board_id, fields=None):
+        return self.cached_get(f"/boards/{board_id}", access_token, params={"fields": fields} if fields else None)
+
+    def board_pins(self, access_token, board_id, bookmark=None, page_size=None, max_wait=PINTEREST_MAX_THROTTLE_WAIT):
+        params = {key: value for key, value in (('bookmark', bookmark), ('page_size', page_size)) if value}
+        return self.get(f"/boards/{board_id}/pins", access_token, params=params or None, max_wait=max_wait)
+
+    def oauth_token(self, form, client_id, client_secret):
+        """POSTs an OAuth grant (authorization_code or refresh_token) with the app's Basic credentials."""
+        return self._send('POST', '/oauth/token', data=form, auth=(client_id or '', client_secret or ''))
+
+    def close(self):
+        self.http.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_pinterest_client():
+    """The process-wide client, so every request shares its connection pool, rate limits and cache."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PinterestClient()
+        return _client
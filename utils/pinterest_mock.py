@@ -0,0 +1,136 @@
+# utils/pinterest_mock.py
+import json
+import re
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import click
+
+BOARD_PINS_RE = re.compile(r'^/v5/boards/([^/]+)/pins$')
+BOARD_RE = re.compile(r'^/v5/boards/([^/]+)$')
+MOCK_PINS_PER_BOARD = 5
+MOCK_PAGE_SIZE = 25  # Pinterest's default page_size
+MOCK_EPOCH = datetime(2024, 1, 1)
+
+
+def mock_pin(board_id, index):
+    pin_id = f"{board_id}-pin-{index}"
+    return {
+        "id": pin_id,
+        "board_id": board_id,
+        "title": f"Mock pin {index} of {board_id}",
+        "description": "",
+        "link": None,
+        # Boards list newest first, so pin 0 is the most recent
+        "created_at": (MOCK_EPOCH - timedelta(hours=index)).isoformat(),
+        "media": {"media_type": "image", "images": {
+            "600x": {"url": f"https://i.pinimg.com/600x/{pin_id}.jpg", "width": 600, "height": 800},
+        }},
+    }
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """
+    Answers the Pinterest v5 endpoints this app calls with canned data.
+    Board ids starting with "missing" return 404; board pins are paged by
+    page_size with the next offset as bookmark. Every response is delayed by
+    the server's latency to imitate a real round trip, and the next
+    `server.rate_limit_next` requests are answered 429 with Retry-After.
+    """
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        time.sleep(self.server.latency)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self.send_json(401, {"code": 2, "message": "Authentication failed."})
+        self.server.requests += 1
+        if self.server.rate_limit_next > 0:
+            self.server.rate_limit_next -= 1
+            return self.send_json(429, {"code": 8, "message": "Rate limit exceeded."},
+                                  {"Retry-After": "1", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1"})
+        if url.path == '/v5/boards/lookup':
+            slug = parse_qs(url.query).get('url', [''])[0].rstrip('/').rsplit('/', 1)[-1]
+            return self.send_json(200, {"id": f"lookup-{slug}"})
+        match = BOARD_PINS_RE.match(url.path)
+        if match:
+            board_id = match.group(1)
+            if board_id.startswith('missing'):
+                return self.send_json(404, {"code": 40, "message": "Board not found."})
+            query = parse_qs(url.query)
+            start = int(query.get('bookmark', ['0'])[0])
+            end = min(start + int(query.get('page_size', [MOCK_PAGE_SIZE])[0]), self.server.pins_per_board)
+            self.server.pin_requests += 1
+            return self.send_json(200, {
+                "items": [mock_pin(board_id, i) for i in range(start, end)],
+                "bookmark": str(end) if end < self.server.pins_per_board else None,
+            })
+        match = BOARD_RE.match(url.path)
+        if match and match.group(1) != 'lookup':
+            board_id = match.group(1)
+            if board_id.startswith('missing'):
+                return self.send_json(404, {"code": 40, "message": "Board not found."})
+            return self.send_json(200, {"id": board_id, "name": f"Board {board_id}",
+                                        "url": f"/mock-user/{board_id}/", "privacy": "PUBLIC"})
+        if url.path == '/v5/boards':
+            return self.send_json(200, {"items": [{"id": "mock-board", "name": "Mock board"}], "bookmark": None})
+        if url.path == '/v5/user_account':
+            return self.send_json(200, {"username": "mock-user", "id": "mock-account"})
+        return self.send_json(404, {"code": 404, "message": "Not found."})
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/v5/oauth/token':
+            return self.send_json(404, {"code": 404, "message": "Not found."})
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        self.server.token_requests += 1
+        if 'invalid' in form.get('refresh_token', [''])[0]:
+            return self.send_json(400, {"code": 1, "message": "Invalid refresh token."})
+        return self.send_json(200, {
+            "access_token": f"mock-access-{self.server.token_requests}",
+            "refresh_token": f"mock-refresh-{self.server.token_requests}",
+            "token_type": "bearer",
+            "expires_in": 2592000,
+            "scope": "boards:read,pins:read",
+        })
+
+
+class PinterestMockServer(ThreadingHTTPServer):
+    """Local stand-in for api.pinterest.com; run the app with PINTEREST_API_BASE=http://<host>:<port>/v5."""
+    daemon_threads = True
+
+    def __init__(self, host, port, latency=0.0, pins_per_board=MOCK_PINS_PER_BOARD):
+        super().__init__((host, port), _MockHandler)
+        self.latency = latency
+        self.pins_per_board = pins_per_board
+        self.token_requests = 0
+        self.pin_requests = 0
+        self.requests = 0
+        self.rate_limit_next = 0
+
+
+@click.command('pinterest-mock')
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', default=8089, type=int)
+@click.option('--latency', default=0.1, show_default=True, help='Seconds added to every response.')
+@click.option('--pins-per-board', default=MOCK_PINS_PER_BOARD, show_default=True)
+def pinterest_mock_command(host, port, latency, pins_per_board):
+    """Runs a local mock of the Pinterest v5 API for testing."""
+    with PinterestMockServer(host, port, latency, pins_per_board) as server:
+        click.echo(f"Pinterest mock listening on http://{host}:{port}/v5")
+        server.serve_forever()
@@ -0,0 +1,337 @@
+# utils/pinterest_sync.py
+import base64
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, insert, or_, update
+
+from models import db, Boards, Pin, PinTag, Comment, Upload_Files, Pinterest, generate_uuid
+from utils.image_fetch import queue_image_fetches, fetched_file_ids, forget_fetches
+from utils.pinterest_client import get_pinterest_client, PinterestAPIError, PINTEREST_MAX_THROTTLE_WAIT
+from utils.pinterest_tokens import get_access_token
+
+logger = logging.getLogger(__name__)
+
+# Pinterest v5 allows up to 250 pins per page
+PINTEREST_SYNC_PAGE_SIZE = int(os.getenv("PINTEREST_SYNC_PAGE_SIZE", 250))
+# A board is re-synced (incrementally) once its last sync is older than this
+PINTEREST_SYNC_INTERVAL_MINUTES = int(os.getenv("PINTEREST_SYNC_INTERVAL_MINUTES", 15))
+# ...and paged through completely, to pick up edits and deletions, once a day
+PINTEREST_FULL_SYNC_HOURS = int(os.getenv("PINTEREST_FULL_SYNC_HOURS", 24))
+# Scheduled syncs wait this long for the client's rate limiter; syncs run on a read use the client default
+PINTEREST_SYNC_MAX_WAIT = 60
+# Boards one sync pass works on at the same time; the shared client's rate limiter still paces the requests
+PINTEREST_FETCH_WORKERS = int(os.getenv("PINTEREST_FETCH_WORKERS", 6))
+PINS_DEFAULT_PAGE_SIZE = 50
+PINS_MAX_PAGE_SIZE = 250
+# Rendition copied into the blob store for Pin.image_url, in order of preference
+IMAGE_SIZES = ('600x', '1200x', 'originals', '400x300', '150x150')
+# Pin.image_url is not among them: it hot-links the remote image only until utils.image_fetch
+# has copied it, and is reset (and the copy redone) when the pin's media changes
+MIRRORED_FIELDS = ('title', 'content', 'link', 'media', 'pinterest_created_at')
+
+
+def company_access_token(company_id):
+    """The company's Pinterest access token, refreshed if it is expiring; None if Pinterest is not connected."""
+    pinterest_auth = Pinterest.query.filter_by(company_id=company_id).first()
+    return get_access_token(pinterest_auth) if pinterest_auth and pinterest_auth.access_token else None
+
+
+def parse_pinterest_datetime(value):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+
+
+def pin_image_url(media):
+    images = (media or {}).get('images') or {}
+    for size in IMAGE_SIZES:
+        if images.get(size, {}).get('url'):
+            return images[size]['url']
+    return next((image['url'] for image in images.values() if image.get('url')), None)
+
+
+def mirrored_fields(item):
+    """The Pin columns a Pinterest pin object maps to."""
+    return {
+        'title': item.get('title'),
+        'content': item.get('description'),
+        'link': item.get('link'),
+        'media': item.get('media'),
+        'pinterest_created_at': parse_pinterest_datetime(item.get('created_at')),
+    }
+
+
+def _delete_stale_pins(board_id, pin_ids):
+    """
+    Deletes mirrored pins that are gone from Pinterest. Pins with comments or
+    files attached by users are kept so that nothing users added is lost;
+    local copies of the pin image are deleted with the pin.
+    Returns the number deleted.
+    """
+    copies = fetched_file_ids('pin', pin_ids)
+    referenced = {pin_id for (pin_id,) in db.session.query(Comment.pin_id).filter(Comment.pin_id.in_(pin_ids))}
+    referenced |= {pin_id for pin_id, file_id in db.session.query(Upload_Files.pin_id, Upload_Files.file_id)
+                   .filter(Upload_Files.pin_id.in_(pin_ids)) if file_id not in copies}
+    stale = [pin_id for pin_id in pin_ids if pin_id not in referenced]
+    if stale:
+        forget_fetches('pin', stale)
+        db.session.execute(delete(PinTag).where(PinTag.pin_id.in_(stale)))
+        db.session.execute(delete(Pin).where(Pin.board_id == board_id, Pin.pin_id.in_(stale)))
+    return len(stale)
+
+
+def sync_board_pins(board_id, access_token=None, full=False, page_size=PINTEREST_SYNC_PAGE_SIZE,
+                    max_wait=PINTEREST_MAX_THROTTLE_WAIT):
+    """
+    Mirrors the pins of an imported board into the pins table and commits.
+
+    Pages through the board's bookmarks, inserting new pins and updating
+    changed ones with one bulk statement each per page. Pinterest lists a
+    board newest first, so an incremental sync stops at the first page on
+    which nothing is new or changed; a full sync (`full`, or a board never
+    fully synced) walks every page and then deletes pins no longer on the
+    board. The board row is locked for the duration, so concurrent syncs of
+    the same board run one after the other.
+
+    Returns a dict of counts. Raises PinterestAPIError (after rolling back)
+    if a page cannot be fetched.
+    """
+    board = db.session.query(Boards).filter_by(board_id=board_id).with_for_update().one()
+    try:
+        access_token = access_token or company_access_token(board.company_id)
+    except PinterestAPIError:
+        db.session.rollback()
+        raise
+    if not board.pinterest_board_id or not access_token:
+        db.session.rollback()
+        raise PinterestAPIError("Board is not linked to Pinterest or the Pinterest account is not connected.")
+    full = full or board.pins_full_synced_at is None
+
+    existing = {
+        row.pinterest_pin_id: row for row in db.session.query(
+            Pin.pin_id, Pin.pinterest_pin_id, Pin.image_url, *(getattr(Pin, field) for field in MIRRORED_FIELDS)
+        ).filter(Pin.board_id == board.board_id, Pin.pinterest_pin_id.isnot(None))
+    }
+    now = datetime.utcnow()
+    client = get_pinterest_client()
+    stats = {'pages': 0, 'inserted': 0, 'updated': 0, 'deleted': 0}
+    seen, bookmark, reached_end = set(), None, False
+    try:
+        while True:
+            data = client.board_pins(access_token, board.pinterest_board_id, bookmark=bookmark,
+                                     page_size=page_size, max_wait=max_wait)
+            stats['pages'] += 1
+            new_rows, changed_rows, image_fetches = [], [], []
+            for item in data.get('items', []):
+                pinterest_pin_id = str(item.get('id') or '')
+                if not pinterest_pin_id or pinterest_pin_id in seen:
+                    continue
+                seen.add(pinterest_pin_id)
+                fields = mirrored_fields(item)
+                current = existing.get(pinterest_pin_id)
+                remote_image = pin_image_url(fields['media'])
+                if current is None:
+                    pin_id = generate_uuid()
+                    image_fetches.append((pin_id, remote_image))
+                    new_rows.append({
+                        'pin_id': pin_id,
+                        'board_id': board.board_id,
+                        'space_id': board.space_id,
+                        'pinterest_pin_id': pinterest_pin_id,
+                        'pin_type': 'pinterest',
+                        'created_at': now,
+                        **fields,
+                        'image_url': remote_image,
+                        # Keyset pagination needs a timestamp on every mirrored pin
+                        'pinterest_created_at': fields['pinterest_created_at'] or now,
+                    })
+                else:
+                    fields['pinterest_created_at'] = fields['pinterest_created_at'] or current.pinterest_created_at
+                    if any(getattr(current, field) != value for field, value in fields.items()):
+                        image_url = current.image_url
+                        if fields['media'] != current.media:
+                            image_url = remote_image
+                            image_fetches.append((current.pin_id, remote_image))
+                        changed_rows.append({'pin_id': current.pin_id, **fields, 'image_url': image_url})
+
+            if new_rows:
+                db.session.execute(insert(Pin), new_rows)
+            if changed_rows:
+                db.session.execute(update(Pin), changed_rows)  # bulk UPDATE by primary key
+            # Pin images are copied to the blob store by the fetch pool once this sync commits
+            queue_image_fetches(db.session, 'pin', image_fetches)
+            stats['inserted'] += len(new_rows)
+            stats['updated'] += len(changed_rows)
+
+            bookmark = data.get('bookmark')
+            if not bookmark:
+                reached_end = True
+                break
+            if not full and not new_rows and not changed_rows:
+                break
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if full and reached_end:
+        gone = [row.pin_id for pinterest_pin_id, row in existing.items() if pinterest_pin_id not in seen]
+        if gone:
+            stats['deleted'] = _delete_stale_pins(board.board_id, gone)
+        board.pins_full_synced_at = now
+    board.pins_synced_at = now
+    db.session.commit()
+    return stats
+
+
+def ensure_board_synced(board, access_token=None):
+    """Runs the first sync of a board that has never been mirrored, so reads can be served locally."""
+    if board.pinterest_board_id and board.pins_synced_at is None:
+        sync_board_pins(board.board_id, access_token=access_token)
+
+
+def boards_due_for_sync(now=None):
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(minutes=PINTEREST_SYNC_INTERVAL_MINUTES)
+    return [board_id for (board_id,) in db.session.query(Boards.board_id).filter(
+        Boards.pinterest_board_id.isnot(None),
+        or_(Boards.pins_synced_at.is_(None), Boards.pins_synced_at < cutoff),
+    ).order_by(Boards.pins_synced_at)]
+
+
+def _sync_board_in_app(app, board_id, full):
+    """Runs one board's sync on a pool thread, in its own app context and so its own session."""
+    with app.app_context():
+        try:
+            return sync_board_pins(board_id, full=full, max_wait=PINTEREST_SYNC_MAX_WAIT), None
+        except PinterestAPIError as e:
+            return None, e
+
+
+def sync_due_boards(full=False, max_workers=PINTEREST_FETCH_WORKERS):
+    """
+    Syncs every imported board whose last sync is older than the interval;
+    a board is synced in full if its last full sync is older than
+    PINTEREST_FULL_SYNC_HOURS. Up to `max_workers` boards are synced
+    concurrently, each in its own session, and the results are reported in
+    due order. A board that fails is logged and retried on the next pass.
+    Returns (boards synced, boards failed).
+    """
+    full_cutoff = datetime.utcnow() - timedelta(hours=PINTEREST_FULL_SYNC_HOURS)
+    due = boards_due_for_sync()
+    last_full_syncs = dict(db.session.query(Boards.board_id, Boards.pins_full_synced_at)
+                           .filter(Boards.board_id.in_(due))) if due else {}
+    jobs = [(board_id, full or last_full_syncs.get(board_id) is None or last_full_syncs[board_id] < full_cutoff)
+            for board_id in due]
+    db.session.rollback()  # the workers lock the board rows; hold nothing here
+
+    app = current_app._get_current_object()
+    synced = failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pinterest-sync') as executor:
+        results = executor.map(lambda job: _sync_board_in_app(app, *job), jobs)
+        for (board_id, _), (stats, error) in zip(jobs, results):
+            if error is not None:
+                logger.warning(f"Pinterest sync of board {board_id} failed: {error}")
+                failed += 1
+                continue
+            logger.info(f"Synced Pinterest board {board_id}: {stats}")
+            synced += 1
+    return synced, failed
+
+
+def encode_pin_cursor(pin):
+    """Encodes the (pinterest_created_at, pin_id) keyset of the last pin on a page into an opaque cursor."""
+    raw = json.dumps([pin.pinterest_created_at.isoformat(), pin.pin_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_pin_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_pin_cursor.
+    Returns: (pinterest_created_at, pin_id)
+    Raises: ValueError if the cursor is malformed.
+    """
+    try:
+        created_at, pin_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        created_at = datetime.fromisoformat(created_at)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not pin_id:
+        raise ValueError("Invalid cursor.")
+    return created_at, pin_id
+
+
+def page_size_arg(args):
+    """Reads `page_size` from the query string, capped at PINS_MAX_PAGE_SIZE. Raises ValueError on bad input."""
+    page_size = args.get('page_size', PINS_DEFAULT_PAGE_SIZE, type=int)
+    if page_size is None or page_size < 1:
+        raise ValueError("'page_size' must be a positive integer.")
+    return min(page_size, PINS_MAX_PAGE_SIZE)
+
+
+def mirrored_pins_page(board_id, bookmark=None, page_size=PINS_DEFAULT_PAGE_SIZE):
+    """
+    One page of a board's mirrored pins, newest first, from the local table.
+    `bookmark` is the cursor returned with the previous page. Returns
+    (pins, next bookmark or None). Raises ValueError on a bad bookmark.
+    """
+    query = Pin.query.filter(Pin.board_id == board_id, Pin.pinterest_pin_id.isnot(None))
+    if bookmark:
+        after_created_at, after_pin_id = decode_pin_cursor(bookmark)
+        query = query.filter(or_(
+            Pin.pinterest_created_at < after_created_at,
+            and_(Pin.pinterest_created_at == after_created_at, Pin.pin_id < after_pin_id),
+        ))
+    pins = query.order_by(Pin.pinterest_created_at.desc(), Pin.pin_id.desc()).limit(page_size + 1).all()
+    has_next = len(pins) > page_size
+    pins = pins[:page_size]
+    return pins, encode_pin_cursor(pins[-1]) if has_next else None
+
+
+def serialize_mirrored_pin(pin, pinterest_board_id=None):
+    """A mirrored pin in the shape of a Pinterest v5 pin object, plus the local pin_id."""
+    return {
+        "id": pin.pinterest_pin_id,
+        "pin_id": pin.pin_id,
+        "board_id": pinterest_board_id,
+        "title": pin.title,
+        "description": pin.content,
+        "link": pin.link,
+        "image_url": pin.image_url,
+        "media": pin.media,
+        "created_at": pin.pinterest_created_at.isoformat() if pin.pinterest_created_at else None,
+    }
+
+
+@click.command('sync-pinterest-pins')
+@click.option('--full', is_flag=True, help='Page through every bookmark of every due board.')
+@click.option('--board-id', default=None, help='Sync only this local board, whether due or not.')
+@click.option('--interval', default=0, show_default=True,
+              help='Seconds between passes; 0 runs a single pass (e.g. from cron).')
+@click.option('--workers', default=PINTEREST_FETCH_WORKERS, show_default=True,
+              help='Boards synced at the same time.')
+@with_appcontext
+def sync_pinterest_pins_command(full, board_id, interval, workers):
+    """Mirrors the pins of imported Pinterest boards into the pins table."""
+    if board_id:
+        click.echo(f"Synced board {board_id}: {sync_board_pins(board_id, full=full, max_wait=PINTEREST_SYNC_MAX_WAIT)}")
+        return
+    while True:
+        try:
+            synced, failed = sync_due_boards(full=full, max_workers=workers)
+            click.echo(f"Synced {synced} board(s), {failed} failed.")
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Pinterest sync pass failed: {e}")
+        if not interval:
+            break
+        db.session.remove()
+        time.sleep(interval)
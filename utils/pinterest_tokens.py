@@ -0,0 +1,173 @@
+# utils/pinterest_tokens.py
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from models import db, Pinterest
+from utils.pinterest_client import get_pinterest_client, PinterestAPIError
+
+logger = logging.getLogger(__name__)
+
+# A token this close to expiry is refreshed before it is used
+TOKEN_EXPIRY_MARGIN = timedelta(minutes=5)
+# The renewal scheduler refreshes tokens this far ahead of expiry (Pinterest access tokens last 30 days)
+PINTEREST_TOKEN_RENEW_AHEAD_HOURS = int(os.getenv("PINTEREST_TOKEN_RENEW_AHEAD_HOURS", 48))
+# Pinterest documents 30 days; used when a token response leaves expires_in out
+DEFAULT_TOKEN_LIFETIME = timedelta(days=30)
+
+# pinterest_id -> (access_token, expires_at)
+_tokens = {}
+_refresh_locks = {}
+_lock = threading.Lock()
+
+
+class PinterestTokenError(PinterestAPIError):
+    """A token could not be refreshed; the account has to be re-authenticated with Pinterest."""
+
+    def __init__(self, message, details=None):
+        super().__init__(message, status_code=401, details=details)
+
+
+def _cached_token(pinterest_id, valid_until):
+    with _lock:
+        entry = _tokens.get(pinterest_id)
+    if entry and entry[1] > valid_until:
+        return entry[0]
+    return None
+
+
+def remember_token(pinterest_id, access_token, expires_at):
+    if access_token and expires_at:
+        with _lock:
+            _tokens[pinterest_id] = (access_token, expires_at)
+
+
+def forget_token(pinterest_id):
+    """Drops the cached token of an account, e.g. after it was re-connected."""
+    with _lock:
+        _tokens.pop(pinterest_id, None)
+
+
+def _refresh_lock(pinterest_id):
+    with _lock:
+        return _refresh_locks.setdefault(pinterest_id, threading.Lock())
+
+
+def get_access_token(token_entry):
+    """
+    The access token to call Pinterest with for a `Pinterest` row. Served
+    from memory while valid, so a refresh committed by another thread is
+    picked up even if `token_entry` was loaded before it. A token about to
+    expire (normally renewed by `flask renew-pinterest-tokens` well before)
+    is refreshed here, once per account however many requests need it.
+    Raises PinterestTokenError if it cannot be refreshed.
+    """
+    valid_until = datetime.utcnow() + TOKEN_EXPIRY_MARGIN
+    access_token = _cached_token(token_entry.pinterest_id, valid_until)
+    if access_token:
+        return access_token
+    # Rows without an expiry are used as they are; the scheduler refreshes them
+    if token_entry.expires_in is None or token_entry.expires_in > valid_until:
+        remember_token(token_entry.pinterest_id, token_entry.access_token, token_entry.expires_in)
+        return token_entry.access_token
+    return refresh_access_token(token_entry.pinterest_id, valid_until)
+
+
+def refresh_access_token(pinterest_id, valid_until=None):
+    """
+    Refreshes an account's token unless it is already valid until
+    `valid_until`, and returns the current access token.
+
+    Single-flight: threads of this process queue on a per-account lock and
+    the ones behind the first find the renewed token in memory; other
+    processes queue on a row lock of the Pinterest row, held (in a session
+    of its own, so the caller's transaction is not committed) until the new
+    token is stored, and find it renewed in the row.
+    """
+    valid_until = valid_until or datetime.utcnow() + TOKEN_EXPIRY_MARGIN
+    with _refresh_lock(pinterest_id):
+        access_token = _cached_token(pinterest_id, valid_until)
+        if access_token:
+            return access_token
+
+        with Session(db.engine) as session, session.begin():
+            entry = session.query(Pinterest).filter_by(pinterest_id=pinterest_id).with_for_update().one_or_none()
+            if entry is None:
+                raise PinterestTokenError("Pinterest account not found.")
+            if entry.expires_in is not None and entry.expires_in > valid_until:
+                remember_token(pinterest_id, entry.access_token, entry.expires_in)
+                return entry.access_token
+            if not entry.refresh_token:
+                raise PinterestTokenError("No Pinterest refresh token stored.")
+
+            try:
+                data = get_pinterest_client().oauth_token(
+                    {"grant_type": "refresh_token", "refresh_token": entry.refresh_token},
+                    os.getenv("PINTEREST_CLIENT_ID"), os.getenv("PINTEREST_CLIENT_SECRET"))
+            except PinterestAPIError as e:
+                raise PinterestTokenError(f"Pinterest token refresh failed: {e}", details=e.details) from e
+            if not data.get("access_token"):
+                raise PinterestTokenError("Refresh token response did not include access_token")
+
+            now = datetime.utcnow()
+            lifetime = timedelta(seconds=int(data["expires_in"])) if data.get("expires_in") else DEFAULT_TOKEN_LIFETIME
+            entry.access_token = data["access_token"]
+            entry.refresh_token = data.get("refresh_token") or entry.refresh_token
+            entry.expires_in = now + lifetime
+            entry.updated_at = now
+            access_token, expires_at = entry.access_token, entry.expires_in
+
+        remember_token(pinterest_id, access_token, expires_at)
+        logger.info(f"Refreshed Pinterest token of account {pinterest_id}")
+        return access_token
+
+
+def renew_expiring_tokens(ahead_hours=PINTEREST_TOKEN_RENEW_AHEAD_HOURS):
+    """
+    Refreshes every token expiring within `ahead_hours` (or with no known
+    expiry), so request paths find valid tokens and never wait on OAuth.
+    Returns (renewed, failed).
+    """
+    renew_before = datetime.utcnow() + timedelta(hours=ahead_hours)
+    due = [pinterest_id for (pinterest_id,) in db.session.query(Pinterest.pinterest_id).filter(
+        Pinterest.refresh_token.isnot(None),
+        or_(Pinterest.expires_in.is_(None), Pinterest.expires_in < renew_before),
+    )]
+    db.session.rollback()  # end the read transaction; each refresh runs in its own
+    renewed = failed = 0
+    for pinterest_id in due:
+        try:
+            refresh_access_token(pinterest_id, renew_before)
+            renewed += 1
+        except PinterestTokenError as e:
+            logger.warning(f"Could not renew Pinterest token of account {pinterest_id}: {e}")
+            failed += 1
+    return renewed, failed
+
+
+@click.command('renew-pinterest-tokens')
+@click.option('--ahead-hours', default=PINTEREST_TOKEN_RENEW_AHEAD_HOURS, show_default=True,
+              help='Renew tokens expiring within this many hours.')
+@click.option('--interval', default=0, show_default=True,
+              help='Seconds between passes; 0 runs a single pass (e.g. from cron).')
+@with_appcontext
+def renew_pinterest_tokens_command(ahead_hours, interval):
+    """Refreshes Pinterest access tokens ahead of their expiry."""
+    while True:
+        try:
+            renewed, failed = renew_expiring_tokens(ahead_hours)
+            click.echo(f"Renewed {renewed} Pinterest token(s), {failed} failed.")
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Pinterest token renewal pass failed: {e}")
+        if not interval:
+            break
+        db.session.remove()
+        time.sleep(interval)
@@ -0,0 +1,422 @@
+# utils/project_stats.py
+import logging
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, event, func, inspect, select, union_all, update, Float, Integer, cast
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+
+from models import db, ProjectStats, Projects, Tasks, Spaces, Drawings, Upload_Files
+
+logger = logging.getLogger(__name__)
+
+# Key under session.info that holds the changes to the project_stats rollup
+# accumulated by this transaction: {project_id: {field: delta}}, where status
+# counts are keyed ('task_status_counts', status).
+PENDING_KEY = 'project_stats_pending'
+# Key under session.info: objects whose new state is counted once the flush has written it
+FLUSHING_KEY = 'project_stats_flushing'
+
+COUNTER_FIELDS = ('total_tasks', 'completed_tasks', 'logged_hours', 'estimated_hours',
+                  'space_count', 'drawing_count', 'file_count', 'file_bytes')
+
+# The columns of each tracked model that decide what a row adds to its project's rollup
+TRACKED_ATTRIBUTES = {
+    Tasks: ('project_id', 'status', 'logged_hours', 'estimated_hours'),
+    Spaces: ('project_id',),
+    Drawings: ('space_id',),
+    Upload_Files: ('file_size', 'project_id', 'task_id', 'space_id', 'drawing_id'),
+}
+PRIMARY_KEYS = {Tasks: Tasks.task_id, Spaces: Spaces.space_id,
+                Drawings: Drawings.drawing_id, Upload_Files: Upload_Files.file_id}
+ID_BATCH_SIZE = 500
+
+
+def _file_rows(project_ids=None, file_ids=None):
+    """
+    Selects (project_id, file_id, file_size) for every upload that belongs to
+    the given projects (or, with `file_ids`, for those uploads), whether
+    attached to the project itself or to one of its tasks, spaces or drawings.
+    Each branch filters on an indexed FK or the primary key.
+    """
+    drawing_space = aliased(Spaces)
+    branches = [
+        (select(Upload_Files.project_id.label('project_id'), Upload_Files.file_id, Upload_Files.file_size),
+         Upload_Files.project_id),
+        (select(Tasks.project_id, Upload_Files.file_id, Upload_Files.file_size)
+            .join(Tasks, Tasks.task_id == Upload_Files.task_id), Tasks.project_id),
+        (select(Spaces.project_id, Upload_Files.file_id, Upload_Files.file_size)
+            .join(Spaces, Spaces.space_id == Upload_Files.space_id), Spaces.project_id),
+        (select(drawing_space.project_id, Upload_Files.file_id, Upload_Files.file_size)
+            .join(Drawings, Drawings.drawing_id == Upload_Files.drawing_id)
+            .join(drawing_space, drawing_space.space_id == Drawings.space_id), drawing_space.project_id),
+    ]
+    selects = []
+    for query, project_column in branches:
+        if project_ids is not None:
+            query = query.where(project_column.in_(project_ids))
+        else:
+            query = query.where(project_column.isnot(None))
+        if file_ids is not None:
+            query = query.where(Upload_Files.file_id.in_(file_ids))
+        selects.append(query)
+    files = union_all(*selects).subquery()
+    # A file counts once per project however many of its owners are in it.
+    # Upload_Files.file_size is stored as kilobytes in a string column.
+    return select(
+        files.c.project_id, files.c.file_id,
+        func.max(func.round(cast(files.c.file_size, Float) * 1024)).label('bytes')
+    ).group_by(files.c.project_id, files.c.file_id).subquery()
+
+
+def _add(deltas, project_id, field, amount):
+    entry = deltas.setdefault(project_id, {})
+    entry[field] = entry.get(field, 0) + amount
+
+
+def _count_rows(session, deltas, model, ids, sign):
+    """Adds (sign=1) or subtracts (sign=-1) what the rows' current state in the database counts towards their projects."""
+    ids = [row_id for row_id in set(ids) if row_id]
+    for start in range(0, len(ids), ID_BATCH_SIZE):
+        batch = ids[start:start + ID_BATCH_SIZE]
+        if model is Tasks:
+            rows = session.execute(
+                select(Tasks.project_id, Tasks.status, Tasks.logged_hours, Tasks.estimated_hours)
+                    .where(Tasks.task_id.in_(batch), Tasks.project_id.isnot(None)))
+            for project_id, status, logged, estimated in rows:
+                status_key = (status or 'none').lower()
+                _add(deltas, project_id, 'total_tasks', sign)
+                _add(deltas, project_id, ('task_status_counts', status_key), sign)
+                if status_key == 'completed':
+                    _add(deltas, project_id, 'completed_tasks', sign)
+                _add(deltas, project_id, 'logged_hours', sign * float(logged or 0))
+                _add(deltas, project_id, 'estimated_hours', sign * float(estimated or 0))
+        elif model is Spaces:
+            rows = session.execute(
+                select(Spaces.project_id).where(Spaces.space_id.in_(batch), Spaces.project_id.isnot(None)))
+            for (project_id,) in rows:
+                _add(deltas, project_id, 'space_count', sign)
+        elif model is Drawings:
+            rows = session.execute(
+                select(Spaces.project_id).select_from(Drawings).join(Spaces, Spaces.space_id == Drawings.space_id)
+                    .where(Drawings.drawing_id.in_(batch), Spaces.project_id.isnot(None)))
+            for (project_id,) in rows:
+                _add(deltas, project_id, 'drawing_count', sign)
+        elif model is Upload_Files:
+            per_file = _file_rows(file_ids=batch)
+            for project_id, _, size in session.execute(select(per_file)):
+                _add(deltas, project_id, 'file_count', sign)
+                _add(deltas, project_id, 'file_bytes', sign * int(size or 0))
+
+
+def _tracked_changes(obj):
+    attributes = TRACKED_ATTRIBUTES.get(type(obj))
+    if not attributes:
+        return False
+    state = inspect(obj)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+
+def mark_uploads_changed(session, file_ids):
+    """
+    Counts uploads written with a bulk INSERT, which the flush hooks below
+    never see. Call it after the INSERT has run.
+    """
+    _count_rows(session, session.info.setdefault(PENDING_KEY, {}), Upload_Files, file_ids, 1)
+
+
+def _before_flush(session, flush_context, instances):
+    deltas = session.info.setdefault(PENDING_KEY, {})
+    flushing = session.info.setdefault(FLUSHING_KEY, [])
+    old = {}
+    with session.no_autoflush:
+        for obj in session.deleted:
+            if type(obj) in TRACKED_ATTRIBUTES:
+                old.setdefault(type(obj), []).append(inspect(obj).identity[0])
+        for obj in session.dirty:
+            if _tracked_changes(obj):
+                old.setdefault(type(obj), []).append(inspect(obj).identity[0])
+                flushing.append(obj)
+        flushing.extend(obj for obj in session.new if type(obj) in TRACKED_ATTRIBUTES)
+        # The rows still hold their state before this flush: take it out of the rollup
+        for model, ids in old.items():
+            _count_rows(session, deltas, model, ids, -1)
+
+
+def _after_flush(session, flush_context):
+    # ...and count the state the flush wrote
+    deltas = session.info.setdefault(PENDING_KEY, {})
+    new = {}
+    for obj in session.info.pop(FLUSHING_KEY, []):
+        if obj not in session.deleted:
+            new.setdefault(type(obj), []).append(getattr(obj, PRIMARY_KEYS[type(obj)].key))
+    for model, ids in new.items():
+        _count_rows(session, deltas, model, ids, 1)
+
+
+def _before_commit(session):
+    if session.get_nested_transaction() is not None:
+        return  # savepoint release; wait for the real commit
+    # Flush first so every change in this transaction has been counted
+    session.flush()
+    deltas = session.info.pop(PENDING_KEY, {})
+    if deltas:
+        apply_project_stats_deltas(deltas, session=session)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if previous_transaction.nested:
+        return
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(FLUSHING_KEY, None)
+
+
+def register_project_stats_listeners():
+    """
+    Keeps the project_stats rollup in sync with tasks, spaces, drawings and
+    uploads. Each flush counts what the changed rows added to their projects
+    before and after it; the difference is added to the rollup rows just
+    before commit, inside the same transaction, so concurrent writers add
+    up instead of overwriting each other.
+    Bulk Query.update()/delete() calls and moving a space or drawing with
+    children to another project bypass these hooks; use the
+    rebuild-project-stats command to repair any drift they cause.
+    """
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'before_commit', _before_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
+
+
+def compute_project_stats(project_ids, session=None):
+    """
+    Computes the rollup values of the given projects from the child tables,
+    with one grouped query per table. Returns {project_id: {field: value}}.
+    """
+    session = session or db.session
+    project_ids = list({project_id for project_id in project_ids if project_id})
+    if not project_ids:
+        return {}
+
+    # Skip IDs that do not (or no longer) point at a project
+    existing = session.execute(select(Projects.project_id).where(Projects.project_id.in_(project_ids)))
+    project_ids = [project_id for (project_id,) in existing]
+
+    stats = {project_id: {
+        'total_tasks': 0,
+        'completed_tasks': 0,
+        'task_status_counts': {},
+        'logged_hours': 0.0,
+        'estimated_hours': 0.0,
+        'space_count': 0,
+        'drawing_count': 0,
+        'file_count': 0,
+        'file_bytes': 0,
+    } for project_id in project_ids}
+    if not stats:
+        return stats
+
+    task_rows = session.execute(
+        select(
+            Tasks.project_id,
+            Tasks.status,
+            func.count(Tasks.task_id),
+            func.coalesce(func.sum(Tasks.logged_hours), 0),
+            func.coalesce(func.sum(Tasks.estimated_hours), 0)
+        ).where(Tasks.project_id.in_(project_ids)).group_by(Tasks.project_id, Tasks.status)
+    )
+    for project_id, status, count, logged, estimated in task_rows:
+        entry = stats[project_id]
+        status_key = (status or 'none').lower()
+        entry['task_status_counts'][status_key] = entry['task_status_counts'].get(status_key, 0) + count
+        entry['total_tasks'] += count
+        if status_key == 'completed':
+            entry['completed_tasks'] += count
+        entry['logged_hours'] += float(logged or 0)
+        entry['estimated_hours'] += float(estimated or 0)
+
+    space_rows = session.execute(
+        select(Spaces.project_id, func.count(Spaces.space_id))
+            .where(Spaces.project_id.in_(project_ids)).group_by(Spaces.project_id)
+    )
+    for project_id, count in space_rows:
+        stats[project_id]['space_count'] = count
+
+    drawing_rows = session.execute(
+        select(Spaces.project_id, func.count(Drawings.drawing_id))
+            .join(Spaces, Spaces.space_id == Drawings.space_id)
+            .where(Spaces.project_id.in_(project_ids)).group_by(Spaces.project_id)
+    )
+    for project_id, count in drawing_rows:
+        stats[project_id]['drawing_count'] = count
+
+    per_file = _file_rows(project_ids=project_ids)
+    file_rows = session.execute(
+        select(per_file.c.project_id, func.count(per_file.c.file_id), func.coalesce(func.sum(per_file.c.bytes), 0))
+            .group_by(per_file.c.project_id)
+    )
+    for project_id, count, size in file_rows:
+        stats[project_id]['file_count'] = count
+        stats[project_id]['file_bytes'] = int(size or 0)
+
+    return stats
+
+
+def _insert_stats(session, stats, overwrite):
+    """
+    Writes absolute rollup values with one INSERT ... ON DUPLICATE KEY UPDATE.
+    Rows that already exist are overwritten, or left alone without `overwrite`.
+    """
+    table = ProjectStats.__table__
+    now = datetime.utcnow()
+    rows = [dict(values, project_id=project_id, updated_at=now) for project_id, values in stats.items()]
+    if not rows:
+        return
+    if session.get_bind().dialect.name == 'mysql':
+        statement = mysql_insert(table)
+        if overwrite:
+            statement = statement.on_duplicate_key_update({column: statement.inserted[column] for column in rows[0]})
+        else:
+            statement = statement.on_duplicate_key_update(project_id=table.c.project_id)
+    else:
+        # SQLite (local development) spells the same upsert ON CONFLICT
+        statement = sqlite_insert(table)
+        if overwrite:
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.project_id],
+                set_={column: statement.excluded[column] for column in rows[0]})
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=[table.c.project_id])
+    session.execute(statement, rows)
+
+
+def apply_project_stats_deltas(deltas, session=None):
+    """
+    Adds the accumulated changes to the rollup rows with UPDATE ... SET
+    total_tasks = total_tasks + :n and so on, so transactions committing at
+    the same time each add their own changes. A project without a rollup
+    row first gets one holding its counts without this transaction's
+    changes; if another transaction creates it first, that row is kept.
+    The caller commits.
+    """
+    session = session or db.session
+    deltas = {project_id: {field: amount for field, amount in fields.items() if amount}
+              for project_id, fields in deltas.items()}
+    deltas = {project_id: fields for project_id, fields in deltas.items() if fields}
+    if not deltas:
+        return
+
+    table = ProjectStats.__table__
+    existing = {project_id for (project_id,) in session.execute(
+        select(table.c.project_id).where(table.c.project_id.in_(list(deltas))))}
+    missing = [project_id for project_id in deltas if project_id not in existing]
+    if missing:
+        seeds = compute_project_stats(missing, session=session)
+        for project_id, values in seeds.items():
+            for field, amount in deltas[project_id].items():
+                if isinstance(field, tuple):
+                    counts = values['task_status_counts']
+                    counts[field[1]] = counts.get(field[1], 0) - amount
+                else:
+                    values[field] -= amount
+            values['task_status_counts'] = {key: count for key, count in values['task_status_counts'].items() if count}
+        _insert_stats(session, seeds, overwrite=False)
+
+    now = datetime.utcnow()
+    counters = [dict({f"d_{field}": fields.get(field, 0) for field in COUNTER_FIELDS}, pid=project_id, now=now)
+                for project_id, fields in deltas.items()]
+    session.execute(
+        update(table).where(table.c.project_id == bindparam('pid')).values(
+            dict({field: table.c[field] + bindparam(f"d_{field}") for field in COUNTER_FIELDS},
+                 updated_at=bindparam('now'))
+        ),
+        counters,
+    )
+
+    statuses = [{'pid': project_id, 'path': '$."%s"' % field[1].replace('"', ''), 'n': amount}
+                for project_id, fields in deltas.items()
+                for field, amount in fields.items() if isinstance(field, tuple)]
+    if statuses:
+        counts = func.coalesce(table.c.task_status_counts, '{}')
+        session.execute(
+            update(table).where(table.c.project_id == bindparam('pid')).values(
+                task_status_counts=func.json_set(
+                    counts, bindparam('path'),
+                    func.coalesce(cast(func.json_extract(counts, bindparam('path')), Integer), 0) + bindparam('n'))
+            ),
+            statuses,
+        )
+
+
+def recompute_project_stats(project_ids, session=None):
+    """
+    Recomputes the rollup rows of the given projects from the child tables
+    and overwrites them. Meant for repairs: changes committed by others
+    while it runs can be overwritten, so run it when writes are quiet.
+    The caller commits.
+    """
+    session = session or db.session
+    stats = compute_project_stats(project_ids, session=session)
+    _insert_stats(session, stats, overwrite=True)
+    return stats
+
+
+def get_project_stats(project_ids):
+    """
+    Returns {project_id: ProjectStats} for the given projects. Projects with
+    no rollup row yet get one from a session of its own, so the caller's
+    transaction is not committed by a read.
+    """
+    project_ids = list(set(project_ids))
+    if not project_ids:
+        return {}
+    rows = {
+        row.project_id: row
+        for row in ProjectStats.query.filter(ProjectStats.project_id.in_(project_ids)).all()
+    }
+    missing = [project_id for project_id in project_ids if project_id not in rows]
+    if missing:
+        with Session(db.engine, expire_on_commit=False) as session:
+            _insert_stats(session, compute_project_stats(missing, session=session), overwrite=False)
+            session.commit()
+            rows.update({
+                row.project_id: row
+                for row in session.query(ProjectStats).filter(ProjectStats.project_id.in_(missing)).all()
+            })
+    return rows
+
+
+def serialize_project_stats(stats):
+    if stats is None:
+        return None
+    total = stats.total_tasks or 0
+    completed = stats.completed_tasks or 0
+    return {
+        'total_tasks': total,
+        'completed_tasks': completed,
+        'completion_percentage': round((completed / total) * 100, 2) if total else 0,
+        'task_status_counts': {status: count for status, count in (stats.task_status_counts or {}).items() if count},
+        'space_count': stats.space_count or 0,
+        'drawing_count': stats.drawing_count or 0,
+        'file_count': stats.file_count or 0,
+        'file_bytes': stats.file_bytes or 0,
+        'logged_hours': stats.logged_hours or 0,
+        'estimated_hours': stats.estimated_hours or 0,
+        'updated_at': stats.updated_at.isoformat() if stats.updated_at else None,
+    }
+
+
+@click.command('rebuild-project-stats')
+@click.option('--batch-size', default=200, show_default=True, help='Projects recomputed per transaction.')
+@with_appcontext
+def rebuild_project_stats_command(batch_size):
+    """Recomputes the project_stats rollup for every project."""
+    project_ids = [project_id for (project_id,) in db.session.query(Projects.project_id).all()]
+    for start in range(0, len(project_ids), batch_size):
+        recompute_project_stats(project_ids[start:start + batch_size])
+        db.session.commit()
+    click.echo(f"Rebuilt project stats for {len(project_ids)} project(s).")
@@ -0,0 +1,198 @@
+# utils/rate_limit.py
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from cachetools import TTLCache
+from flask import jsonify, request
+
+try:
+    import redis
+except ImportError:  # only needed for RATE_LIMIT_REDIS_URL
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+# Shared backend for multi-node deployments; the in-memory one limits each process on its own
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# Reverse proxies in front of the app; the client IP is taken that many hops back in X-Forwarded-For
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", 0))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+# Longest window used by any rule; idle buckets are dropped after it (they would be full again anyway)
+RATE_LIMIT_MAX_WINDOW = 3600
+
+
+class MemoryBackend:
+    """
+    Token buckets in this process: each key holds up to `limit` tokens and
+    regains them continuously at limit/window per second, so the allowance
+    slides with time instead of resetting at window boundaries.
+    """
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS, max_window=RATE_LIMIT_MAX_WINDOW):
+        self._buckets = TTLCache(maxsize=max_keys, ttl=max_window)
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        """Takes a token from the key's bucket; returns 0 if allowed, else the seconds until one is available."""
+        now = time.monotonic()
+        rate = limit / window
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(limit), now))
+            tokens = min(float(limit), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+        return (1 - tokens) / rate
+
+
+class RedisBackend:
+    """Same token buckets kept in Redis, updated atomically by a script, so all nodes share the limits."""
+
+    SCRIPT = """
+    local limit = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or limit
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(limit, tokens + (now - updated) * limit / window)
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry_after = (1 - tokens) * window / limit
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+    return tostring(retry_after)
+    """
+
+    def __init__(self, client, prefix="ratelimit:"):
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def hit(self, key, limit, window):
+        return float(self._script(keys=[self.prefix + key], args=[limit, window]))
+
+
+def client_ip():
+    if RATE_LIMIT_PROXY_HOPS:
+        forwarded = [ip.strip() for ip in request.headers.get("X-Forwarded-For", "").split(",") if ip.strip()]
+        if len(forwarded) >= RATE_LIMIT_PROXY_HOPS:
+            return forwarded[-RATE_LIMIT_PROXY_HOPS]
+    return request.remote_addr
+
+
+def _body_value(name):
+    data = request.get_json(silent=True) if request.is_json else request.form
+    value = (data or {}).get(name)
+    return str(value).strip().lower() if value else None
+
+
+# Scope -> how the request is keyed under it; rules whose key is missing from a request are skipped
+KEY_FUNCTIONS = {
+    'ip': client_ip,
+    'email': lambda: _body_value('user_email'),
+    'user': lambda: getattr(request, 'current_user_id', None) or _body_value('user_id'),
+}
+
+
+class RateLimiter:
+    """
+    Applies (scope, limit, window_seconds) rules to a request and counts
+    what it allowed and rejected. The backend is replaceable with
+    set_backend(), e.g. by a shared one when running several nodes. A
+    failing backend lets requests through rather than locking users out.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = Counter()  # "name:scope" -> requests rejected
+        self.errors = 0
+
+    def set_backend(self, backend):
+        self.backend = backend
+
+    def check(self, name, rules):
+        """Returns 0 if the request is within every rule, else the Retry-After in seconds of the first exceeded one."""
+        for scope, limit, window in rules:
+            value = KEY_FUNCTIONS[scope]()
+            if not value:
+                continue
+            try:
+                retry_after = self.backend.hit(f"{name}:{scope}:{value}", limit, window)
+            except Exception as e:
+                logger.warning(f"Rate limit backend failed, allowing request: {e}")
+                with self._lock:
+                    self.errors += 1
+                continue
+            if retry_after > 0:
+                with self._lock:
+                    self.rejected[f"{name}:{scope}"] += 1
+                return retry_after
+        with self._lock:
+            self.allowed += 1
+        return 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "allowed": self.allowed,
+                "rejected": sum(self.rejected.values()),
+                "rejected_by_rule": dict(self.rejected),
+                "backend_errors": self.errors,
+            }
+
+
+def _default_backend():
+    if not RATE_LIMIT_REDIS_URL:
+        return MemoryBackend()
+    if redis is None:
+        raise RuntimeError("redis is required for RATE_LIMIT_REDIS_URL")
+    return RedisBackend(redis.Redis.from_url(RATE_LIMIT_REDIS_URL))
+
+
+rate_limiter = RateLimiter(_default_backend())
+
+
+def check_rate_limits(name, rules):
+    """A 429 response if the current request exceeds one of `rules`, else None. Usable as a before_request hook."""
+    if not RATE_LIMIT_ENABLED or request.method == 'OPTIONS':  # CORS preflights are free
+        return None
+    retry_after = rate_limiter.check(name, rules)
+    if not retry_after:
+        return None
+    retry_after = math.ceil(retry_after)
+    response = jsonify({"error": "Too many attempts. Please try again later.", "retry_after": retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def rate_limited(*rules, name=None):
+    """
+    Rejects the view's requests with 429 once a (scope, limit, window)
+    rule is exceeded, before the view runs any query or password check.
+    Scopes: 'ip', 'email' (user_email in the body) and 'user' (the
+    authenticated user, or user_id in the body).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            rejected = check_rate_limits(name or f.__name__, rules)
+            if rejected is not None:
+                return rejected
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,268 @@
+# utils/resumable_uploads.py
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from models import db, UploadSession, UploadSessionChunk, generate_uuid
+from utils.ingest import IngestStream, INGEST_TMP_FOLDER, COPY_CHUNK_SIZE
+from utils.storage import attach_files, get_upload_owner, owner_column
+
+logger = logging.getLogger(__name__)
+
+RESUMABLE_CHUNK_SIZE = int(os.getenv("RESUMABLE_CHUNK_SIZE", 4 * 1024 * 1024))
+MIN_RESUMABLE_CHUNK_SIZE = 256 * 1024
+MAX_RESUMABLE_CHUNK_SIZE = 64 * 1024 * 1024
+MAX_RESUMABLE_UPLOAD_SIZE = int(os.getenv("MAX_RESUMABLE_UPLOAD_SIZE", 2 * 1024 * 1024 * 1024))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", 24))
+
+# Key under session.info: temp files of completed sessions, removed once the commit succeeds
+COMPLETED_KEY = 'resumable_upload_completed'
+
+
+class UploadSessionError(Exception):
+    """Invalid request against an upload session; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def chunk_count(upload):
+    return max(1, -(-upload.total_size // upload.chunk_size))
+
+
+def expected_chunk_length(upload, chunk_index):
+    offset = chunk_index * upload.chunk_size
+    return min(upload.chunk_size, upload.total_size - offset)
+
+
+def create_upload_session(owner_type, owner_id, filename, total_size, chunk_size=None,
+                          user_id=None, company_id=None):
+    """
+    Registers a resumable upload and preallocates its file under uploads/tmp.
+    The caller commits.
+    """
+    try:
+        owner_column(owner_type)
+    except ValueError as e:
+        raise UploadSessionError(str(e))
+    filename = secure_filename(filename or '')
+    if not filename:
+        raise UploadSessionError("filename is required")
+    try:
+        total_size = int(total_size)
+        chunk_size = int(chunk_size or RESUMABLE_CHUNK_SIZE)
+    except (TypeError, ValueError):
+        raise UploadSessionError("total_size and chunk_size must be integers")
+    if total_size <= 0:
+        raise UploadSessionError("total_size must be positive")
+    if total_size > MAX_RESUMABLE_UPLOAD_SIZE:
+        raise UploadSessionError(f"File exceeds the {MAX_RESUMABLE_UPLOAD_SIZE} byte limit", 413)
+    if not MIN_RESUMABLE_CHUNK_SIZE <= chunk_size <= MAX_RESUMABLE_CHUNK_SIZE:
+        raise UploadSessionError(
+            f"chunk_size must be between {MIN_RESUMABLE_CHUNK_SIZE} and {MAX_RESUMABLE_CHUNK_SIZE} bytes")
+
+    owner = get_upload_owner(owner_type, owner_id)
+    if owner is None:
+        raise UploadSessionError(f"{owner_type} '{owner_id}' not found", 404)
+    owner_company = getattr(owner, 'company_id', None)
+    if company_id and owner_company and owner_company != company_id:
+        raise UploadSessionError(f"{owner_type} '{owner_id}' not found", 404)
+
+    upload_id = generate_uuid()
+    os.makedirs(INGEST_TMP_FOLDER, exist_ok=True)
+    temp_path = os.path.join(INGEST_TMP_FOLDER, f"{upload_id}.upload")
+    # Sparse preallocation: chunks are written at their offsets as they arrive
+    with open(temp_path, 'wb') as f:
+        f.truncate(total_size)
+
+    upload = UploadSession(
+        upload_id=upload_id,
+        user_id=user_id,
+        company_id=company_id,
+        owner_type=owner_type,
+        owner_id=owner_id,
+        filename=filename,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        temp_path=temp_path,
+        expires_at=datetime.utcnow() + timedelta(hours=UPLOAD_SESSION_TTL_HOURS),
+    )
+    db.session.add(upload)
+    return upload
+
+
+def write_chunk(upload, chunk_index, stream):
+    """
+    Streams one chunk from `stream` to its offset in the session file with
+    positional writes, then records it. Re-sending a chunk simply overwrites
+    it. The caller commits.
+    """
+    # Shared lock: chunks may be written in parallel, but not while complete_upload
+    # holds the row, since until it commits the session file is linked into the blob store
+    status = db.session.query(UploadSession.status).filter_by(upload_id=upload.upload_id) \
+        .with_for_update(read=True).scalar()
+    if status != 'pending':
+        raise UploadSessionError("Upload session is already completed", 409)
+    if not 0 <= chunk_index < chunk_count(upload):
+        raise UploadSessionError(f"chunk_index must be between 0 and {chunk_count(upload) - 1}")
+
+    expected = expected_chunk_length(upload, chunk_index)
+    offset = chunk_index * upload.chunk_size
+    written = 0
+    fd = os.open(upload.temp_path, os.O_WRONLY)
+    try:
+        while True:
+            data = stream.read(min(COPY_CHUNK_SIZE, expected - written + 1))
+            if not data:
+                break
+            if written + len(data) > expected:
+                raise UploadSessionError(f"Chunk {chunk_index} must be exactly {expected} bytes")
+            os.pwrite(fd, data, offset + written)
+            written += len(data)
+    finally:
+        os.close(fd)
+    if written != expected:
+        raise UploadSessionError(f"Chunk {chunk_index} must be exactly {expected} bytes, got {written}")
+
+    if db.session.get(UploadSessionChunk, (upload.upload_id, chunk_index)) is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(UploadSessionChunk(upload_id=upload.upload_id, chunk_index=chunk_index, size=written))
+        except IntegrityError:
+            pass  # the same chunk was recorded by a concurrent retry
+    return written
+
+
+def received_chunks(upload):
+    return [index for (index,) in db.session.query(UploadSessionChunk.chunk_index)
+            .filter(UploadSessionChunk.upload_id == upload.upload_id)
+            .order_by(UploadSessionChunk.chunk_index).all()]
+
+
+def received_ranges(upload, chunks=None):
+    """Merges the received chunks into [start, end) byte ranges."""
+    ranges = []
+    for index in chunks if chunks is not None else received_chunks(upload):
+        start = index * upload.chunk_size
+        end = start + expected_chunk_length(upload, index)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def serialize_upload_session(upload):
+    chunks = received_chunks(upload)
+    received = set(chunks)
+    return {
+        'upload_id': upload.upload_id,
+        'owner_type': upload.owner_type,
+        'owner_id': upload.owner_id,
+        'filename': upload.filename,
+        'total_size': upload.total_size,
+        'chunk_size': upload.chunk_size,
+        'chunk_count': chunk_count(upload),
+        'status': upload.status,
+        'file_id': upload.file_id,
+        'received_ranges': received_ranges(upload, chunks),
+        'missing_chunks': [index for index in range(chunk_count(upload)) if index not in received],
+        'expires_at': upload.expires_at.isoformat() if upload.expires_at else None,
+    }
+
+
+def complete_upload(upload_id):
+    """
+    Checks every chunk has arrived and attaches the assembled file to the
+    session's owner through the storage engine. The caller commits.
+    """
+    upload = db.session.query(UploadSession).filter_by(upload_id=upload_id).with_for_update().first()
+    if upload is None:
+        raise UploadSessionError("Upload session not found", 404)
+    if upload.status == 'completed':
+        return upload
+    missing = chunk_count(upload) - len(received_chunks(upload))
+    if missing:
+        raise UploadSessionError(f"{missing} chunk(s) have not been received yet", 409)
+
+    owner = get_upload_owner(upload.owner_type, upload.owner_id)
+    if owner is None:
+        raise UploadSessionError(f"{upload.owner_type} '{upload.owner_id}' not found", 404)
+
+    if not os.path.exists(upload.temp_path):
+        raise UploadSessionError("The uploaded data is no longer available; start a new upload", 409)
+
+    # attach_files moves the file it is given into the blob store, so hand it
+    # a second link; the session's own file stays until the commit succeeds
+    # and a retry after a failed commit still finds it
+    staged_path = os.path.join(INGEST_TMP_FOLDER, f"{upload.upload_id}.{generate_uuid()}.complete")
+    try:
+        os.link(upload.temp_path, staged_path)
+    except OSError:
+        shutil.copyfile(upload.temp_path, staged_path)
+    try:
+        ingest = IngestStream.from_file(staged_path, filename=upload.filename)
+        file = FileStorage(stream=ingest, filename=upload.filename)
+        rows = attach_files(upload.owner_type, upload.owner_id, [file], max_size=MAX_RESUMABLE_UPLOAD_SIZE)
+    finally:
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+    db.session.info.setdefault(COMPLETED_KEY, []).append(upload.temp_path)
+
+    if hasattr(owner, 'revision_number'):
+        # Same as replacing files through the owner's update endpoint
+        owner.revision_number = (owner.revision_number or 0) + 1
+    upload.status = 'completed'
+    upload.file_id = rows[0]['file_id']
+    UploadSessionChunk.query.filter_by(upload_id=upload.upload_id).delete()
+    return upload
+
+
+def discard_upload_session(upload):
+    """Removes the session, its chunks and its partial file. The caller commits."""
+    UploadSessionChunk.query.filter_by(upload_id=upload.upload_id).delete()
+    if os.path.exists(upload.temp_path):
+        os.remove(upload.temp_path)
+    db.session.delete(upload)
+
+
+def _after_commit(session):
+    if session.get_nested_transaction() is not None:
+        return
+    for path in session.info.pop(COMPLETED_KEY, []):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        # The sessions are pending again; keep their files for a retry
+        session.info.pop(COMPLETED_KEY, None)
+
+
+def register_resumable_upload_listeners():
+    """Removes the temp file of a completed upload session only once its completion is committed."""
+    if not event.contains(db.session, 'after_commit', _after_commit):
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
+
+
+@click.command('purge-upload-sessions')
+@with_appcontext
+def purge_upload_sessions_command():
+    """Deletes expired upload sessions and their partial files."""
+    now = datetime.utcnow()
+    expired = UploadSession.query.filter(UploadSession.expires_at < now).all()
+    for upload in expired:
+        discard_upload_session(upload)
+    db.session.commit()
+    click.echo(f"Purged {len(expired)} expired upload session(s).")
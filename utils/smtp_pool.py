@@ -0,0 +1,158 @@
+# utils/smtp_pool.py
+import logging
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+# smtp    - the real relay (SMTP_HOST, Gmail by default), STARTTLS + login
+# standin - the local stand-in started with `flask smtp-standin`; no TLS, no login
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "smtp")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+# Relays drop idle sessions and cap messages per session; recycle before they do
+SMTP_MAX_IDLE_SECONDS = int(os.getenv("SMTP_MAX_IDLE_SECONDS", 60))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", 30))
+
+
+def smtp_settings(transport=None):
+    """Connection settings for a transport, read from the environment."""
+    transport = transport or EMAIL_TRANSPORT
+    if transport == 'standin':
+        return {
+            'host': os.getenv("SMTP_STANDIN_HOST", "127.0.0.1"),
+            'port': int(os.getenv("SMTP_STANDIN_PORT", 1025)),
+            'starttls': False,
+            'username': None,
+            'password': None,
+        }
+    if transport != 'smtp':
+        raise ValueError(f"Unknown EMAIL_TRANSPORT '{transport}'")
+    return {
+        'host': os.getenv("SMTP_HOST", "smtp.gmail.com"),
+        'port': int(os.getenv("SMTP_PORT", 587)),
+        'starttls': os.getenv("SMTP_STARTTLS", "true").lower() != 'false',
+        'username': os.getenv("SMTP_USERNAME") or os.getenv('EMAIL_SENDER'),
+        'password': os.getenv("SMTP_PASSWORD") or os.getenv('EMAIL_PASSWORD'),
+    }
+
+
+def build_message(recipients, subject, body, sender=None):
+    msg = EmailMessage()
+    msg['Subject'] = subject
+    msg['From'] = sender or os.getenv('EMAIL_SENDER')
+    msg['To'] = ', '.join(recipients)
+    msg.set_content(body)
+    return msg
+
+
+class _PooledConnection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` authenticated SMTP sessions open and hands them out
+    one caller at a time, so the TCP/TLS handshake and login are paid once
+    per session instead of once per message.
+    """
+
+    def __init__(self, size=SMTP_POOL_SIZE, settings=None, max_idle=SMTP_MAX_IDLE_SECONDS,
+                 max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION):
+        self.settings = settings
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        settings = self.settings = self.settings or smtp_settings()
+        smtp = smtplib.SMTP(settings['host'], settings['port'], timeout=SMTP_TIMEOUT)
+        try:
+            if settings['starttls']:
+                smtp.starttls()
+            if settings['username']:
+                smtp.login(settings['username'], settings['password'])
+        except Exception:
+            smtp.close()
+            raise
+        logger.debug("Opened SMTP session to %s:%s", settings['host'], settings['port'])
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if time.monotonic() - conn.last_used < self.max_idle:
+                    return conn
+                self._close(conn)
+        return self._connect()
+
+    def _checkin(self, conn, broken=False):
+        if broken or conn.sent >= self.max_messages:
+            self._close(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+            except Exception as e:
+                # A refused message leaves the session usable; anything else may not
+                self._checkin(conn, broken=not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                                                              smtplib.SMTPDataError)))
+                raise
+            else:
+                self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def send_message(self, msg):
+        for attempt in (1, 2):
+            reused = False
+            try:
+                with self.connection() as conn:
+                    reused = conn.sent > 0
+                    conn.smtp.send_message(msg)
+                    conn.sent += 1
+                    return
+            except smtplib.SMTPServerDisconnected:
+                # The relay closed a pooled session behind our back; retry once on a fresh one
+                if attempt == 2 or not reused:
+                    raise
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+
+smtp_pool = SMTPConnectionPool()
+
+
+def deliver_email(recipients, subject, body, pool=None):
+    """Sends a plaintext email right away over a pooled SMTP session."""
+    (pool or smtp_pool).send_message(build_message(recipients, subject, body))
+    logger.info("Email sent to %s", recipients)
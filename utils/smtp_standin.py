@@ -0,0 +1,89 @@
+# utils/smtp_standin.py
+import logging
+import os
+import socketserver
+from datetime import datetime
+
+import click
+
+from models import generate_uuid
+
+logger = logging.getLogger(__name__)
+
+SMTP_STANDIN_OUTBOX = os.getenv("SMTP_STANDIN_OUTBOX", os.path.join("instance", "outbox"))
+
+
+class _StandinHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: every accepted message is written to the outbox as an .eml file."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 localhost SMTP stand-in ready")
+        sender, recipients = None, []
+        for raw in self.rfile:
+            command, _, argument = raw.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+            command = command.upper()
+            if command == 'EHLO':
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command == 'HELO':
+                self.reply("250 localhost")
+            elif command == 'MAIL':
+                sender, recipients = argument, []
+                self.reply("250 OK")
+            elif command == 'RCPT':
+                recipients.append(argument)
+                self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                self.save(sender, recipients, self.read_data())
+                self.reply("250 OK: queued")
+                sender, recipients = None, []
+            elif command == 'RSET':
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif command == 'NOOP':
+                self.reply("250 OK")
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def read_data(self):
+        lines = []
+        for raw in self.rfile:
+            if raw in (b'.\r\n', b'.\n'):
+                break
+            lines.append(raw[1:] if raw.startswith(b'..') else raw)  # undo dot-stuffing
+        return b''.join(lines)
+
+    def save(self, sender, recipients, data):
+        os.makedirs(self.server.outbox, exist_ok=True)
+        path = os.path.join(self.server.outbox, f"{datetime.utcnow():%Y%m%d-%H%M%S}-{generate_uuid()}.eml")
+        with open(path, 'wb') as f:
+            f.write(data)
+        logger.info(f"SMTP stand-in accepted mail from {sender} to {', '.join(recipients)} -> {path}")
+
+
+class SMTPStandinServer(socketserver.ThreadingTCPServer):
+    """Local stand-in for the SMTP relay, used with EMAIL_TRANSPORT=standin."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host, port, outbox=SMTP_STANDIN_OUTBOX):
+        super().__init__((host, port), _StandinHandler)
+        self.outbox = outbox
+
+
+@click.command('smtp-standin')
+@click.option('--host', default=lambda: os.getenv("SMTP_STANDIN_HOST", "127.0.0.1"))
+@click.option('--port', default=lambda: int(os.getenv("SMTP_STANDIN_PORT", 1025)), type=int)
+@click.option('--outbox', default=SMTP_STANDIN_OUTBOX, show_default=True)
+def smtp_standin_command(host, port, outbox):
+    """Runs a local SMTP stand-in that stores every message as an .eml file instead of sending it."""
+    with SMTPStandinServer(host, port, outbox) as server:
+        click.echo(f"SMTP stand-in listening on {host}:{port}, writing to {outbox}")
+        server.serve_forever()
@@ -0,0 +1,70 @@
+# utils/startup_benchmark.py
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import click
+
+# Runs in a fresh interpreter so every import is paid again, like a worker boot
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+application = module.create_app(json.loads(sys.argv[1]))
+created = time.perf_counter()
+response = application.test_client().get('/hello')
+ready = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_request': ready - created,
+    'ready': ready - started,
+    'status': response.status_code,
+    'blueprints': application.extensions['blueprint_import_seconds'],
+}))
+"""
+
+STAGES = ('import', 'create_app', 'first_request', 'ready')
+
+
+def measure_startup(runs=5, config=None):
+    """
+    Boots the app `runs` times, each in a new Python process, and returns
+    the per-run timings (seconds) of importing app.py, create_app(), the
+    first request and the total until ready.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _CHILD, json.dumps(config or {})],
+                                cwd=root, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+@click.command('startup-benchmark')
+@click.option('--runs', default=5, show_default=True)
+@click.option('--blueprints', default=None, help='Comma-separated blueprint names to register (default: all).')
+@click.option('--no-swagger', is_flag=True, help='Boot without Flasgger.')
+def startup_benchmark_command(runs, blueprints, no_swagger):
+    """Measures how long a fresh process takes to import and build the app and serve a first request."""
+    config = {}
+    if blueprints:
+        config['BLUEPRINTS'] = [name.strip() for name in blueprints.split(',') if name.strip()]
+    if no_swagger:
+        config['SWAGGER_ENABLED'] = False
+    results = measure_startup(runs, config)
+    for stage in STAGES:
+        values = [result[stage] * 1000 for result in results]
+        click.echo(f"{stage:>14}: median {statistics.median(values):8.1f} ms  "
+                   f"min {min(values):8.1f} ms  max {max(values):8.1f} ms")
+    slowest = sorted(results[-1]['blueprints'].items(), key=lambda item: item[1], reverse=True)[:5]
+    click.echo("slowest blueprint imports (last run): " +
+               ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in slowest))
+
+
+if __name__ == '__main__':
+    startup_benchmark_command()
@@ -0,0 +1,185 @@
+# utils/storage.py
+import logging
+import os
+import uuid
+
+from sqlalchemy import insert
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from api.exception import FileTooLargeError
+from models import db, Upload_Files, Projects, Spaces, Boards, User
+from utils.derivatives import wants_derivatives, queue_derivatives
+from utils.file_store import store_blob, blob_public_path, add_blob_references, release_legacy_file
+from utils.ingest import IngestStream, MAX_FILE_SIZE
+from utils.project_stats import mark_uploads_changed
+from utils.tiles import TILED_OWNER_TYPES, wants_tiles, queue_tiles
+
+logger = logging.getLogger(__name__)
+
+# Owner type -> Upload_Files foreign key column
+UPLOAD_OWNER_COLUMNS = {
+    'asset': 'asset_id',
+    'board': 'board_id',
+    'document': 'document_id',
+    'drawing': 'drawing_id',
+    'inspiration': 'inspiration_id',
+    'pin': 'pin_id',
+    'project': 'project_id',
+    'project_template': 'project_templates_id',
+    'space': 'space_id',
+    'task': 'task_id',
+    'template': 'template_id',
+}
+# Templates are shared across companies, so their files are readable by every signed-in user
+SHARED_UPLOAD_OWNER_TYPES = {'template'}
+# Attribute -> parent model, followed in this order to find the company an entity belongs to
+COMPANY_PARENTS = (
+    ('company_id', None),
+    ('project_id', Projects),
+    ('space_id', Spaces),
+    ('board_id', Boards),
+    ('uploaded_by', User),
+)
+
+
+def owner_column(owner_type):
+    try:
+        return UPLOAD_OWNER_COLUMNS[owner_type]
+    except KeyError:
+        raise ValueError(f"Unknown upload owner type '{owner_type}'")
+
+
+def get_upload_owner(owner_type, owner_id, session=None):
+    """Loads the entity an upload would be attached to, or None if it does not exist."""
+    session = session or db.session
+    fk = next(iter(Upload_Files.__table__.c[owner_column(owner_type)].foreign_keys))
+    for mapper in db.Model.registry.mappers:
+        if fk.column.table in mapper.tables:
+            return session.get(mapper.class_, owner_id)
+    return None
+
+
+def owner_company_id(owner, session=None):
+    """Company an upload owner belongs to, directly or through its project, space, board or uploader."""
+    session = session or db.session
+    for attr, parent_model in COMPANY_PARENTS:
+        value = getattr(owner, attr, None)
+        if value is None or (parent_model is not None and isinstance(owner, parent_model)):
+            continue
+        if parent_model is None:
+            return value
+        parent = session.get(parent_model, value)
+        return owner_company_id(parent, session) if parent is not None else None
+    return None
+
+
+def can_access_upload(upload, company_id, session=None):
+    """True if `upload` is attached to a shared owner or to one belonging to `company_id`."""
+    session = session or db.session
+    for owner_type, column in UPLOAD_OWNER_COLUMNS.items():
+        owner_id = getattr(upload, column)
+        if owner_id is None:
+            continue
+        if owner_type in SHARED_UPLOAD_OWNER_TYPES:
+            return True
+        owner = get_upload_owner(owner_type, owner_id, session)
+        if company_id and owner is not None and owner_company_id(owner, session) == company_id:
+            return True
+    return False
+
+
+def validate_file_size(file, max_size=MAX_FILE_SIZE):
+    """Checks if the file size exceeds max_size and raises an error if it does."""
+    if isinstance(file.stream, IngestStream):
+        # Already measured (and capped) while the request was parsed
+        file_length = file.stream.size
+    else:
+        file.seek(0, os.SEEK_END)
+        file_length = file.tell()
+        file.seek(0)
+    if file_length > max_size:
+        raise FileTooLargeError(file.filename, max_size)
+    return file_length
+
+
+def attach_files(owner_type, owner_id, files, session=None, max_size=MAX_FILE_SIZE):
+    """
+    Stores the uploaded files and attaches them to one owner (task, drawing,
+    pin, ...). Every file is size-checked before anything is written, and the
+    Upload_Files rows for the whole request go in with a single INSERT.
+    Returns the inserted rows as dicts. The caller commits.
+    """
+    session = session or db.session
+    owner_column(owner_type)  # reject unknown owner types before storing anything
+    files = [file for file in files or () if isinstance(file, FileStorage) and file.filename]
+    for file in files:
+        validate_file_size(file, max_size)
+
+    stored = [(store_blob(file, session=session), file.filename) for file in files]
+    return attach_blobs(owner_type, owner_id, stored, session=session)
+
+
+def attach_blobs(owner_type, owner_id, blobs, session=None):
+    """
+    Attaches blobs that are already in the blob store, given as (FileBlob,
+    filename) pairs, to one owner with a single INSERT, and queues their
+    thumbnails/previews. Returns the inserted rows as dicts. The caller commits.
+    """
+    session = session or db.session
+    column = owner_column(owner_type)
+    rows = []
+    needs_derivatives = set()
+    needs_tiles = set()
+    for blob, filename in blobs:
+        if wants_derivatives(blob):
+            needs_derivatives.add(blob.digest)
+        if owner_type in TILED_OWNER_TYPES and wants_tiles(blob):
+            needs_tiles.add(blob.digest)
+        rows.append({
+            'file_id': str(uuid.uuid4()),
+            column: owner_id,
+            'filename': secure_filename(filename),
+            'file_path': blob_public_path(blob),
+            'file_size': blob.size / 1024,
+            'file_type': blob.content_type,
+            'blob_digest': blob.digest,
+            'derivatives': blob.derivatives,
+        })
+
+    if rows:
+        session.execute(insert(Upload_Files), rows)
+        # Bulk inserts skip the flush hooks, so report the new rows explicitly
+        add_blob_references(session, [row['blob_digest'] for row in rows])
+        mark_uploads_changed(session, [row['file_id'] for row in rows])
+        # Thumbnails/previews (and drawing tiles) are built by a worker pool after the commit
+        queue_derivatives(session, needs_derivatives)
+        queue_tiles(session, needs_tiles)
+        logger.info(f"Attached {len(rows)} file(s) to {owner_type} {owner_id}")
+    return rows
+
+
+def delete_files(file_ids, owner_type=None, owner_id=None, session=None):
+    """
+    Deletes Upload_Files rows (and, through the blob store, their contents once
+    unreferenced). When an owner is given, only that owner's files are deleted.
+    Returns the number of rows deleted. The caller commits.
+    """
+    session = session or db.session
+    if not file_ids:
+        return 0
+    query = session.query(Upload_Files).filter(Upload_Files.file_id.in_(list(file_ids)))
+    if owner_type is not None:
+        query = query.filter(getattr(Upload_Files, owner_column(owner_type)) == owner_id)
+
+    uploads = query.all()
+    for upload in uploads:
+        release_legacy_file(upload)
+        session.delete(upload)
+    return len(uploads)
+
+
+def replace_files(owner_type, owner_id, files, files_to_delete=None, session=None):
+    """Deletes the owner's `files_to_delete` and attaches the new `files`. The caller commits."""
+    delete_files(files_to_delete, owner_type, owner_id, session=session)
+    return attach_files(owner_type, owner_id, files, session=session)
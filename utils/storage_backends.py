@@ -0,0 +1,139 @@
+# utils/storage_backends.py
+import logging
+import os
+import shutil
+import tempfile
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # only needed for STORAGE_BACKEND=s3
+    boto3 = None
+    ClientError = None
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+
+
+class LocalStorageBackend:
+    """Stores blobs on the local filesystem under UPLOAD_FOLDER/blobs."""
+    name = 'local'
+
+    def __init__(self, root=UPLOAD_FOLDER):
+        self.root = root
+
+    def locator(self, digest, ext=''):
+        """uploads/blobs/<first two hex chars>/<digest><ext>"""
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}{ext}")
+
+    def derivative_locator(self, digest, name):
+        """uploads/derivatives/<first two hex chars>/<digest>/<name>"""
+        return os.path.join(self.root, "derivatives", digest[:2], digest, name)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def open(self, path):
+        return open(path, 'rb')
+
+    def save_file(self, src_path, path, content_type=None):
+        """Moves a finished temp file into place (a rename on the same filesystem)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(src_path, path)
+        except OSError:
+            # Temp folder on another device; fall back to copy + delete
+            shutil.move(src_path, path)
+
+    def delete(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def public_path(self, path):
+        """Value stored in Upload_Files.file_path; served by /api/uploads/<path>."""
+        return path
+
+
+class S3StorageBackend:
+    """
+    Stores blobs in an S3-compatible bucket. Point S3_ENDPOINT_URL at a MinIO
+    (or any other S3-compatible) server to run against a local stand-in.
+    """
+    name = 's3'
+
+    def __init__(self, bucket=None, prefix=None, endpoint_url=None, region=None,
+                 access_key=None, secret_key=None, public_base_url=None):
+        if boto3 is None:
+            raise RuntimeError("boto3 is required for STORAGE_BACKEND=s3")
+        self.bucket = bucket or os.getenv("S3_BUCKET")
+        if not self.bucket:
+            raise RuntimeError("S3_BUCKET must be set for STORAGE_BACKEND=s3")
+        self.prefix = prefix if prefix is not None else os.getenv("S3_PREFIX", "")
+        self.public_base_url = public_base_url or os.getenv("S3_PUBLIC_BASE_URL")
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or os.getenv("S3_ENDPOINT_URL"),
+            region_name=region or os.getenv("S3_REGION"),
+            aws_access_key_id=access_key or os.getenv("S3_ACCESS_KEY_ID"),
+            aws_secret_access_key=secret_key or os.getenv("S3_SECRET_ACCESS_KEY"),
+        )
+
+    def locator(self, digest, ext=''):
+        return f"{self.prefix}blobs/{digest[:2]}/{digest}{ext}"
+
+    def derivative_locator(self, digest, name):
+        return f"{self.prefix}derivatives/{digest[:2]}/{digest}/{name}"
+
+    def open(self, key):
+        # Image decoders need a seekable file, so the object is buffered locally
+        buffer = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        self.client.download_fileobj(self.bucket, key, buffer)
+        buffer.seek(0)
+        return buffer
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def save_file(self, src_path, key, content_type=None):
+        """Uploads a finished temp file (multipart for large files) and removes it."""
+        extra_args = {'ContentType': content_type} if content_type else None
+        try:
+            self.client.upload_file(src_path, self.bucket, key, ExtraArgs=extra_args)
+        finally:
+            if os.path.exists(src_path):
+                os.remove(src_path)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def public_path(self, key):
+        if self.public_base_url:
+            return f"{self.public_base_url.rstrip('/')}/{key}"
+        return key
+
+
+STORAGE_BACKENDS = {
+    LocalStorageBackend.name: LocalStorageBackend,
+    S3StorageBackend.name: S3StorageBackend,
+}
+
+_backends = {}
+
+
+def get_storage_backend(name=None):
+    """Returns the (cached) backend instance for `name`, defaulting to STORAGE_BACKEND."""
+    name = name or STORAGE_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        if name not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend '{name}'")
+        backend = _backends[name] = STORAGE_BACKENDS[name]()
+    return backend
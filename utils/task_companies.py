@@ -0,0 +1,45 @@
+# utils/task_companies.py
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, update
+
+from models import db, Projects, Tasks
+
+TASK_BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_task_companies(batch_size=TASK_BACKFILL_BATCH_SIZE):
+    """
+    Copies the project's company_id onto tasks created without one, so
+    they show up in the per-company task listing. Works in batches of
+    primary keys, committing after each, so no long-running update holds
+    locks on the table. Tasks whose project has no company are left as
+    they are. Returns the number of tasks updated.
+    """
+    project_company = (select(Projects.company_id)
+                       .where(Projects.project_id == Tasks.project_id)
+                       .scalar_subquery())
+    updated = 0
+    while True:
+        ids = [task_id for (task_id,) in
+               db.session.query(Tasks.task_id)
+               .join(Projects, Projects.project_id == Tasks.project_id)
+               .filter(Tasks.company_id.is_(None), Projects.company_id.isnot(None))
+               .limit(batch_size)]
+        if not ids:
+            return updated
+        db.session.execute(
+            update(Tasks).where(Tasks.task_id.in_(ids)).values(company_id=project_company)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        updated += len(ids)
+
+
+@click.command('backfill-task-companies')
+@click.option('--batch-size', default=TASK_BACKFILL_BATCH_SIZE, show_default=True)
+@with_appcontext
+def backfill_task_companies_command(batch_size):
+    """Sets company_id on tasks created without one, from their project."""
+    updated = backfill_task_companies(batch_size)
+    click.echo(f"Set company_id on {updated} task(s).")
@@ -0,0 +1,164 @@
+# utils/tiles.py
+import logging
+import math
+import os
+import tempfile
+
+import click
+from flask.cli import with_appcontext
+
+from models import db, FileBlob, Upload_Files
+from utils.derivatives import IMAGE_CONTENT_TYPES, queue_blob_jobs
+from utils.ingest import INGEST_TMP_FOLDER
+from utils.storage_backends import get_storage_backend
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # tiling is skipped when Pillow is missing
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 256
+# Owner types whose image attachments get a deep-zoom pyramid
+TILED_OWNER_TYPES = {'drawing'}
+# extension -> (Pillow format, save options); PNG only when the image has transparency
+TILE_FORMATS = {
+    'jpeg': ('JPEG', {'quality': 85}),
+    'png': ('PNG', {'optimize': True}),
+}
+
+
+def wants_tiles(blob):
+    return Image is not None and blob.content_type in IMAGE_CONTENT_TYPES and not blob.tiles
+
+
+def queue_tiles(session, digests):
+    queue_blob_jobs(session, generate_tiles, digests)
+
+
+def max_level(width, height):
+    """Deep Zoom numbering: level 0 is 1x1, the top level is the full-size image."""
+    return math.ceil(math.log2(max(width, height, 1)))
+
+
+def level_size(tiles, level):
+    scale = 2 ** (tiles['max_level'] - level)
+    return math.ceil(tiles['width'] / scale), math.ceil(tiles['height'] / scale)
+
+
+def level_grid(tiles, level):
+    """(columns, rows) of tiles at a level."""
+    width, height = level_size(tiles, level)
+    return math.ceil(width / tiles['tile_size']), math.ceil(height / tiles['tile_size'])
+
+
+def tile_locator(blob, level, column, row):
+    backend = get_storage_backend(blob.backend)
+    return backend.derivative_locator(blob.digest, f"tiles/{level}/{column}_{row}.{blob.tiles['format']}")
+
+
+def tile_locators(blob):
+    """Backend locations of every tile in a blob's pyramid."""
+    if not blob.tiles:
+        return []
+    return [
+        tile_locator(blob, level, column, row)
+        for level in range(blob.tiles['max_level'] + 1)
+        for columns, rows in [level_grid(blob.tiles, level)]
+        for column in range(columns)
+        for row in range(rows)
+    ]
+
+
+def drawing_tile_source(drawing_id, file_id=None, digest=None):
+    """
+    The drawing's most recently attached image file and its blob, as
+    (Upload_Files, FileBlob), optionally narrowed to one file or one blob.
+    """
+    query = (
+        db.session.query(Upload_Files, FileBlob)
+            .join(FileBlob, Upload_Files.blob_digest == FileBlob.digest)
+            .filter(Upload_Files.drawing_id == drawing_id, FileBlob.content_type.in_(IMAGE_CONTENT_TYPES))
+    )
+    if file_id:
+        query = query.filter(Upload_Files.file_id == file_id)
+    if digest:
+        query = query.filter(FileBlob.digest == digest)
+    return query.order_by(Upload_Files.created_at.desc()).first()
+
+
+def _save_tile(backend, image, path, pillow_format, options):
+    os.makedirs(INGEST_TMP_FOLDER, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=INGEST_TMP_FOLDER, suffix='.tile')
+    with os.fdopen(fd, 'wb') as out:
+        image.save(out, pillow_format, **options)
+    backend.save_file(tmp_path, path, f"image/{path.rsplit('.', 1)[1]}")
+
+
+def generate_tiles(digest):
+    """
+    Cuts an image blob into a Deep Zoom pyramid of TILE_SIZE tiles stored next
+    to its other derivatives, then records the pyramid on FileBlob.tiles.
+    Each level is a 2x box reduction of the one above, so the source image is
+    decoded only once.
+    """
+    blob = db.session.get(FileBlob, digest)
+    if blob is None or Image is None or blob.content_type not in IMAGE_CONTENT_TYPES:
+        return None
+    if blob.tiles:
+        return blob.tiles
+
+    backend = get_storage_backend(blob.backend)
+    with backend.open(blob.storage_path) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if image.mode in ('1', 'L'):
+        image = image.convert('L')  # scanned plans stay single-channel
+    else:
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    ext = 'png' if has_alpha else 'jpeg'
+    pillow_format, options = TILE_FORMATS[ext]
+
+    tiles = {
+        'tile_size': TILE_SIZE,
+        'overlap': 0,
+        'format': ext,
+        'width': image.width,
+        'height': image.height,
+        'max_level': max_level(image.width, image.height),
+    }
+    count = 0
+    for level in range(tiles['max_level'], -1, -1):
+        for top in range(0, image.height, TILE_SIZE):
+            for left in range(0, image.width, TILE_SIZE):
+                tile = image.crop((left, top, min(left + TILE_SIZE, image.width), min(top + TILE_SIZE, image.height)))
+                path = backend.derivative_locator(
+                    digest, f"tiles/{level}/{left // TILE_SIZE}_{top // TILE_SIZE}.{ext}")
+                _save_tile(backend, tile, path, pillow_format, options)
+                count += 1
+        if level:
+            image = image.reduce(2)  # rounds up, matching level_size()
+
+    blob.tiles = tiles
+    db.session.commit()
+    logger.info(f"Generated {count} tiles ({tiles['max_level'] + 1} levels) for blob {digest}")
+    return tiles
+
+
+@click.command('build-drawing-tiles')
+@with_appcontext
+def build_drawing_tiles_command():
+    """Builds tile pyramids for drawing images uploaded before tiling existed."""
+    digests = {digest for (digest,) in (
+        db.session.query(FileBlob.digest)
+            .join(Upload_Files, Upload_Files.blob_digest == FileBlob.digest)
+            .filter(Upload_Files.drawing_id.isnot(None),
+                    FileBlob.content_type.in_(IMAGE_CONTENT_TYPES),
+                    FileBlob.tiles.is_(None))
+    )}
+    for digest in digests:
+        generate_tiles(digest)
+    click.echo(f"Built tiles for {len(digests)} drawing image(s).")
@@ -0,0 +1,169 @@
+# utils/token_revocation.py
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from models import db, RevokedToken
+from auth.authhelpers import access_token_expiry_time, set_revocation_check
+
+logger = logging.getLogger(__name__)
+
+# How stale another process's revocations may be here: the deny-set reloads in the background this often
+TOKEN_DENYLIST_REFRESH_SECONDS = int(os.getenv("TOKEN_DENYLIST_REFRESH_SECONDS", 30))
+
+# Key under session.info: revocations to apply to this process's deny-set once the transaction commits
+PENDING_KEY = 'token_revocations_pending'
+
+
+def _epoch(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class DenySet:
+    """
+    In-memory copy of the unexpired revoked_tokens rows: single tokens by
+    jti and whole users by a cut-off on the token's iat. The first check
+    loads it (so starting a worker runs no query); after that checking a
+    token runs no query, the set reloads in a background thread every
+    `refresh_seconds`, and revocations made by this process apply as soon
+    as they commit. Entries are dropped once no token they cover can still
+    be valid.
+    """
+
+    def __init__(self, refresh_seconds=TOKEN_DENYLIST_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._jtis = {}   # jti -> expiry (epoch)
+        self._users = {}  # user_id -> (revoked_before, expiry) (epoch)
+        self._app = None
+        self._next_refresh = 0.0
+        self._loaded = False
+        self._refreshing = threading.Lock()
+
+    def add(self, user_id, jti=None, revoked_before=None, expires_at=None):
+        with self._lock:
+            if jti:
+                self._jtis[jti] = max(expires_at, self._jtis.get(jti, 0))
+            if revoked_before is not None:
+                current = self._users.get(user_id)
+                if current is None or current[0] < revoked_before:
+                    self._users[user_id] = (revoked_before, expires_at)
+
+    def load(self):
+        """Merges the unexpired rows into the set and prunes expired entries."""
+        now = datetime.utcnow()
+        rows = db.session.query(RevokedToken.user_id, RevokedToken.jti, RevokedToken.revoked_before,
+                                RevokedToken.expires_at).filter(RevokedToken.expires_at > now).all()
+        db.session.rollback()
+        for user_id, jti, revoked_before, expires_at in rows:
+            self.add(user_id, jti, _epoch(revoked_before) if revoked_before else None, _epoch(expires_at))
+        cutoff = time.time()
+        with self._lock:
+            self._jtis = {jti: exp for jti, exp in self._jtis.items() if exp > cutoff}
+            self._users = {user_id: entry for user_id, entry in self._users.items() if entry[1] > cutoff}
+        self._next_refresh = time.monotonic() + self.refresh_seconds
+        self._loaded = True
+        return len(rows)
+
+    def _reload(self):
+        try:
+            with self._app.app_context():
+                self.load()
+        except Exception as e:
+            logger.warning(f"Could not reload revoked tokens: {e}")
+            self._next_refresh = time.monotonic() + self.refresh_seconds
+        finally:
+            self._refreshing.release()
+
+    def _maybe_refresh(self):
+        if self._app is None or time.monotonic() < self._next_refresh:
+            return
+        if not self._loaded:
+            # Nothing to check against yet: the first requests wait for the initial load
+            self._refreshing.acquire()
+            if self._loaded:
+                self._refreshing.release()
+            else:
+                self._reload()
+            return
+        if self._refreshing.acquire(blocking=False):
+            threading.Thread(target=self._reload, name='token-denylist', daemon=True).start()
+
+    def is_revoked(self, claims):
+        self._maybe_refresh()
+        with self._lock:
+            if claims.get('jti') in self._jtis:
+                return True
+            entry = self._users.get(claims.get('user_id'))
+        # Tokens issued before iat/jti existed count as issued at 0
+        return entry is not None and claims.get('iat', 0) < entry[0]
+
+    def stats(self):
+        with self._lock:
+            return {"tokens": len(self._jtis), "users": len(self._users),
+                    "refresh_seconds": self.refresh_seconds}
+
+
+deny_set = DenySet()
+
+
+def _queue(session, row):
+    session.add(row)
+    session.info.setdefault(PENDING_KEY, []).append(
+        (row.user_id, row.jti, _epoch(row.revoked_before) if row.revoked_before else None, _epoch(row.expires_at)))
+
+
+def revoke_access_token(claims, session=None):
+    """Revokes one access token (from its verified claims) until its exp, e.g. on logout. The caller commits."""
+    session = session or db.session
+    if not claims.get('jti') or not claims.get('exp'):
+        return None
+    row = RevokedToken(user_id=claims.get('user_id'), jti=claims['jti'],
+                       expires_at=datetime.utcfromtimestamp(claims['exp']))
+    _queue(session, row)
+    return row
+
+
+def revoke_user_tokens(user_id, session=None):
+    """
+    Revokes every access token of a user issued so far, e.g. after a
+    password reset or deactivation; tokens issued from the next second on
+    are accepted again. The caller commits.
+    """
+    session = session or db.session
+    # iat has whole-second precision: round up so tokens issued earlier in this second are covered
+    revoked_before = datetime.utcnow().replace(microsecond=0) + timedelta(seconds=1)
+    row = RevokedToken(user_id=user_id, revoked_before=revoked_before,
+                       expires_at=revoked_before + access_token_expiry_time)
+    _queue(session, row)
+    return row
+
+
+def _after_commit(session):
+    if session.get_nested_transaction() is not None:
+        return
+    for entry in session.info.pop(PENDING_KEY, None) or ():
+        deny_set.add(*entry)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_KEY, None)
+
+
+def register_token_revocation(app):
+    """
+    Makes jwt_required consult the deny-set and applies this process's
+    revocations on commit. The existing ones are loaded by the first
+    authenticated request, not here, so app startup runs no query; a
+    failed load is retried by the periodic refresh.
+    """
+    deny_set._app = app
+    set_revocation_check(deny_set.is_revoked)
+    if not event.contains(db.session, 'after_commit', _after_commit):
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
@@ -0,0 +1,121 @@
+# utils/user_tokens.py
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime
+
+import click
+import jwt
+from flask.cli import with_appcontext
+from sqlalchemy import delete, update
+
+from models import db, OtpCode, RevokedToken, UserToken
+from auth.authhelpers import REFRESH_TOKEN_SECRET, refresh_token_expiry_time
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PURGE_BATCH_SIZE = int(os.getenv("TOKEN_PURGE_BATCH_SIZE", 1000))
+
+
+def token_digest(token):
+    """Refresh tokens are signed and high-entropy, so an unsalted sha256 is enough to find and verify them."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def refresh_token_user_id(token):
+    """The user a refresh token was issued to, checking its signature but not its expiry (for revocation)."""
+    try:
+        return jwt.decode(token, REFRESH_TOKEN_SECRET, algorithms=["HS256"], options={"verify_exp": False}).get('user_id')
+    except jwt.InvalidTokenError:
+        return None
+
+
+def store_refresh_token(user_id, token, session=None):
+    """Adds the refresh token's digest to the session; the caller commits."""
+    session = session or db.session
+    record = UserToken(user_id=user_id, token_digest=token_digest(token),
+                       expires_at=datetime.utcnow() + refresh_token_expiry_time)
+    session.add(record)
+    return record
+
+
+def rotate_refresh_token(user_id, old_token, new_token, session=None):
+    """
+    Replaces a live refresh token by a new one in a single UPDATE of the
+    row found by its (user_id, token_digest) key, instead of a select,
+    delete and insert. Returns False if the old token is unknown, expired
+    or was already rotated by a concurrent request; the caller commits.
+    """
+    session = session or db.session
+    now = datetime.utcnow()
+    result = session.execute(
+        update(UserToken)
+        .where(UserToken.user_id == user_id,
+               UserToken.token_digest == token_digest(old_token),
+               UserToken.expires_at > now)
+        .values(token_digest=token_digest(new_token), created_at=now,
+                expires_at=now + refresh_token_expiry_time)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def revoke_refresh_token(token, session=None):
+    """Deletes a refresh token; returns whether it was active. The caller commits."""
+    session = session or db.session
+    user_id = refresh_token_user_id(token)
+    if not user_id:
+        return False
+    result = session.execute(
+        delete(UserToken)
+        .where(UserToken.user_id == user_id, UserToken.token_digest == token_digest(token))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def _purge_batches(model, key, condition, batch_size):
+    deleted = 0
+    while True:
+        ids = [row_id for (row_id,) in db.session.query(key).filter(condition).limit(batch_size)]
+        if not ids:
+            return deleted
+        db.session.execute(delete(model).where(key.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+
+
+def purge_expired_tokens(batch_size=TOKEN_PURGE_BATCH_SIZE):
+    """
+    Deletes expired refresh tokens, OTP codes and access-token revocations
+    in batches of primary keys found through their expires_at indexes,
+    committing after each, so no long-running delete holds locks on the
+    tables. Returns (tokens_deleted, otps_deleted, revocations_deleted).
+    """
+    now = datetime.utcnow()
+    tokens = _purge_batches(UserToken, UserToken.token_id, UserToken.expires_at < now, batch_size)
+    # OTP expiries are written in server local time (datetime.now())
+    otps = _purge_batches(OtpCode, OtpCode.id, OtpCode.expires_at < datetime.now(), batch_size)
+    revocations = _purge_batches(RevokedToken, RevokedToken.revocation_id, RevokedToken.expires_at < now, batch_size)
+    return tokens, otps, revocations
+
+
+@click.command('purge-expired-tokens')
+@click.option('--batch-size', default=TOKEN_PURGE_BATCH_SIZE, show_default=True)
+@click.option('--interval', default=0, show_default=True,
+              help='Seconds between passes; 0 runs a single pass (e.g. from cron).')
+@with_appcontext
+def purge_expired_tokens_command(batch_size, interval):
+    """Deletes expired refresh tokens, OTP codes and token revocations."""
+    while True:
+        try:
+            tokens, otps, revocations = purge_expired_tokens(batch_size)
+            click.echo(f"Purged {tokens} refresh token(s), {otps} OTP code(s) and {revocations} revocation(s).")
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Token purge pass failed: {e}")
+        if not interval:
+            break
+        db.session.remove()
+        time.sleep(interval)
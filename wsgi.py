@@ -0,0 +1,5 @@
+# wsgi.py
+"""WSGI entry point, e.g. `gunicorn wsgi:app`; also what `flask` finds by default."""
+from app import create_app
+
+app = create_app()